@@ -0,0 +1,192 @@
+"""gzip/brotli response compression for the API.
+
+Whole responses smaller than ``COMPRESSION_MIN_SIZE`` are sent as-is, since
+compressing them costs more CPU than it saves on the wire. Streaming
+responses (server-sent events, for instance) are compressed chunk by chunk
+and flushed after every chunk, so clients still see each event as soon as it
+is sent. brotli is used when the ``brotli`` package is installed and the
+client accepts it; otherwise gzip.
+"""
+import os
+import time
+import zlib
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_EXCLUDED_PATHS = tuple(
+    path for path in os.getenv("COMPRESSION_EXCLUDED_PATHS", "/metrics,/health").split(",") if path
+)
+# Already-compressed formats gain nothing from another pass.
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/msgpack", "application/javascript",
+                      "application/xml", "image/svg+xml")
+
+COMPRESSION_RATIO = Histogram(
+    "api_compression_ratio",
+    "Compressed size divided by original size per response",
+    ["encoding"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0),
+)
+COMPRESSION_CPU_SECONDS = Histogram(
+    "api_compression_cpu_seconds",
+    "CPU time spent compressing one response",
+    ["encoding"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+COMPRESSION_BYTES = Counter(
+    "api_compression_bytes_total",
+    "Response bytes before and after compression",
+    ["encoding", "stage"],
+)
+COMPRESSION_SKIPPED = Counter(
+    "api_compression_skipped_total",
+    "Responses sent uncompressed, by reason",
+    ["reason"],
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        name, _, value = params.strip().partition("=")
+        if name == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        started = time.thread_time()
+        if self.encoding == "br":
+            out = self._brotli.process(data) + (self._brotli.finish() if final else self._brotli.flush())
+        else:
+            out = self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return out
+
+    def record(self):
+        COMPRESSION_CPU_SECONDS.labels(encoding=self.encoding).observe(self.cpu_seconds)
+        COMPRESSION_BYTES.labels(encoding=self.encoding, stage="original").inc(self.bytes_in)
+        COMPRESSION_BYTES.labels(encoding=self.encoding, stage="compressed").inc(self.bytes_out)
+        if self.bytes_in:
+            COMPRESSION_RATIO.labels(encoding=self.encoding).observe(self.bytes_out / self.bytes_in)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing eligible responses with gzip or brotli."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 excluded_paths=COMPRESSION_EXCLUDED_PATHS):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.excluded_paths = tuple(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if any(path == excluded or path.startswith(excluded.rstrip("/") + "/") for excluded in self.excluded_paths):
+            COMPRESSION_SKIPPED.labels(reason="excluded").inc()
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            COMPRESSION_SKIPPED.labels(reason="not_accepted").inc()
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressedResponder:
+    """Holds back the response start until the first body chunk decides the encoding."""
+
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _skip_reason(self, headers: Headers, body: bytes, more_body: bool) -> Optional[str]:
+        if "content-encoding" in headers:
+            return "already_encoded"
+        content_type = headers.get("content-type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return "content_type"
+        if not more_body and len(body) < self.minimum_size:
+            return "below_threshold"
+        return None
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            headers = Headers(raw=self.start_message["headers"])
+            reason = self._skip_reason(headers, body, more_body)
+            if reason is not None:
+                COMPRESSION_SKIPPED.labels(reason=reason).inc()
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            compressed = self.compressor.compress(body, final=not more_body)
+            if not more_body:
+                headers["Content-Length"] = str(len(compressed))
+            await self.send(self.start_message)
+        else:
+            compressed = self.compressor.compress(body, final=not more_body)
+
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+        if not more_body:
+            self.compressor.record()
@@ -0,0 +1,148 @@
+"""Bounded thread pool for blocking Firebase Admin SDK calls."""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+
+import firebase_admin
+from prometheus_client import Counter, Gauge, Histogram
+
+from api.profiling import span
+
+FIREBASE_ADMIN_MAX_WORKERS = int(os.getenv("FIREBASE_ADMIN_MAX_WORKERS", "8"))
+FIREBASE_ADMIN_MAX_QUEUE = int(os.getenv("FIREBASE_ADMIN_MAX_QUEUE", "256"))
+FIREBASE_ADMIN_TIMEOUT_SECONDS = float(os.getenv("FIREBASE_ADMIN_TIMEOUT_SECONDS", "10"))
+
+FIREBASE_QUEUE_DEPTH = Gauge(
+    "api_firebase_executor_queue_depth",
+    "Firebase Admin calls waiting for an executor thread",
+)
+FIREBASE_IN_FLIGHT = Gauge(
+    "api_firebase_executor_in_flight",
+    "Firebase Admin calls currently running on an executor thread",
+)
+FIREBASE_CALL_SECONDS = Histogram(
+    "api_firebase_call_seconds",
+    "Time spent inside Firebase Admin calls",
+    ["operation"],
+)
+FIREBASE_CALL_FAILURES = Counter(
+    "api_firebase_call_failures_total",
+    "Firebase Admin calls that were rejected or timed out",
+    ["operation", "reason"],
+)
+
+
+class FirebaseAdminUnavailable(Exception):
+    """The executor is saturated or the call exceeded its deadline."""
+
+
+class FirebaseExecutor:
+    """Runs blocking Firebase Admin calls without stalling the event loop.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more
+    may wait; anything beyond that is rejected immediately instead of piling
+    up behind a slow backend.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = FIREBASE_ADMIN_MAX_WORKERS,
+        max_queue: int = FIREBASE_ADMIN_MAX_QUEUE,
+        timeout: float = FIREBASE_ADMIN_TIMEOUT_SECONDS,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="firebase-admin",
+            )
+        return self._executor
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, operation: str, fn: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                FIREBASE_CALL_FAILURES.labels(operation=operation, reason="rejected").inc()
+                raise FirebaseAdminUnavailable(f"{operation} rejected: executor queue is full")
+            self._pending += 1
+        FIREBASE_QUEUE_DEPTH.inc()
+
+        state = SimpleNamespace(started=False, abandoned=False)
+
+        def call():
+            with self._lock:
+                if state.abandoned:
+                    return None
+                state.started = True
+            FIREBASE_QUEUE_DEPTH.dec()
+            FIREBASE_IN_FLIGHT.inc()
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                FIREBASE_IN_FLIGHT.dec()
+                FIREBASE_CALL_SECONDS.labels(operation=operation).observe(time.perf_counter() - start)
+                self._release()
+
+        def abandon():
+            # A call that never reached a thread is dropped; one that is
+            # already running keeps its slot until it returns.
+            with self._lock:
+                abandoned = not state.started
+                state.abandoned = abandoned
+            if abandoned:
+                FIREBASE_QUEUE_DEPTH.dec()
+                self._release()
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            future = self._get_executor().submit(call)
+        except BaseException:
+            abandon()
+            raise
+        try:
+            with span(f"firebase.{operation}"):
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            abandon()
+            FIREBASE_CALL_FAILURES.labels(operation=operation, reason="timeout").inc()
+            raise FirebaseAdminUnavailable(f"{operation} timed out after {timeout}s")
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. an outer wait_for); a queued call must
+            # not keep its slot, or the executor eventually rejects everything.
+            abandon()
+            raise
+
+    def shutdown(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+def initialize_firebase():
+    """Initialize the default Firebase Admin app unless it already exists.
+
+    Looks up credentials, which may block on the filesystem or the metadata
+    server, so call it off the event loop.
+    """
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        return firebase_admin.initialize_app()
+
+
+firebase_executor = FirebaseExecutor()
@@ -0,0 +1,208 @@
+"""Background dependency probes with cached results.
+
+Each probe runs on its own schedule and stores its latest result, so health
+endpoints answer from memory instead of calling Firebase, Cloud Tasks and
+storage on every load-balancer ping. A probe that answers slower than its
+latency budget is reported as ``degraded``; one whose last result is older
+than ``HEALTH_STALE_AFTER_INTERVALS`` intervals is reported as ``stale``.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from prometheus_client import Gauge, Histogram
+
+from api.firebase_executor import firebase_executor
+from api.task_queue import get_queue_backend
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "30"))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+HEALTH_STALE_AFTER_INTERVALS = float(os.getenv("HEALTH_STALE_AFTER_INTERVALS", "3"))
+HEALTH_STORAGE_BUCKET = os.getenv("HEALTH_STORAGE_BUCKET") or os.getenv("FIREBASE_STORAGE_BUCKET")
+HEALTH_FIRESTORE_COLLECTION = os.getenv("HEALTH_FIRESTORE_COLLECTION", "_health")
+
+PROBE_SECONDS = Histogram(
+    "api_health_probe_seconds",
+    "Latency of background health probes",
+    ["probe", "outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PROBE_UP = Gauge(
+    "api_health_probe_up",
+    "1 if the probe's last run succeeded within its budget, 0.5 if slow, 0 if failed",
+    ["probe"],
+)
+
+
+class ProbeSkipped(Exception):
+    """The dependency is not configured here, so there is nothing to check."""
+
+
+@dataclass
+class Probe:
+    name: str
+    check: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    # Failing critical probes make the service report itself unhealthy.
+    critical: bool = True
+    budget_ms: float = 500
+    interval: float = HEALTH_PROBE_INTERVAL_SECONDS
+    timeout: float = HEALTH_PROBE_TIMEOUT_SECONDS
+
+
+async def check_firebase() -> Optional[Dict[str, Any]]:
+    from firebase_admin import auth
+
+    # One-user page: exercises credentials and the Auth API at minimal cost.
+    await firebase_executor.run("health_probe", lambda: auth.list_users(max_results=1))
+    return None
+
+
+async def check_queue() -> Optional[Dict[str, Any]]:
+    queue = get_queue_backend()
+    if queue is None:
+        raise RuntimeError("Job queue backend is not running")
+    await queue.ping()
+    return {"backend": queue.name}
+
+
+_storage_client = None
+
+
+def get_storage_client():
+    """The storage client shared by every storage probe, created on first use.
+
+    Building a client resolves credentials and opens a new HTTP session, so
+    it is not repeated on every probe run.
+    """
+    global _storage_client
+    if _storage_client is None:
+        from google.cloud import storage
+        _storage_client = storage.Client()
+    return _storage_client
+
+
+async def check_storage() -> Optional[Dict[str, Any]]:
+    if not HEALTH_STORAGE_BUCKET:
+        raise ProbeSkipped("HEALTH_STORAGE_BUCKET is not set")
+
+    def probe():
+        if not get_storage_client().bucket(HEALTH_STORAGE_BUCKET).exists():
+            raise RuntimeError(f"Bucket {HEALTH_STORAGE_BUCKET} does not exist")
+
+    await asyncio.get_event_loop().run_in_executor(None, probe)
+    return {"bucket": HEALTH_STORAGE_BUCKET}
+
+
+async def check_firestore() -> Optional[Dict[str, Any]]:
+    from firebase_admin import firestore
+
+    def probe():
+        # At most one document read per probe run.
+        firestore.client().collection(HEALTH_FIRESTORE_COLLECTION).limit(1).get()
+
+    await firebase_executor.run("health_probe_firestore", probe)
+    return None
+
+
+def default_probes() -> List[Probe]:
+    return [
+        Probe("firebase", check_firebase, critical=True, budget_ms=1000),
+        Probe("queue", check_queue, critical=True, budget_ms=500),
+        Probe("storage", check_storage, critical=False, budget_ms=1000),
+        Probe("db", check_firestore, critical=False, budget_ms=1000),
+    ]
+
+
+class HealthMonitor:
+    """Runs probes in the background and serves their cached results."""
+
+    def __init__(self, probes: Optional[List[Probe]] = None):
+        self.probes = {probe.name: probe for probe in (probes if probes is not None else default_probes())}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            loop = asyncio.get_event_loop()
+            self._tasks = [loop.create_task(self._run(probe)) for probe in self.probes.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, probe: Probe):
+        while True:
+            await self.run_probe(probe)
+            await asyncio.sleep(probe.interval)
+
+    async def run_probe(self, probe: Probe) -> Dict[str, Any]:
+        started = time.perf_counter()
+        details, error = None, None
+        try:
+            details = await asyncio.wait_for(probe.check(), probe.timeout)
+            status = "ok"
+        except ProbeSkipped as e:
+            status, error = "skipped", str(e)
+        except asyncio.TimeoutError:
+            status, error = "fail", f"Timed out after {probe.timeout}s"
+        except Exception as e:
+            status, error = "fail", str(e)
+        elapsed = time.perf_counter() - started
+        if status == "ok" and elapsed * 1000 > probe.budget_ms:
+            status = "degraded"
+
+        if status != "skipped":
+            PROBE_SECONDS.labels(probe=probe.name, outcome=status).observe(elapsed)
+            PROBE_UP.labels(probe=probe.name).set({"ok": 1, "degraded": 0.5}.get(status, 0))
+        if status == "fail":
+            logger.warning("Health probe %s failed: %s", probe.name, error)
+        result = {
+            "status": status,
+            "critical": probe.critical,
+            "latency_ms": round(elapsed * 1000, 2),
+            "budget_ms": probe.budget_ms,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "_checked_monotonic": time.monotonic(),
+        }
+        if error:
+            result["error"] = error
+        if details:
+            result["details"] = details
+        self._results[probe.name] = result
+        return result
+
+    def probe_result(self, name: str) -> Dict[str, Any]:
+        probe = self.probes[name]
+        result = self._results.get(name)
+        if result is None:
+            return {"status": "unknown", "critical": probe.critical, "budget_ms": probe.budget_ms}
+        result = dict(result)
+        age = time.monotonic() - result.pop("_checked_monotonic")
+        result["age_seconds"] = round(age, 1)
+        if age > probe.interval * HEALTH_STALE_AFTER_INTERVALS:
+            result["status"] = "stale"
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        """Overall status: ``fail`` if a critical probe is not ok or degraded."""
+        probes = {name: self.probe_result(name) for name in self.probes}
+        status = "ok"
+        for result in probes.values():
+            if result["status"] in ("ok", "skipped"):
+                continue
+            if result["critical"] and result["status"] != "degraded":
+                status = "fail"
+                break
+            status = "degraded"
+        return {"status": status, "probes": probes}
+
+
+health_monitor = HealthMonitor()
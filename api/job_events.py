@@ -0,0 +1,243 @@
+"""Pub/sub for job state transitions, streamed to clients over SSE."""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from prometheus_client import Counter, Gauge
+
+from api.job_status import JobStatusCache, job_status_cache
+from api.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+JOB_EVENTS_REDIS_URL = os.getenv("JOB_EVENTS_REDIS_URL")
+JOB_EVENTS_SUBSCRIBER_BUFFER = int(os.getenv("JOB_EVENTS_SUBSCRIBER_BUFFER", "100"))
+# Every process listens on this topic, so a terminal status reported to one
+# API process reaches the status caches of all of them.
+STATUS_TOPIC = "status"
+
+JOB_EVENTS_PUBLISHED = Counter(
+    "api_job_events_published_total",
+    "Job state transitions published",
+    ["status"],
+)
+JOB_EVENTS_DROPPED = Counter(
+    "api_job_events_dropped_total",
+    "Job events dropped because a subscriber fell behind",
+)
+JOB_EVENTS_SUBSCRIBERS = Gauge(
+    "api_job_events_subscribers",
+    "Open job event subscriptions in this process",
+)
+
+
+class Subscription:
+    """Stream of events for one topic; call ``close`` when done."""
+
+    async def get(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class JobEventBroker:
+    """Interface for fanning job events out to subscribers."""
+
+    # Whether subscribers in other processes see published events.
+    shared = False
+
+    async def publish(self, topic: str, event: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def subscribe(self, topic: str) -> Subscription:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class _QueueSubscription(Subscription):
+    def __init__(self, broker: "InProcessJobEventBroker", topic: str, maxsize: int):
+        self._broker = broker
+        self._topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._closed = False
+        JOB_EVENTS_SUBSCRIBERS.inc()
+
+    def deliver(self, event: Dict[str, Any]):
+        if self.queue.full():
+            # Slow consumers lose their oldest events rather than block publishers.
+            self.queue.get_nowait()
+            JOB_EVENTS_DROPPED.inc()
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+    async def close(self):
+        if not self._closed:
+            self._closed = True
+            self._broker._unsubscribe(self._topic, self)
+            JOB_EVENTS_SUBSCRIBERS.dec()
+
+
+class InProcessJobEventBroker(JobEventBroker):
+    """Delivers events to subscribers in the same process."""
+
+    def __init__(self, buffer_size: int = JOB_EVENTS_SUBSCRIBER_BUFFER):
+        self.buffer_size = buffer_size
+        self._subscribers: Dict[str, Set[_QueueSubscription]] = {}
+
+    async def publish(self, topic: str, event: Dict[str, Any]):
+        for subscription in list(self._subscribers.get(topic, ())):
+            subscription.deliver(event)
+
+    async def subscribe(self, topic: str) -> Subscription:
+        subscription = _QueueSubscription(self, topic, self.buffer_size)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, topic: str, subscription: _QueueSubscription):
+        subscribers = self._subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[topic]
+
+
+class _RedisSubscription(Subscription):
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+        self._messages = pubsub.listen()
+        JOB_EVENTS_SUBSCRIBERS.inc()
+
+    async def get(self) -> Dict[str, Any]:
+        while True:
+            message = await self._messages.__anext__()
+            if message.get("type") == "message":
+                return json.loads(message["data"])
+
+    async def close(self):
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+            JOB_EVENTS_SUBSCRIBERS.dec()
+
+
+class RedisJobEventBroker(JobEventBroker):
+    """Redis pub/sub, so events reach subscribers on any API worker."""
+
+    shared = True
+
+    def __init__(self, client, prefix: str = "dg:job-events:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def publish(self, topic: str, event: Dict[str, Any]):
+        await self.client.publish(self.prefix + topic, dumps(event))
+
+    async def subscribe(self, topic: str) -> Subscription:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.prefix + topic)
+        return _RedisSubscription(pubsub)
+
+    async def close(self):
+        await self.client.close()
+
+
+def broker_from_env() -> JobEventBroker:
+    if JOB_EVENTS_REDIS_URL:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("JOB_EVENTS_REDIS_URL is set but the redis package is not installed; "
+                           "job events will only reach subscribers in this process")
+        else:
+            return RedisJobEventBroker(redis.from_url(JOB_EVENTS_REDIS_URL, decode_responses=True))
+    return InProcessJobEventBroker()
+
+
+job_event_broker = broker_from_env()
+
+
+class JobStatusFeed:
+    """Applies job events published by any process to this process's status cache.
+
+    Only runs with a shared broker; with the in-process broker the process
+    that publishes an event is the only one there is.
+    """
+
+    def __init__(self, broker: JobEventBroker, cache: JobStatusCache):
+        self.broker = broker
+        self.cache = cache
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.broker.shared and (self._task is None or self._task.done()):
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with await self.broker.subscribe(STATUS_TOPIC) as subscription:
+                    while True:
+                        event = await subscription.get()
+                        self.cache.record_event(event["task_name"], event["status"], event.get("time"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Job status feed failed, resubscribing: %s", e)
+                await asyncio.sleep(1)
+
+
+job_status_feed = JobStatusFeed(job_event_broker, job_status_cache)
+
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+async def publish_job_event(user_id: str, task_name: str, status: str, **details: Any):
+    """Record a job state transition and push it to the job owner's subscribers."""
+    event = {
+        "task_name": task_name,
+        "status": status,
+        "time": datetime.now(timezone.utc).isoformat(),
+    }
+    job_status_cache.record_event(task_name, status, event["time"])
+    event.update({key: value for key, value in details.items() if value is not None})
+    JOB_EVENTS_PUBLISHED.labels(status=status).inc()
+    try:
+        if job_event_broker.shared:
+            await job_event_broker.publish(
+                STATUS_TOPIC, {key: event[key] for key in ("task_name", "status", "time")}
+            )
+        await job_event_broker.publish(user_topic(user_id), event)
+    except Exception as e:
+        logger.warning("Failed to publish job event for %s: %s", task_name, e)
+
+
+def format_sse(event: Optional[Dict[str, Any]] = None, comment: Optional[str] = None) -> str:
+    if event is None:
+        return f": {comment or ''}\n\n"
+    # Same encoding as API responses: datetimes as ISO 8601.
+    return f"event: job\ndata: {dumps(event).decode()}\n\n"
@@ -0,0 +1,143 @@
+"""Priority classes and per-user fair-share scheduling for submitted jobs.
+
+Every job gets a priority class, ``interactive``, ``standard`` or ``bulk``,
+defaulted from its job type. Clients may ask for a lower class than that
+default but never a higher one, so nobody can jump the queue by labelling
+bulk work interactive. Each class maps
+to its own queue in the backend (``CLOUD_TASKS_QUEUE_<CLASS>``), so the
+queues' dispatch rates can keep bulk work from crowding out interactive jobs
+on the worker.
+
+Within every class, users share dispatch capacity fairly. Each (user, class) pair
+may have ``burst`` jobs dispatched immediately and then ``rate`` jobs per
+second. Jobs beyond that are still accepted, but their schedule time is
+pushed back. A tenant submitting thousands of jobs therefore drains at its
+own pace while other users' jobs are scheduled right away. The state is per
+API process, so with N processes a user's effective share is up to N times
+the configured rate.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import Histogram
+
+PRIORITY_CLASSES = ("interactive", "standard", "bulk")
+DEFAULT_PRIORITY = "standard"
+# Job types whose results a user is typically waiting on, and ones that are not.
+JOB_TYPE_PRIORITIES = {
+    "llm_process": "interactive",
+    "data_analysis": "bulk"
+}
+# Job types the worker registers; submissions of anything else are refused
+# here instead of failing in the worker.
+JOB_TYPES = tuple(
+    job_type.strip() for job_type in os.getenv("JOB_TYPES", ",".join(JOB_TYPE_PRIORITIES)).split(",")
+    if job_type.strip()
+)
+# Per-user dispatch rate (jobs/second, 0 = unlimited) and immediate burst per class.
+FAIR_SHARE_DEFAULTS = {
+    "interactive": (5.0, 50.0),
+    "standard": (2.0, 20.0),
+    "bulk": (0.5, 10.0)
+}
+JOBS_MAX_SCHEDULE_DELAY_SECONDS = float(os.getenv("JOBS_MAX_SCHEDULE_DELAY_SECONDS", "3600"))
+JOBS_FAIR_SHARE_MAX_USERS = int(os.getenv("JOBS_FAIR_SHARE_MAX_USERS", "100000"))
+
+SCHEDULE_DELAY = Histogram(
+    "api_jobs_schedule_delay_seconds",
+    "Delay the fair-share scheduler added to submitted jobs",
+    ["priority"],
+    buckets=(0, 1, 5, 15, 60, 300, 900, 1800, 3600),
+)
+
+
+class BacklogFull(Exception):
+    """The user's backlog in this class would delay a new job too long."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Job backlog is full; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def default_priority(job_type: str) -> str:
+    """The job type's class, from ``JOB_PRIORITY_<TYPE>`` or the built-in map."""
+    setting = f"JOB_PRIORITY_{job_type.upper()}"
+    configured = os.getenv(setting)
+    if not configured:
+        return JOB_TYPE_PRIORITIES.get(job_type, DEFAULT_PRIORITY)
+    if configured not in PRIORITY_CLASSES:
+        raise RuntimeError(f"{setting}={configured} is not one of {', '.join(PRIORITY_CLASSES)}")
+    return configured
+
+
+def resolve_priority(job_type: str, requested: Optional[str] = None) -> str:
+    """The class to submit a job in; ``requested`` may only lower the default."""
+    default = default_priority(job_type)
+    if requested is None:
+        return default
+    if requested not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority: {requested} (expected one of {', '.join(PRIORITY_CLASSES)})")
+    if PRIORITY_CLASSES.index(requested) < PRIORITY_CLASSES.index(default):
+        raise ValueError(f"{job_type} jobs may not be submitted above {default} priority")
+    return requested
+
+
+def _fair_share_settings() -> Dict[str, Tuple[float, float]]:
+    settings = {}
+    for priority, (rate, burst) in FAIR_SHARE_DEFAULTS.items():
+        settings[priority] = (
+            float(os.getenv(f"JOBS_FAIR_SHARE_RATE_{priority.upper()}", str(rate))),
+            float(os.getenv(f"JOBS_FAIR_SHARE_BURST_{priority.upper()}", str(burst)))
+        )
+    return settings
+
+
+class FairShareScheduler:
+    """Assigns each job a dispatch delay from its user's virtual clock.
+
+    A (user, class) clock advances ``1 / rate`` per job and may lag real time
+    by at most ``burst / rate``. That lag is the user's unused allowance.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[Dict[str, Tuple[float, float]]] = None,
+        max_delay: float = JOBS_MAX_SCHEDULE_DELAY_SECONDS,
+        max_users: int = JOBS_FAIR_SHARE_MAX_USERS,
+    ):
+        self.settings = settings or _fair_share_settings()
+        self.max_delay = max_delay
+        self.max_users = max_users
+        self._clocks: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+    def schedule(self, user_id: str, priority: str) -> float:
+        """Reserve a dispatch slot and return its delay in seconds."""
+        rate, burst = self.settings.get(priority, (0.0, 0.0))
+        if rate <= 0:
+            SCHEDULE_DELAY.labels(priority=priority).observe(0)
+            return 0.0
+        now = time.monotonic()
+        key = (user_id, priority)
+        floor = now - max(burst, 1.0) / rate
+        clock = max(self._clocks.get(key, floor), floor) + 1 / rate
+        delay = max(0.0, clock - now)
+        if delay > self.max_delay:
+            raise BacklogFull(delay - self.max_delay)
+        self._clocks[key] = clock
+        self._clocks.move_to_end(key)
+        while len(self._clocks) > self.max_users:
+            self._clocks.popitem(last=False)
+        SCHEDULE_DELAY.labels(priority=priority).observe(delay)
+        return delay
+
+    def release(self, user_id: str, priority: str):
+        """Give back the most recent slot, e.g. when enqueueing it failed."""
+        rate, _ = self.settings.get(priority, (0.0, 0.0))
+        key = (user_id, priority)
+        if rate > 0 and key in self._clocks:
+            self._clocks[key] -= 1 / rate
+
+
+fair_share_scheduler = FairShareScheduler()
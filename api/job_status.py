@@ -0,0 +1,121 @@
+"""Short-lived cache of job statuses in front of the queue backend."""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import Counter
+
+from api.single_flight import SingleFlight
+from api.task_queue import TERMINAL_STATUSES, QueueBackend, TaskNotFound
+
+JOB_STATUS_TTL_SECONDS = float(os.getenv("JOB_STATUS_TTL_SECONDS", "2"))
+# Cloud Tasks deletes finished tasks, so pollers of finished jobs keep asking
+# for names it no longer knows; remember those answers briefly.
+JOB_STATUS_NOT_FOUND_TTL_SECONDS = float(os.getenv("JOB_STATUS_NOT_FOUND_TTL_SECONDS", "30"))
+JOB_STATUS_CACHE_MAX_SIZE = int(os.getenv("JOB_STATUS_CACHE_MAX_SIZE", "50000"))
+
+JOB_STATUS_LOOKUPS = Counter(
+    "api_job_status_cache_lookups_total",
+    "Job status lookups by whether the queue backend was called",
+    ["result"],
+)
+
+
+class JobStatusCache:
+    """Caches job statuses; terminal statuses never expire, others for ``ttl``.
+
+    Terminal statuses come from the queue backend or from the worker's job
+    events (``record_event``), which is the only place they appear with Cloud
+    Tasks. Unknown task names are cached for ``not_found_ttl``. Entries are
+    bounded by ``max_size`` (least recently used first), so the cache cannot
+    grow without limit.
+    """
+
+    def __init__(
+        self,
+        ttl: float = JOB_STATUS_TTL_SECONDS,
+        max_size: int = JOB_STATUS_CACHE_MAX_SIZE,
+        not_found_ttl: float = JOB_STATUS_NOT_FOUND_TTL_SECONDS,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.not_found_ttl = not_found_ttl
+        # A None status records that the backend did not know the task.
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._flights = SingleFlight()
+
+    def _lookup(self, task_name: str):
+        """Return (found, status); a cached not-found entry is (True, None)."""
+        entry = self._entries.get(task_name)
+        if entry is None:
+            return False, None
+        expires_at, status = entry
+        if expires_at is not None and time.time() >= expires_at:
+            del self._entries[task_name]
+            return False, None
+        self._entries.move_to_end(task_name)
+        return True, status
+
+    def _store(self, task_name: str, expires_at: Optional[float], status: Optional[Dict[str, Any]]):
+        self._entries[task_name] = (expires_at, status)
+        self._entries.move_to_end(task_name)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _is_terminal(self, task_name: str) -> bool:
+        entry = self._entries.get(task_name)
+        return entry is not None and entry[1] is not None and entry[1].get("status") in TERMINAL_STATUSES
+
+    def put(self, task_name: str, status: Dict[str, Any]):
+        terminal = status.get("status") in TERMINAL_STATUSES
+        # A terminal status is final; a slower backend read must not undo it.
+        if not terminal and self._is_terminal(task_name):
+            return
+        self._store(task_name, None if terminal else time.time() + self.ttl, status)
+
+    def put_not_found(self, task_name: str):
+        if self.not_found_ttl > 0 and not self._is_terminal(task_name):
+            self._store(task_name, time.time() + self.not_found_ttl, None)
+
+    def record_event(self, task_name: str, status: str, event_time: Optional[str] = None):
+        """Apply a job state transition reported by the worker or local queue."""
+        self._flights.forget(task_name)
+        if status not in TERMINAL_STATUSES:
+            self.invalidate(task_name)
+            return
+        entry = self._entries.get(task_name)
+        previous = entry[1] if entry is not None and entry[1] is not None else {}
+        self.put(task_name, dict(previous, status=status, finish_time=event_time))
+
+    def invalidate(self, task_name: str):
+        self._entries.pop(task_name, None)
+
+    async def _fetch(self, queue: QueueBackend, task_name: str) -> Dict[str, Any]:
+        try:
+            status = await queue.get_task(task_name)
+        except TaskNotFound:
+            if self._flights.is_current(task_name):
+                self.put_not_found(task_name)
+            raise
+        if self._flights.is_current(task_name):
+            self.put(task_name, status)
+        return status
+
+    async def get(self, queue: QueueBackend, task_name: str) -> Dict[str, Any]:
+        found, status = self._lookup(task_name)
+        if found:
+            JOB_STATUS_LOOKUPS.labels(result="hit").inc()
+            if status is None:
+                raise TaskNotFound(task_name)
+            return dict(status)
+
+        JOB_STATUS_LOOKUPS.labels(result="coalesced" if task_name in self._flights else "miss").inc()
+        status, _ = await self._flights.do(task_name, lambda: self._fetch(queue, task_name))
+        return dict(status)
+
+    def clear(self):
+        self._entries.clear()
+
+
+job_status_cache = JobStatusCache()
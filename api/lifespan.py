@@ -0,0 +1,118 @@
+"""Startup and shutdown of the API's clients and background tasks.
+
+Startup runs the independent steps concurrently: Firebase Admin credential
+lookup, Cloud Tasks (or local queue) clients, and Redis pools. Once Firebase
+is initialized it also prefetches the token signing certificates and opens
+every pooled gRPC channel, so the first requests after a scale-out do not
+pay for those connections. With a shared event broker, the job status feed
+then keeps this process's status cache in step with job events reported to
+other processes. A step that fails is logged and skipped rather
+than keeping the instance from serving; the health probes report it.
+Shutdown stops background tasks, then drains the queue backend and the
+Firebase Admin executor for up to ``LIFESPAN_DRAIN_TIMEOUT_SECONDS``.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from prometheus_client import Gauge
+
+from api.firebase_executor import firebase_executor, initialize_firebase
+from api.health import health_monitor
+from api.job_events import job_event_broker, job_status_feed
+from api.task_queue import get_queue_backend, start_queue_backend, stop_queue_backend
+from api.token_cache import certificate_prefetcher
+
+logger = logging.getLogger(__name__)
+
+LIFESPAN_STEP_TIMEOUT_SECONDS = float(os.getenv("LIFESPAN_STEP_TIMEOUT_SECONDS", "20"))
+LIFESPAN_DRAIN_TIMEOUT_SECONDS = float(os.getenv("LIFESPAN_DRAIN_TIMEOUT_SECONDS", "10"))
+
+STARTUP_SECONDS = Gauge(
+    "api_startup_seconds",
+    "Time from the start of the lifespan handler until the app was ready to serve",
+)
+STARTUP_STEP_SECONDS = Gauge(
+    "api_startup_step_seconds",
+    "Time spent in each startup step",
+    ["step"],
+)
+
+
+async def _step(name: str, coro):
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(coro, LIFESPAN_STEP_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning("Startup step %s failed: %s", name, e)
+    finally:
+        STARTUP_STEP_SECONDS.labels(step=name).set(time.perf_counter() - started)
+
+
+async def _start_firebase():
+    await asyncio.get_event_loop().run_in_executor(None, initialize_firebase)
+    # Certificates come after initialization: the fetch uses the app's verifier.
+    fetched = await certificate_prefetcher.refresh()
+    interval = certificate_prefetcher.interval
+    # Retry a failed fetch soon rather than after the full refresh interval.
+    certificate_prefetcher.start(delay=interval if fetched else min(30.0, interval))
+
+
+async def _start_queue():
+    queue = await start_queue_backend()
+    if queue is not None:
+        await queue.warm()
+
+
+async def _warm_redis():
+    from api.routers.auth import profile_cache
+    from api.routers.jobs import submit_limits
+
+    clients = [
+        client for client in (
+            profile_cache.shared,
+            getattr(job_event_broker, "client", None),
+            getattr(submit_limits, "client", None),
+        )
+        if client is not None and hasattr(client, "ping")
+    ]
+    await asyncio.gather(*(client.ping() for client in clients))
+
+
+async def _drain(name: str, coro):
+    try:
+        await asyncio.wait_for(coro, LIFESPAN_DRAIN_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning("Shutdown step %s did not finish cleanly: %s", name, e)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    started = time.perf_counter()
+    await asyncio.gather(
+        _step("firebase", _start_firebase()),
+        _step("queue", _start_queue()),
+        _step("redis", _warm_redis()),
+    )
+    # Started after the queue backend so the first queue probe finds it.
+    health_monitor.start()
+    job_status_feed.start()
+    elapsed = time.perf_counter() - started
+    STARTUP_SECONDS.set(elapsed)
+    logger.info("API ready in %.3fs", elapsed)
+
+    yield
+
+    await health_monitor.stop()
+    await job_status_feed.stop()
+    await certificate_prefetcher.stop()
+    if get_queue_backend() is not None:
+        await _drain("queue", stop_queue_backend())
+    await _drain("job_events", job_event_broker.close())
+    # Let in-flight Firebase Admin calls finish instead of abandoning them.
+    await _drain(
+        "firebase",
+        asyncio.get_event_loop().run_in_executor(None, firebase_executor.shutdown, True),
+    )
@@ -0,0 +1,234 @@
+"""In-process job queue that runs tasks through worker/main.py.
+
+Replaces Cloud Tasks in development and benchmarks: submitted tasks are
+persisted to SQLite and delivered by asyncio consumers straight to the
+worker's ``handle_job``, so submit -> process -> callback runs on one box
+without network access or Google Cloud credentials.
+"""
+import asyncio
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from api.job_events import publish_job_event
+from api.job_scheduler import DEFAULT_PRIORITY, PRIORITY_CLASSES
+from api.task_queue import QueueBackend, TaskNotFound
+
+logger = logging.getLogger(__name__)
+
+LOCAL_QUEUE_DB = os.getenv("LOCAL_QUEUE_DB", ":memory:")
+LOCAL_QUEUE_CONCURRENCY = int(os.getenv("LOCAL_QUEUE_CONCURRENCY", "4"))
+LOCAL_QUEUE_MAX_ATTEMPTS = int(os.getenv("LOCAL_QUEUE_MAX_ATTEMPTS", "3"))
+LOCAL_QUEUE_RETRY_DELAY_SECONDS = float(os.getenv("LOCAL_QUEUE_RETRY_DELAY_SECONDS", "0.5"))
+LOCAL_QUEUE_WORKER_PATH = os.getenv(
+    "LOCAL_QUEUE_WORKER_PATH",
+    str(Path(__file__).resolve().parent.parent / "worker" / "main.py"),
+)
+
+
+def load_worker_module(path: str = LOCAL_QUEUE_WORKER_PATH):
+    """Import the worker entrypoint the same way functions-framework does."""
+    module = sys.modules.get("dg_worker_main")
+    if module is not None:
+        return module
+    source = Path(path).resolve()
+    spec = importlib.util.spec_from_file_location("dg_worker_main", str(source))
+    module = importlib.util.module_from_spec(spec)
+    # Sibling modules of the worker are imported as top-level names.
+    if str(source.parent) not in sys.path:
+        sys.path.append(str(source.parent))
+    sys.modules["dg_worker_main"] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules["dg_worker_main"]
+        raise
+    return module
+
+
+class LocalQueueBackend(QueueBackend):
+    """SQLite-backed task table drained by asyncio consumers."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        db_path: str = LOCAL_QUEUE_DB,
+        concurrency: int = LOCAL_QUEUE_CONCURRENCY,
+        max_attempts: int = LOCAL_QUEUE_MAX_ATTEMPTS,
+        retry_delay: float = LOCAL_QUEUE_RETRY_DELAY_SECONDS,
+        dispatch_deadline: Optional[float] = None,
+        worker=None,
+    ):
+        self.db_path = db_path
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.dispatch_deadline = dispatch_deadline
+        self.worker = worker
+        self._db: Optional[sqlite3.Connection] = None
+        # sqlite3 connections are not safe to share across threads, so every
+        # statement runs on this single thread.
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-queue-db")
+        # Ordered by priority class, then submission order.
+        self._pending: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._consumers: List[asyncio.Task] = []
+
+    async def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        def run():
+            with self._db:
+                return self._db.execute(sql, params).fetchall()
+        return await asyncio.get_event_loop().run_in_executor(self._db_executor, run)
+
+    async def start(self):
+        if self.worker is None:
+            self.worker = load_worker_module()
+
+        def connect():
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " name TEXT PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, create_time REAL NOT NULL,"
+                " schedule_time REAL NOT NULL, result TEXT, error TEXT)"
+            )
+            return db
+        self._db = await asyncio.get_event_loop().run_in_executor(self._db_executor, connect)
+
+        self._pending = asyncio.PriorityQueue()
+        # Tasks left unfinished by a previous process are redelivered, matching
+        # Cloud Tasks' at-least-once semantics; delayed tasks and retries in
+        # backoff keep whatever is left of their delay.
+        now = time.time()
+        for name, payload, schedule_time in await self._execute(
+            "SELECT name, payload, schedule_time FROM tasks WHERE status IN ('QUEUED', 'RUNNING')"
+            " ORDER BY schedule_time"
+        ):
+            priority = json.loads(payload).get("priority", DEFAULT_PRIORITY)
+            delay = schedule_time - now
+            if delay > 0:
+                asyncio.get_event_loop().call_later(delay, self._push, name, priority)
+            else:
+                self._push(name, priority)
+        self._consumers = [
+            asyncio.get_event_loop().create_task(self._consume()) for _ in range(max(1, self.concurrency))
+        ]
+
+    def _push(self, task_name: str, priority: str):
+        rank = PRIORITY_CLASSES.index(priority) if priority in PRIORITY_CLASSES else len(PRIORITY_CLASSES)
+        self._pending.put_nowait((rank, next(self._sequence), task_name))
+
+    async def create_task(self, payload: Dict[str, Any], priority: str = DEFAULT_PRIORITY, delay: float = 0.0) -> str:
+        task_name = f"local/tasks/{uuid.uuid4().hex}"
+        now = time.time()
+        await self._execute(
+            "INSERT INTO tasks (name, payload, status, create_time, schedule_time) VALUES (?, ?, 'QUEUED', ?, ?)",
+            (task_name, json.dumps(dict(
+                payload, task_name=task_name, priority=priority, dispatch_deadline_seconds=self.dispatch_deadline
+            )), now, now + delay),
+        )
+        if delay > 0:
+            asyncio.get_event_loop().call_later(delay, self._push, task_name, priority)
+        else:
+            self._push(task_name, priority)
+        return task_name
+
+    async def get_task(self, task_name: str) -> Dict[str, Any]:
+        rows = await self._execute(
+            "SELECT status, create_time, schedule_time FROM tasks WHERE name = ?", (task_name,)
+        )
+        if not rows:
+            raise TaskNotFound(task_name)
+        status, create_time, schedule_time = rows[0]
+        return {
+            "status": status,
+            "create_time": datetime.fromtimestamp(create_time, timezone.utc),
+            "schedule_time": datetime.fromtimestamp(schedule_time, timezone.utc)
+        }
+
+    async def ping(self):
+        if self._db is None:
+            raise RuntimeError("Local queue has not been started")
+        await self._execute("SELECT 1")
+        if self._consumers and all(consumer.done() for consumer in self._consumers):
+            raise RuntimeError("Local queue consumers have stopped")
+
+    async def _consume(self):
+        while True:
+            _, _, task_name = await self._pending.get()
+            try:
+                await self._dispatch(task_name)
+            except Exception as e:
+                logger.exception("Local queue failed to dispatch %s: %s", task_name, e)
+            finally:
+                self._pending.task_done()
+
+    async def _dispatch(self, task_name: str):
+        rows = await self._execute("SELECT payload, attempts FROM tasks WHERE name = ?", (task_name,))
+        if not rows:
+            return
+        payload, attempts = rows[0]
+        payload = json.loads(payload)
+        user_id = payload.get("user_id")
+        priority = payload.get("priority", DEFAULT_PRIORITY)
+        attempts += 1
+        await self._execute(
+            "UPDATE tasks SET status = 'RUNNING', attempts = ? WHERE name = ?", (attempts, task_name)
+        )
+        await publish_job_event(user_id, task_name, "RUNNING", attempt=attempts)
+
+        try:
+            # Like Cloud Tasks, abandon the attempt at the dispatch deadline;
+            # the cancellation reaches the job on the worker's engine loop.
+            body, status_code = await asyncio.wait_for(self.worker.handle_job(payload), self.dispatch_deadline)
+        except asyncio.TimeoutError:
+            body, status_code = {"error": f"Dispatch deadline of {self.dispatch_deadline}s exceeded"}, 504
+        except Exception as e:
+            body, status_code = {"error": str(e)}, 500
+
+        if status_code < 400:
+            await self._execute(
+                "UPDATE tasks SET status = 'SUCCEEDED', result = ?, error = NULL WHERE name = ?",
+                (json.dumps(body, default=str), task_name),
+            )
+            await publish_job_event(user_id, task_name, "SUCCEEDED", result=body.get("result"))
+        elif attempts < self.max_attempts and (status_code >= 500 or status_code == 429):
+            delay = self.retry_delay * (2 ** (attempts - 1))
+            await self._execute(
+                "UPDATE tasks SET status = 'QUEUED', schedule_time = ?, error = ? WHERE name = ?",
+                (time.time() + delay, json.dumps(body, default=str), task_name),
+            )
+            await publish_job_event(user_id, task_name, "QUEUED", error=body.get("error"), retry_in=delay)
+            asyncio.get_event_loop().call_later(delay, self._push, task_name, priority)
+        else:
+            await self._execute(
+                "UPDATE tasks SET status = 'FAILED', error = ? WHERE name = ?",
+                (json.dumps(body, default=str), task_name),
+            )
+            await publish_job_event(user_id, task_name, "FAILED", error=body.get("error"))
+
+    async def join(self):
+        """Wait until every queued task has been dispatched once."""
+        await self._pending.join()
+
+    async def close(self):
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        if self._db is not None:
+            await asyncio.get_event_loop().run_in_executor(self._db_executor, self._db.close)
+            self._db = None
+        self._db_executor.shutdown(wait=True)
@@ -1,22 +1,29 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from firebase_admin import initialize_app
-import firebase_admin
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from prometheus_fastapi_instrumentator import Instrumentator
 
+from api.compression import CompressionMiddleware
+from api.lifespan import lifespan
+from api.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from api.rate_limit import RATE_LIMIT_ENABLED, RateLimitMiddleware
+from api.serialization import ContentNegotiationMiddleware, NegotiatedResponse, negotiated_response
+
 app = FastAPI(
     title="DG Web API",
     description="FastAPI backend for DG Web Application",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson by default, msgpack for clients that send Accept: application/msgpack
+    default_response_class=NegotiatedResponse
 )
 
-# Initialize Firebase Admin SDK
-try:
-    firebase_app = initialize_app()
-except ValueError:
-    # App already initialized
-    firebase_app = firebase_admin.get_app()
+# Firebase Admin, queue clients and background tasks start in the lifespan
+# handler. Assigned on the router because FastAPI 0.85 has no lifespan argument.
+app.router.lifespan_context = lifespan
+
+# Throttle per uid (or client IP); added first so CORS headers wrap its 429s
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -27,25 +34,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ContentNegotiationMiddleware)
+# gzip/brotli for large and streaming responses; /metrics and /health are skipped
+app.add_middleware(CompressionMiddleware)
+
 # Add Prometheus metrics
 Instrumentator().instrument(app).expose(app)
 
-# Health check endpoint
+# Added last so it is outermost (including the Prometheus middleware) and
+# sampled traces cover every other middleware
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Liveness check; dependency status is served from cached probes under /health/deep
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 # Error handlers
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    return negotiated_response(
+        request,
+        {"detail": exc.detail},
+        status_code=exc.status_code,
+        headers=getattr(exc, "headers", None),
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    return JSONResponse(
+    return negotiated_response(
+        request,
+        {"detail": str(exc)},
         status_code=500,
-        content={"detail": str(exc)},
     )
 
 # Import routers
-from api.routers import auth, jobs
+from api.routers import auth, health, jobs
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+app.include_router(health.monitor_router, tags=["Health"])
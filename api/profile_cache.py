@@ -0,0 +1,171 @@
+"""Read-through cache for Firebase user profiles."""
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from prometheus_client import Counter
+
+from api.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CACHE_MAX_SIZE = int(os.getenv("PROFILE_CACHE_MAX_SIZE", "10000"))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+PROFILE_CACHE_REDIS_URL = os.getenv("PROFILE_CACHE_REDIS_URL")
+
+PROFILE_CACHE_LOOKUPS = Counter(
+    "api_profile_cache_lookups_total",
+    "User profile cache lookups by where the profile came from",
+    ["result"],
+)
+PROFILE_CACHE_EVICTIONS = Counter(
+    "api_profile_cache_evictions_total",
+    "User profiles evicted from the in-process cache",
+    ["reason"],
+)
+
+Profile = Dict[str, Any]
+
+
+class InMemorySharedTier:
+    """Process-local stand-in for the Redis commands the profile cache uses.
+
+    Exposes the same ``get``/``set``/``delete`` coroutine signatures as
+    ``redis.asyncio.Redis`` so tests and single-box setups can run without a
+    Redis server.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], str]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and time.time() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ex: Optional[float] = None):
+        self._data[key] = (time.time() + ex if ex else None, value)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+
+def shared_tier_from_env():
+    """Return a Redis client for PROFILE_CACHE_REDIS_URL, or None."""
+    if not PROFILE_CACHE_REDIS_URL:
+        return None
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        logger.warning("PROFILE_CACHE_REDIS_URL is set but the redis package is not installed; "
+                       "using the in-process profile cache only")
+        return None
+    return redis.from_url(PROFILE_CACHE_REDIS_URL, decode_responses=True)
+
+
+class ProfileCache:
+    """LRU+TTL profile cache with single-flight loading.
+
+    Concurrent lookups for the same uid share one call to ``loader``. An
+    optional shared tier (anything with Redis' async get/set/delete) sits
+    between the local LRU and the loader so several workers can share
+    results.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[Profile]],
+        max_size: int = PROFILE_CACHE_MAX_SIZE,
+        ttl: float = PROFILE_CACHE_TTL_SECONDS,
+        shared=None,
+        namespace: str = "dg:profile:",
+    ):
+        self._loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = shared
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, Tuple[float, Profile]]" = OrderedDict()
+        self._flights = SingleFlight()
+
+    def _get_local(self, uid: str) -> Optional[Profile]:
+        entry = self._entries.get(uid)
+        if entry is None:
+            return None
+        expires_at, profile = entry
+        if time.time() >= expires_at:
+            del self._entries[uid]
+            PROFILE_CACHE_EVICTIONS.labels(reason="expired").inc()
+            return None
+        self._entries.move_to_end(uid)
+        return profile
+
+    def _store_local(self, uid: str, profile: Profile):
+        if self.max_size <= 0:
+            return
+        self._entries[uid] = (time.time() + self.ttl, profile)
+        self._entries.move_to_end(uid)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            PROFILE_CACHE_EVICTIONS.labels(reason="size").inc()
+
+    async def _get_shared(self, uid: str) -> Optional[Profile]:
+        try:
+            raw = await self.shared.get(self.namespace + uid)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning("Shared profile cache read failed: %s", e)
+            return None
+
+    async def _set_shared(self, uid: str, profile: Profile):
+        try:
+            await self.shared.set(self.namespace + uid, json.dumps(profile), ex=self.ttl)
+        except Exception as e:
+            logger.warning("Shared profile cache write failed: %s", e)
+
+    async def _load(self, uid: str) -> Profile:
+        profile = await self._get_shared(uid) if self.shared is not None else None
+        if profile is not None:
+            PROFILE_CACHE_LOOKUPS.labels(result="shared_hit").inc()
+        else:
+            PROFILE_CACHE_LOOKUPS.labels(result="miss").inc()
+            profile = await self._loader(uid)
+            if self.shared is not None and self._flights.is_current(uid):
+                await self._set_shared(uid, profile)
+        # An invalidate() during the load detaches it; its result still
+        # answers the callers already waiting, but is not cached.
+        if self._flights.is_current(uid):
+            self._store_local(uid, profile)
+        return profile
+
+    async def get(self, uid: str) -> Profile:
+        profile = self._get_local(uid)
+        if profile is not None:
+            PROFILE_CACHE_LOOKUPS.labels(result="hit").inc()
+            return dict(profile)
+
+        if uid in self._flights:
+            PROFILE_CACHE_LOOKUPS.labels(result="coalesced").inc()
+        profile, _ = await self._flights.do(uid, lambda: self._load(uid))
+        return dict(profile)
+
+    async def invalidate(self, uid: str):
+        self._entries.pop(uid, None)
+        self._flights.forget(uid)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(self.namespace + uid)
+            except Exception as e:
+                logger.warning("Shared profile cache delete failed: %s", e)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,304 @@
+"""Sampled request profiling.
+
+``ProfilingMiddleware`` traces a random ``PROFILING_SAMPLE_RATE`` fraction of
+requests. A trace records span timings for the request phases:
+
+* ``dependencies``: FastAPI resolving the route's dependencies (token
+  verification, rate limits, ...)
+* ``handler``: the endpoint function itself
+* ``serialize``: FastAPI validating and encoding the return value
+* ``response``: from the handler returning until the last body byte is sent
+  (rendering, outer middleware, compression)
+
+plus any ``span()`` blocks entered while the request runs, such as Firebase
+Admin calls and Cloud Tasks submissions. While a sampled request is in flight
+a background thread samples every thread's Python stack; if the request turns
+out slower than ``PROFILING_SLOW_MS`` the samples are kept as collapsed stacks
+(``thread;frame;frame count`` lines, readable by flamegraph.pl and
+speedscope). Samples cover the whole process, so concurrent requests show up
+in each other's profiles. Stack sampling for a request stops after
+``PROFILING_MAX_SAMPLE_SECONDS`` so long-lived responses don't accumulate
+samples without bound; paths under ``PROFILING_EXCLUDED_PATHS`` (including the
+``/jobs/events`` SSE stream) are never traced.
+
+Each trace is written as JSON to ``PROFILING_TRACE_DIR``, with a ``.folded``
+file next to it for slow requests; the oldest files are removed beyond
+``PROFILING_MAX_TRACES``.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+PROFILING_SLOW_MS = float(os.getenv("PROFILING_SLOW_MS", "500"))
+PROFILING_STACK_INTERVAL_MS = float(os.getenv("PROFILING_STACK_INTERVAL_MS", "5"))
+PROFILING_TRACE_DIR = os.getenv("PROFILING_TRACE_DIR", "/tmp/api-traces")
+PROFILING_MAX_TRACES = int(os.getenv("PROFILING_MAX_TRACES", "1000"))
+PROFILING_MAX_SAMPLE_SECONDS = float(os.getenv("PROFILING_MAX_SAMPLE_SECONDS", "30"))
+PROFILING_EXCLUDED_PATHS = tuple(
+    path for path in os.getenv("PROFILING_EXCLUDED_PATHS", "/metrics,/health,/jobs/events").split(",") if path
+)
+
+REQUEST_PHASE_SECONDS = Histogram(
+    "api_request_phase_seconds",
+    "Time spent in each phase of sampled requests",
+    ["phase"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("request_trace", default=None)
+
+# Phases recorded as histograms; other spans only go to the trace file.
+PHASES = ("dependencies", "handler", "serialize", "response")
+
+
+class RequestTrace:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.handler_end: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.stacks: StackCounter = StackCounter()
+        self.sampling_capped = False
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            if name == "handler":
+                self.handler_end = end
+            # list.append is atomic, so spans from sync dependencies running
+            # on threadpool threads need no lock.
+            self.spans.append({
+                "name": name,
+                "start_ms": round((start - self.started) * 1000, 3),
+                "duration_ms": round((end - start) * 1000, 3)
+            })
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as part of the current request's trace, if it is sampled."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+class StackSampler:
+    """One thread sampling every thread's stack while any trace is active.
+
+    A trace is dropped from sampling once it has run for ``max_seconds``.
+    """
+
+    def __init__(self, interval: float, max_seconds: float = PROFILING_MAX_SAMPLE_SECONDS):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._active: Dict[str, RequestTrace] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, trace: RequestTrace):
+        with self._lock:
+            self._active[trace.id] = trace
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, trace: RequestTrace):
+        with self._lock:
+            self._active.pop(trace.id, None)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                now = time.perf_counter()
+                for trace in list(self._active.values()):
+                    if now - trace.started >= self.max_seconds:
+                        trace.sampling_capped = True
+                        del self._active[trace.id]
+                if not self._active:
+                    self._thread = None
+                    return
+                traces = list(self._active.values())
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                folded = ";".join(reversed(stack))
+                for trace in traces:
+                    trace.stacks[folded] += 1
+
+
+def _instrument_fastapi():
+    """Time FastAPI's dependency, endpoint and serialization steps for sampled requests.
+
+    ``fastapi.routing``'s request handler looks these functions up as module
+    globals on every call, so wrapping them there covers every route.
+    """
+    import fastapi.routing
+
+    for attr, phase in (("solve_dependencies", "dependencies"),
+                        ("run_endpoint_function", "handler"),
+                        ("serialize_response", "serialize")):
+        original = getattr(fastapi.routing, attr)
+        if getattr(original, "__profiled__", False):
+            continue
+
+        def wrap(fn, phase):
+            @functools.wraps(fn)
+            async def timed(*args, **kwargs):
+                trace = _current_trace.get()
+                if trace is None:
+                    return await fn(*args, **kwargs)
+                with trace.span(phase):
+                    return await fn(*args, **kwargs)
+            timed.__profiled__ = True
+            return timed
+
+        setattr(fastapi.routing, attr, wrap(original, phase))
+
+
+class TraceWriter:
+    def __init__(self, directory: str = PROFILING_TRACE_DIR, max_traces: int = PROFILING_MAX_TRACES):
+        self.directory = Path(directory)
+        self.max_traces = max_traces
+
+    def write(self, record: Dict[str, Any], stacks: Optional[StackCounter]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(record['started_at']))}-{record['id']}"
+        if stacks:
+            folded = self.directory / f"{stem}.folded"
+            folded.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.most_common()))
+            record["stack_file"] = folded.name
+        (self.directory / f"{stem}.json").write_text(json.dumps(record, indent=2))
+        self._rotate()
+
+    def _rotate(self):
+        traces = sorted(self.directory.glob("*.json"))
+        for old in traces[:max(0, len(traces) - self.max_traces)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".folded").unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware tracing a sample of requests; add it outermost."""
+
+    def __init__(
+        self,
+        app,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        slow_ms: float = PROFILING_SLOW_MS,
+        stack_interval_ms: float = PROFILING_STACK_INTERVAL_MS,
+        max_sample_seconds: float = PROFILING_MAX_SAMPLE_SECONDS,
+        writer: Optional[TraceWriter] = None,
+        excluded_paths=PROFILING_EXCLUDED_PATHS,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.sampler = (StackSampler(stack_interval_ms / 1000, max_sample_seconds)
+                        if stack_interval_ms > 0 else None)
+        self.writer = writer or TraceWriter()
+        self.excluded_paths = tuple(excluded_paths)
+        _instrument_fastapi()
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or self._excluded(scope["path"])
+                or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope.get("method", ""), scope["path"])
+        status_code = None
+
+        async def send_traced(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = _current_trace.set(trace)
+        if self.sampler is not None:
+            self.sampler.add(trace)
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            finished = time.perf_counter()
+            _current_trace.reset(token)
+            if self.sampler is not None:
+                self.sampler.remove(trace)
+            self._record(trace, scope, status_code, finished)
+
+    def _excluded(self, path: str) -> bool:
+        return any(path == excluded or path.startswith(excluded.rstrip("/") + "/")
+                   for excluded in self.excluded_paths)
+
+    def _record(self, trace: RequestTrace, scope, status_code: Optional[int], finished: float):
+        if trace.handler_end is not None:
+            trace.spans.append({
+                "name": "response",
+                "start_ms": round((trace.handler_end - trace.started) * 1000, 3),
+                "duration_ms": round((finished - trace.handler_end) * 1000, 3)
+            })
+        for entry in trace.spans:
+            if entry["name"] in PHASES:
+                REQUEST_PHASE_SECONDS.labels(phase=entry["name"]).observe(entry["duration_ms"] / 1000)
+
+        duration_ms = (finished - trace.started) * 1000
+        slow = duration_ms >= self.slow_ms
+        route = scope.get("route")
+        record = {
+            "id": trace.id,
+            "started_at": trace.started_at,
+            "method": trace.method,
+            "path": trace.path,
+            "route": getattr(route, "path", None),
+            "status_code": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "slow": slow,
+            "stack_sampling_capped": trace.sampling_capped,
+            "spans": sorted(trace.spans, key=lambda entry: entry["start_ms"])
+        }
+        stacks = trace.stacks if slow else None
+        # File writes stay off the event loop.
+        future = asyncio.get_event_loop().run_in_executor(None, self.writer.write, record, stacks)
+        future.add_done_callback(_log_write_failure)
+
+
+def _log_write_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Failed to write request trace: %s", future.exception())
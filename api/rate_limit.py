@@ -0,0 +1,254 @@
+"""Token-bucket rate limiting for the API.
+
+``RateLimitMiddleware`` throttles every request under a rule's path prefix.
+Requests whose bearer token has already been verified (it is in the token
+cache) are keyed on the token's uid. Everything else is keyed on the client
+IP, so unverified or forged tokens cannot claim somebody else's bucket or
+get a fresh one. Buckets live in process memory unless
+``RATE_LIMIT_REDIS_URL`` points at a Redis shared by every API process.
+"""
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+from prometheus_client import Counter
+from starlette.datastructures import Headers
+from starlette.routing import Match
+
+from api.serialization import NegotiatedResponse, negotiate
+from api.token_cache import token_cache
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_EXEMPT_PATHS = tuple(
+    path for path in os.getenv("RATE_LIMIT_EXEMPT_PATHS", "/health,/metrics,/jobs/events").split(",") if path
+)
+# Proxies in front of the app that append to X-Forwarded-For (1 on Cloud Run);
+# 0 trusts only the socket peer address.
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "1"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "api_rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    ["route", "key_type"],
+)
+RATE_LIMIT_STORE_ERRORS = Counter(
+    "api_rate_limit_store_errors_total",
+    "Shared rate-limit store failures (requests were allowed)",
+)
+
+
+def _take(state: Optional[Tuple[float, float]], now: float, rate: float, burst: float, cost: float):
+    """Refill a (tokens, updated) bucket and try to take ``cost`` tokens.
+
+    Returns the new state and 0, or the new state and the seconds until
+    ``cost`` tokens will be available.
+    """
+    tokens, updated = state if state is not None else (burst, now)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        return (tokens - cost, now), 0.0
+    return (tokens, now), (cost - tokens) / rate
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets, one per key, refilled at ``rate`` per second.
+
+    Buckets idle long enough to be full again are indistinguishable from new
+    ones, so the least recently used are dropped beyond ``max_keys``.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: str, cost: float = 1.0, rate: Optional[float] = None, burst: Optional[float] = None) -> float:
+        """Take ``cost`` tokens; return 0 if allowed, else seconds until it would be."""
+        rate = self.rate if rate is None else rate
+        burst = self.burst if burst is None else burst
+        if rate <= 0:
+            return 0.0
+        self._buckets[key], retry_after = _take(self._buckets.get(key), time.monotonic(), rate, burst, cost)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class MemoryRateLimitStore:
+    """Per-process buckets; each API process enforces its own limits."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self._limiter = TokenBucketLimiter(0.0, 0.0, max_keys)
+
+    async def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        return self._limiter.acquire(key, cost, rate=rate, burst=burst)
+
+
+# Atomic refill-and-take against a Redis hash, timed by the Redis clock so
+# API processes with skewed clocks agree. Returns the wait as a string
+# because Lua numbers are truncated to integers on the way out.
+_REDIS_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitStore:
+    """Buckets shared through Redis; falls back to allowing on Redis errors."""
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_REDIS_TAKE)
+
+    async def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        try:
+            return float(await self._script(keys=[self.prefix + key], args=[rate, burst, cost]))
+        except Exception as e:
+            # Throttling is a cost control, not a security boundary: fail open.
+            RATE_LIMIT_STORE_ERRORS.inc()
+            logger.warning("Rate limit store unavailable, allowing request: %s", e)
+            return 0.0
+
+
+def store_from_env():
+    if RATE_LIMIT_REDIS_URL:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; "
+                           "using per-process rate limits")
+        else:
+            return RedisRateLimitStore(redis.from_url(RATE_LIMIT_REDIS_URL, decode_responses=True))
+    return MemoryRateLimitStore()
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    path_prefix: str
+    rate: float
+    burst: float
+
+    @classmethod
+    def from_env(cls, name: str, path_prefix: str, rate: float, burst: float) -> "RateLimitRule":
+        return cls(
+            name=name,
+            path_prefix=path_prefix,
+            rate=float(os.getenv(f"RATE_LIMIT_{name.upper()}_RATE", str(rate))),
+            burst=float(os.getenv(f"RATE_LIMIT_{name.upper()}_BURST", str(burst))),
+        )
+
+
+def default_rules() -> Tuple[RateLimitRule, ...]:
+    # /auth calls cost a Firebase round trip on a cache miss; /jobs calls
+    # create Cloud Tasks or read their status.
+    return (
+        RateLimitRule.from_env("auth", "/auth/", rate=5, burst=20),
+        RateLimitRule.from_env("jobs", "/jobs/", rate=20, burst=60),
+    )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with ``Retry-After`` once a bucket is empty."""
+
+    def __init__(
+        self,
+        app,
+        rules: Optional[Iterable[RateLimitRule]] = None,
+        store=None,
+        exempt_paths: Iterable[str] = RATE_LIMIT_EXEMPT_PATHS,
+        trusted_proxies: int = RATE_LIMIT_TRUSTED_PROXIES,
+    ):
+        self.app = app
+        self.rules = tuple(rules) if rules is not None else default_rules()
+        self.store = store or store_from_env()
+        self.exempt_paths = tuple(exempt_paths)
+        self.trusted_proxies = trusted_proxies
+
+    def _rule_for(self, path: str) -> Optional[RateLimitRule]:
+        if path in self.exempt_paths:
+            return None
+        for rule in self.rules:
+            if path.startswith(rule.path_prefix):
+                return rule
+        return None
+
+    def _client_ip(self, scope, headers: Headers) -> str:
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded and self.trusted_proxies > 0:
+            hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+            if hops:
+                # Entries left of the ones our proxies appended are client-supplied.
+                return hops[max(0, len(hops) - self.trusted_proxies)]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _key(self, scope, headers: Headers) -> Tuple[str, str]:
+        scheme, _, credentials = headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and credentials:
+            decoded = token_cache.peek(credentials)
+            if decoded is not None and decoded.get("uid"):
+                return "uid", f"uid:{decoded['uid']}"
+        return "ip", f"ip:{self._client_ip(scope, headers)}"
+
+    @staticmethod
+    def _route_label(scope) -> str:
+        # Label by route template rather than raw path to bound cardinality.
+        app = scope.get("app")
+        for route in getattr(getattr(app, "router", None), "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        rule = self._rule_for(scope["path"])
+        if rule is None or rule.rate <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        key_type, key = self._key(scope, headers)
+        retry_after = await self.store.acquire(f"{rule.name}:{key}", rule.rate, rule.burst)
+        if retry_after <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMIT_REJECTIONS.labels(route=self._route_label(scope), key_type=key_type).inc()
+        response = NegotiatedResponse(
+            {"detail": "Too many requests"},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            media_type=negotiate(headers.get("accept")),
+        )
+        await response(scope, receive, send)
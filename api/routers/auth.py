@@ -3,16 +3,44 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from firebase_admin import auth
 from pydantic import BaseModel
 
+from api.firebase_executor import FirebaseAdminUnavailable, firebase_executor
+from api.profile_cache import ProfileCache, shared_tier_from_env
+from api.token_cache import token_cache
+
 router = APIRouter()
 security = HTTPBearer()
 
 class UserToken(BaseModel):
     token: str
 
+async def _verify_id_token(id_token: str) -> dict:
+    decoded_token = token_cache.get(id_token)
+    if decoded_token is None:
+        decoded_token = await firebase_executor.run("verify_id_token", auth.verify_id_token, id_token)
+        token_cache.put(id_token, decoded_token)
+    return decoded_token
+
+async def _load_user_profile(uid: str) -> dict:
+    user = await firebase_executor.run("get_user", auth.get_user, uid)
+    return {
+        "uid": user.uid,
+        "email": user.email,
+        "display_name": user.display_name,
+        "photo_url": user.photo_url,
+        "email_verified": user.email_verified
+    }
+
+profile_cache = ProfileCache(_load_user_profile, shared=shared_tier_from_env())
+
 async def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     try:
-        decoded_token = auth.verify_id_token(credentials.credentials)
+        decoded_token = await _verify_id_token(credentials.credentials)
         return decoded_token
+    except FirebaseAdminUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Authentication service unavailable: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=401,
@@ -22,12 +50,17 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Security(secu
 @router.post("/verify")
 async def verify_firebase_token(token: UserToken):
     try:
-        decoded_token = auth.verify_id_token(token.token)
+        decoded_token = await _verify_id_token(token.token)
         return {
             "uid": decoded_token["uid"],
             "email": decoded_token.get("email"),
             "email_verified": decoded_token.get("email_verified", False)
         }
+    except FirebaseAdminUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Authentication service unavailable: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=401,
@@ -37,16 +70,19 @@ async def verify_firebase_token(token: UserToken):
 @router.get("/user")
 async def get_user_info(token: dict = Depends(verify_token)):
     try:
-        user = auth.get_user(token["uid"])
-        return {
-            "uid": user.uid,
-            "email": user.email,
-            "display_name": user.display_name,
-            "photo_url": user.photo_url,
-            "email_verified": user.email_verified
-        }
+        return await profile_cache.get(token["uid"])
+    except FirebaseAdminUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"User service unavailable: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=404,
             detail=f"User not found: {str(e)}"
         )
+
+@router.delete("/user/cache")
+async def invalidate_user_cache(token: dict = Depends(verify_token)):
+    await profile_cache.invalidate(token["uid"])
+    return {"status": "invalidated", "uid": token["uid"]}
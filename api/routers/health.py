@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException
+
+from api.health import health_monitor
+from api.serialization import NegotiatedResponse
+
+router = APIRouter()
+# Unprefixed paths expected by scripts/monitor.py
+monitor_router = APIRouter()
+
+# Results a load balancer or uptime check should treat as serving.
+SERVING_STATUSES = ("ok", "degraded", "skipped")
+
+def probe_response(name: str) -> NegotiatedResponse:
+    if name not in health_monitor.probes:
+        raise HTTPException(status_code=404, detail=f"Unknown health probe: {name}")
+    result = health_monitor.probe_result(name)
+    return NegotiatedResponse(
+        dict(result, probe=name),
+        status_code=200 if result["status"] in SERVING_STATUSES else 503
+    )
+
+@router.get("/deep")
+async def deep_health():
+    """Cached results of every dependency probe; 503 when a critical one is failing."""
+    report = health_monitor.report()
+    return NegotiatedResponse(report, status_code=503 if report["status"] == "fail" else 200)
+
+@router.get("/check/")
+async def health_check_all():
+    return await deep_health()
+
+@router.get("/check/{probe}/")
+async def health_check_probe(probe: str):
+    return probe_response(probe)
+
+@monitor_router.get("/firebase-status/")
+async def firebase_status():
+    return probe_response("firebase")
@@ -1,93 +1,326 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from google.cloud import tasks_v2
-from google.auth.exceptions import DefaultCredentialsError
+from fastapi import APIRouter, Depends, Header, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from prometheus_client import Counter, Histogram
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
-import json
+from typing import Optional, Dict, Any, List
+import asyncio
+import hmac
+import math
 import os
+import time
 
+from api.job_events import format_sse, job_event_broker, publish_job_event, user_topic
+from api.job_scheduler import JOB_TYPES, BacklogFull, fair_share_scheduler, resolve_priority
+from api.job_status import job_status_cache
+from api.profiling import span
+from api.rate_limit import store_from_env
+from api.serialization import NegotiatedResponse
 from api.routers.auth import verify_token
+from api.task_queue import TERMINAL_STATUSES, QueueBackend, TaskNotFound, get_queue_backend
 
 router = APIRouter()
 
-# Initialize Cloud Tasks client with error handling
-try:
-    client = tasks_v2.CloudTasksClient()
-except DefaultCredentialsError:
-    print("Warning: Google Cloud credentials not found. Job submission will be disabled.")
-    client = None
+JOBS_BATCH_MAX_SIZE = int(os.getenv("JOBS_BATCH_MAX_SIZE", "1000"))
+JOBS_BATCH_CONCURRENCY = int(os.getenv("JOBS_BATCH_CONCURRENCY", "32"))
+JOBS_STATUS_BATCH_MAX_SIZE = int(os.getenv("JOBS_STATUS_BATCH_MAX_SIZE", "500"))
+JOB_EVENTS_TOKEN = os.getenv("JOB_EVENTS_TOKEN")
+JOB_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("JOB_EVENTS_HEARTBEAT_SECONDS", "15"))
+# Jobs each user may submit per second, and burst. A batch costs one token per
+# job, so the burst is also the largest batch a user can send.
+JOBS_SUBMIT_RATE_PER_USER = float(os.getenv("JOBS_SUBMIT_RATE_PER_USER", "20"))
+JOBS_SUBMIT_BURST_PER_USER = float(os.getenv("JOBS_SUBMIT_BURST_PER_USER", str(JOBS_BATCH_MAX_SIZE)))
+
+# Shared across API processes when RATE_LIMIT_REDIS_URL is set.
+submit_limits = store_from_env()
+
+BATCH_ITEMS = Counter(
+    "api_jobs_batch_items_total",
+    "Jobs submitted through /jobs/submit-batch",
+    ["outcome"],
+)
+BATCH_SIZE = Histogram(
+    "api_jobs_batch_size",
+    "Number of jobs per /jobs/submit-batch request",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+BATCH_SECONDS = Histogram(
+    "api_jobs_batch_seconds",
+    "Wall time to fan out one /jobs/submit-batch request",
+)
+SUBMIT_REJECTED = Counter(
+    "api_jobs_submit_rejected_total",
+    "Job submissions refused before reaching the queue",
+    ["reason"],
+)
 
 class JobRequest(BaseModel):
     job_type: str
     params: Dict[str, Any]
     callback_url: Optional[str] = None
+    # interactive, standard or bulk; defaults by job type and may only be lowered.
+    priority: Optional[str] = None
+
+class JobStatusBatchRequest(BaseModel):
+    task_names: List[str]
 
-def create_cloud_task(job_request: JobRequest, user_id: str):
-    if client is None:
+class JobEventReport(BaseModel):
+    task_name: str
+    user_id: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+def get_queue() -> QueueBackend:
+    queue = get_queue_backend()
+    if queue is None:
         raise HTTPException(
             status_code=503,
             detail="Job submission is currently disabled. Google Cloud credentials not configured."
         )
-    project = os.getenv("GOOGLE_CLOUD_PROJECT")
-    queue = os.getenv("CLOUD_TASKS_QUEUE")
-    location = os.getenv("CLOUD_TASKS_LOCATION", "us-central1")
-    service_url = os.getenv("CLOUD_RUN_SERVICE_URL")
-
-    parent = client.queue_path(project, location, queue)
-    
-    task = {
-        "http_request": {
-            "http_method": tasks_v2.HttpMethod.POST,
-            "url": f"{service_url}/process",
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({
+    return queue
+
+async def charge_submissions(user_id: str, jobs: int = 1):
+    """Take one submission token per job, or answer 429 with Retry-After."""
+    retry_after = await submit_limits.acquire(
+        f"submit:uid:{user_id}", JOBS_SUBMIT_RATE_PER_USER, JOBS_SUBMIT_BURST_PER_USER, cost=jobs
+    )
+    if retry_after:
+        SUBMIT_REJECTED.labels(reason="rate_limited").inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Too many job submissions",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+async def rate_limit_submissions(token: dict = Depends(verify_token)) -> dict:
+    await charge_submissions(token["uid"])
+    return token
+
+async def enqueue_job(queue: QueueBackend, job_request: JobRequest, user_id: str) -> Dict[str, Any]:
+    """Enqueue one job in its priority class, delayed by the user's fair share."""
+    if job_request.job_type not in JOB_TYPES:
+        raise ValueError(f"Unknown job type: {job_request.job_type} (expected one of {', '.join(JOB_TYPES)})")
+    priority = resolve_priority(job_request.job_type, job_request.priority)
+    delay = fair_share_scheduler.schedule(user_id, priority)
+    try:
+        with span(f"queue.{queue.name}.create_task"):
+            task_name = await queue.create_task({
                 "job_type": job_request.job_type,
                 "params": job_request.params,
                 "user_id": user_id,
                 "callback_url": job_request.callback_url
-            }).encode()
-        }
-    }
-
-    return client.create_task(request={"parent": parent, "task": task})
+            }, priority=priority, delay=delay)
+    except Exception:
+        fair_share_scheduler.release(user_id, priority)
+        raise
+    await publish_job_event(user_id, task_name, "QUEUED", job_type=job_request.job_type, priority=priority)
+    return {"task_name": task_name, "priority": priority, "scheduled_in_seconds": round(delay, 3)}
 
 @router.post("/submit")
 async def submit_job(
     job_request: JobRequest,
     background_tasks: BackgroundTasks,
-    token: dict = Depends(verify_token)
+    token: dict = Depends(rate_limit_submissions),
+    queue: QueueBackend = Depends(get_queue)
 ):
     try:
-        # Create a Cloud Task
-        task = create_cloud_task(job_request, token["uid"])
+        enqueued = await enqueue_job(queue, job_request, token["uid"])
         
         return {
             "status": "submitted",
-            "task_name": task.name,
-            "job_type": job_request.job_type
+            "job_type": job_request.job_type,
+            **enqueued
         }
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except BacklogFull as e:
+        SUBMIT_REJECTED.labels(reason="backlog_full").inc()
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to submit job: {str(e)}"
         )
 
-@router.get("/status/{task_name}")
+@router.post("/submit-batch")
+async def submit_job_batch(
+    job_requests: List[JobRequest],
+    token: dict = Depends(verify_token),
+    queue: QueueBackend = Depends(get_queue)
+):
+    if not job_requests:
+        raise HTTPException(status_code=422, detail="At least one job is required")
+    max_size = JOBS_BATCH_MAX_SIZE
+    if JOBS_SUBMIT_RATE_PER_USER > 0:
+        max_size = min(max_size, int(JOBS_SUBMIT_BURST_PER_USER))
+    if len(job_requests) > max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(job_requests)} jobs (max {max_size})"
+        )
+    await charge_submissions(token["uid"], len(job_requests))
+
+    semaphore = asyncio.Semaphore(JOBS_BATCH_CONCURRENCY)
+
+    async def submit_one(index: int, job_request: JobRequest) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                enqueued = await enqueue_job(queue, job_request, token["uid"])
+                BATCH_ITEMS.labels(outcome="submitted").inc()
+                return {
+                    "index": index,
+                    "status": "submitted",
+                    "job_type": job_request.job_type,
+                    **enqueued
+                }
+            except Exception as e:
+                BATCH_ITEMS.labels(outcome="failed").inc()
+                return {
+                    "index": index,
+                    "status": "failed",
+                    "error": str(e),
+                    "job_type": job_request.job_type
+                }
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(submit_one(index, job_request) for index, job_request in enumerate(job_requests))
+    )
+    elapsed = time.perf_counter() - start
+    BATCH_SIZE.observe(len(job_requests))
+    BATCH_SECONDS.observe(elapsed)
+
+    submitted = sum(1 for result in results if result["status"] == "submitted")
+    # Returned as a response so large batches skip jsonable_encoder.
+    return NegotiatedResponse({
+        "submitted": submitted,
+        "failed": len(results) - submitted,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "jobs_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        "results": results
+    })
+
+@router.get("/status/{task_name:path}")
 async def get_job_status(
     task_name: str,
-    token: dict = Depends(verify_token)
+    token: dict = Depends(verify_token),
+    queue: QueueBackend = Depends(get_queue)
 ):
     try:
-        # Get task status from Cloud Tasks
-        task = client.get_task(name=task_name)
-        
-        return {
-            "status": task.state.name,
-            "create_time": task.create_time,
-            "schedule_time": task.schedule_time
-        }
-    except Exception as e:
+        return NegotiatedResponse(await job_status_cache.get(queue, task_name))
+    except TaskNotFound as e:
         raise HTTPException(
             status_code=404,
             detail=f"Task not found: {str(e)}"
         )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get job status: {str(e)}"
+        )
+
+@router.post("/status:batch")
+async def get_job_status_batch(
+    status_request: JobStatusBatchRequest,
+    token: dict = Depends(verify_token),
+    queue: QueueBackend = Depends(get_queue)
+):
+    task_names = list(dict.fromkeys(status_request.task_names))
+    if len(task_names) > JOBS_STATUS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many task names: {len(task_names)} (max {JOBS_STATUS_BATCH_MAX_SIZE})"
+        )
+
+    semaphore = asyncio.Semaphore(JOBS_BATCH_CONCURRENCY)
+
+    async def status_of(task_name: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"task_name": task_name, **await job_status_cache.get(queue, task_name)}
+            except TaskNotFound:
+                return {"task_name": task_name, "error": "Task not found"}
+            except Exception as e:
+                return {"task_name": task_name, "error": str(e)}
+
+    return NegotiatedResponse({"results": await asyncio.gather(*(status_of(task_name) for task_name in task_names))})
+
+@router.get("/events")
+async def stream_job_events(
+    task_name: Optional[str] = None,
+    token: dict = Depends(verify_token)
+):
+    """Server-sent events for the caller's jobs, optionally for a single task.
+
+    A single-task stream starts with the task's current status and ends once
+    the task reaches a terminal state, or at once with an ``UNKNOWN`` event
+    when the queue no longer knows the task.
+    """
+    subscription = await job_event_broker.subscribe(user_topic(token["uid"]))
+
+    async def event_stream():
+        try:
+            yield format_sse(comment="connected")
+            if task_name:
+                queue = get_queue_backend()
+                try:
+                    current = await job_status_cache.get(queue, task_name) if queue else None
+                except TaskNotFound:
+                    # Cloud Tasks deletes finished tasks, so no further events
+                    # are coming; say so instead of keeping the stream open.
+                    yield format_sse({
+                        "task_name": task_name,
+                        "status": "UNKNOWN",
+                        "detail": "Task not found; it may have finished and been removed from the queue"
+                    })
+                    return
+                except Exception:
+                    current = None
+                if current is not None:
+                    yield format_sse({"task_name": task_name, **current})
+                    if current["status"] in TERMINAL_STATUSES:
+                        return
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), JOB_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield format_sse(comment="keep-alive")
+                    continue
+                if task_name and event["task_name"] != task_name:
+                    continue
+                yield format_sse(event)
+                if task_name and event["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            await subscription.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(subscription.close)
+    )
+
+@router.post("/events")
+async def report_job_event(
+    report: JobEventReport,
+    x_job_events_token: Optional[str] = Header(None)
+):
+    """Accept a job state transition reported by the worker."""
+    if not JOB_EVENTS_TOKEN or not x_job_events_token or not hmac.compare_digest(
+        x_job_events_token, JOB_EVENTS_TOKEN
+    ):
+        raise HTTPException(status_code=403, detail="Invalid job events token")
+    await publish_job_event(
+        report.user_id,
+        report.task_name,
+        report.status,
+        result=report.result,
+        error=report.error
+    )
+    return {"status": "accepted"}
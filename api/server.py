@@ -0,0 +1,133 @@
+"""Production launcher: gunicorn managing uvicorn workers.
+
+    python -m api.server
+
+One worker per available core by default (``WEB_CONCURRENCY`` overrides);
+each worker runs its own uvloop event loop and parses HTTP with httptools
+when those are installed. Firebase Admin is initialized once in the master
+before forking, so workers inherit the loaded credentials instead of each
+repeating the lookup.
+
+Signals are gunicorn's: ``HUP`` gracefully replaces every worker with one
+running freshly imported code, ``TERM`` drains in-flight requests for up to
+``WEB_GRACEFUL_TIMEOUT_SECONDS`` before exiting. With more than one worker,
+set ``PROMETHEUS_MULTIPROC_DIR`` so ``/metrics`` aggregates all workers
+rather than reporting whichever one answered.
+"""
+import logging
+import os
+import shutil
+from typing import Any, Dict
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from api.firebase_executor import initialize_firebase
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import httptools
+except ImportError:
+    httptools = None
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores() -> int:
+    # Honors CPU affinity and cpusets (e.g. container CPU pinning).
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+WEB_APP = os.getenv("WEB_APP", "api.main:app")
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("PORT", "8080"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or available_cores())
+# Longer than the load balancer's idle timeout (600s for Google Cloud load
+# balancer backend connections), so the balancer closes idle connections
+# first and never reuses one the worker just closed.
+WEB_KEEPALIVE_SECONDS = int(os.getenv("WEB_KEEPALIVE_SECONDS", "620"))
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", "2048"))
+WEB_TIMEOUT_SECONDS = int(os.getenv("WEB_TIMEOUT_SECONDS", "120"))
+WEB_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("WEB_GRACEFUL_TIMEOUT_SECONDS", "30"))
+# Recycle workers after this many requests (0 disables), with jitter so they
+# do not all restart together.
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "1000"))
+WEB_LOG_LEVEL = os.getenv("WEB_LOG_LEVEL", "info")
+
+
+class TunedUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if uvloop is not None else "asyncio",
+        "http": "httptools" if httptools is not None else "h11",
+        # Health checks and Cloud Run's proxy need no per-request access log.
+        "access_log": False,
+    }
+
+
+def on_starting(server):
+    initialize_firebase()
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        # Stale files from a previous run would be summed into the metrics.
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+    elif server.cfg.workers > 1:
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set; /metrics will only cover the worker that answers")
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def gunicorn_options() -> Dict[str, Any]:
+    return {
+        "bind": f"{WEB_HOST}:{WEB_PORT}",
+        "workers": WEB_CONCURRENCY,
+        "worker_class": TunedUvicornWorker,
+        "keepalive": WEB_KEEPALIVE_SECONDS,
+        "backlog": WEB_BACKLOG,
+        "timeout": WEB_TIMEOUT_SECONDS,
+        "graceful_timeout": WEB_GRACEFUL_TIMEOUT_SECONDS,
+        "max_requests": WEB_MAX_REQUESTS,
+        "max_requests_jitter": WEB_MAX_REQUESTS_JITTER if WEB_MAX_REQUESTS else 0,
+        # Workers import the app themselves, so HUP reloads pick up new code.
+        "preload_app": False,
+        "loglevel": WEB_LOG_LEVEL,
+        "errorlog": "-",
+        "on_starting": on_starting,
+        "child_exit": child_exit,
+    }
+
+
+class APIServer(BaseApplication):
+    def __init__(self, app_uri: str = WEB_APP, options: Dict[str, Any] = None):
+        self.app_uri = app_uri
+        self.options = options or gunicorn_options()
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from gunicorn.util import import_app
+        return import_app(self.app_uri)
+
+
+def main():
+    APIServer().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Queue backends that carry submitted jobs to the worker."""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from google.api_core.exceptions import NotFound
+from google.auth.exceptions import DefaultCredentialsError
+from google.cloud import tasks_v2
+
+from api.job_scheduler import DEFAULT_PRIORITY, PRIORITY_CLASSES
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which a task will not change again.
+TERMINAL_STATUSES = frozenset({"SUCCEEDED", "FAILED"})
+# Tasks the in-memory backend remembers before forgetting the oldest.
+MEMORY_QUEUE_MAX_TASKS = int(os.getenv("MEMORY_QUEUE_MAX_TASKS", "100000"))
+
+
+class TaskNotFound(Exception):
+    """The queue backend has no task with the requested name."""
+
+
+@dataclass(frozen=True)
+class QueueSettings:
+    backend: str
+    project: Optional[str]
+    location: str
+    queue: Optional[str]
+    # Queue per priority class; classes without their own share ``queue``.
+    priority_queues: Dict[str, Optional[str]]
+    service_url: Optional[str]
+    channel_pool_size: int
+    dispatch_deadline_seconds: int
+
+    @classmethod
+    def from_env(cls) -> "QueueSettings":
+        return cls(
+            backend=os.getenv("JOB_QUEUE_BACKEND", "cloud_tasks"),
+            project=os.getenv("GOOGLE_CLOUD_PROJECT"),
+            location=os.getenv("CLOUD_TASKS_LOCATION", "us-central1"),
+            queue=os.getenv("CLOUD_TASKS_QUEUE"),
+            priority_queues={
+                priority: os.getenv(f"CLOUD_TASKS_QUEUE_{priority.upper()}") or os.getenv("CLOUD_TASKS_QUEUE")
+                for priority in PRIORITY_CLASSES
+            },
+            service_url=os.getenv("CLOUD_RUN_SERVICE_URL"),
+            # gRPC channels per API process. The launcher already runs one
+            # process per core, and each channel multiplexes many concurrent
+            # calls, so a couple per process is plenty.
+            channel_pool_size=int(os.getenv("CLOUD_TASKS_CHANNEL_POOL_SIZE", "2")),
+            # How long one delivery attempt may run before the queue gives up
+            # and redelivers (Cloud Tasks allows 15s to 30min for HTTP targets).
+            dispatch_deadline_seconds=int(os.getenv("JOB_DISPATCH_DEADLINE_SECONDS", "600")),
+        )
+
+
+class QueueBackend:
+    """Interface for the place submitted jobs are sent to."""
+
+    name = "base"
+
+    async def start(self):
+        pass
+
+    async def create_task(self, payload: Dict[str, Any], priority: str = DEFAULT_PRIORITY, delay: float = 0.0) -> str:
+        """Enqueue a job payload and return the task name.
+
+        ``priority`` selects the class's queue and ``delay`` (seconds) holds
+        the task back before its first dispatch.
+
+        The name is chosen before enqueueing and sent to the worker as the
+        payload's ``task_name``, so progress reports can refer to it. The
+        attempt deadline goes along as ``dispatch_deadline_seconds`` so the
+        worker can stop and checkpoint before the queue gives up.
+        """
+        raise NotImplementedError
+
+    async def get_task(self, task_name: str) -> Dict[str, Any]:
+        """Return ``status``, ``create_time`` and ``schedule_time`` for a task."""
+        raise NotImplementedError
+
+    async def ping(self):
+        """Raise if the backend cannot currently accept tasks (health probes)."""
+
+    async def warm(self):
+        """Open connections ahead of the first submission."""
+        await self.ping()
+
+    async def close(self):
+        pass
+
+
+class CloudTasksBackend(QueueBackend):
+    """Google Cloud Tasks over a round-robin pool of async gRPC clients."""
+
+    name = "cloud_tasks"
+
+    def __init__(self, settings: QueueSettings):
+        self.settings = settings
+        # Resolved once instead of on every submission.
+        self.parent = tasks_v2.CloudTasksClient.queue_path(settings.project, settings.location, settings.queue)
+        self.parents = {
+            priority: tasks_v2.CloudTasksClient.queue_path(settings.project, settings.location, queue)
+            for priority, queue in settings.priority_queues.items()
+        }
+        self.target_url = f"{settings.service_url}/process"
+        self._clients: List[tasks_v2.CloudTasksAsyncClient] = []
+        self._next_client = None
+
+    async def start(self):
+        # Each async client owns its own gRPC channel; the channels are bound
+        # to the running loop, so they are created here rather than at import.
+        self._clients = [
+            tasks_v2.CloudTasksAsyncClient() for _ in range(max(1, self.settings.channel_pool_size))
+        ]
+        self._next_client = itertools.cycle(self._clients)
+
+    def _client(self) -> tasks_v2.CloudTasksAsyncClient:
+        if self._next_client is None:
+            raise RuntimeError("Cloud Tasks backend has not been started")
+        return next(self._next_client)
+
+    async def create_task(self, payload: Dict[str, Any], priority: str = DEFAULT_PRIORITY, delay: float = 0.0) -> str:
+        parent = self.parents.get(priority, self.parent)
+        # Random names keep Cloud Tasks' de-duplication index well distributed.
+        task_name = f"{parent}/tasks/{uuid.uuid4().hex}"
+        deadline = self.settings.dispatch_deadline_seconds
+        task = {
+            "name": task_name,
+            "dispatch_deadline": timedelta(seconds=deadline),
+            "http_request": {
+                "http_method": tasks_v2.HttpMethod.POST,
+                "url": self.target_url,
+                "headers": {"Content-Type": "application/json"},
+                "body": json.dumps(dict(payload, task_name=task_name, dispatch_deadline_seconds=deadline)).encode()
+            }
+        }
+        if delay > 0:
+            task["schedule_time"] = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        response = await self._client().create_task(request={"parent": parent, "task": task})
+        return response.name
+
+    async def get_task(self, task_name: str) -> Dict[str, Any]:
+        try:
+            task = await self._client().get_task(name=task_name)
+        except NotFound as e:
+            raise TaskNotFound(str(e))
+        return {
+            "status": "DISPATCHED" if task.dispatch_count else "QUEUED",
+            "create_time": task.create_time,
+            "schedule_time": task.schedule_time
+        }
+
+    async def warm(self):
+        # gRPC channels connect lazily; one call per pooled client opens them all.
+        await asyncio.gather(*(client.get_queue(name=self.parent) for client in self._clients))
+
+    async def ping(self):
+        # A queue read checks credentials, the channel and that the queue exists.
+        queue = await self._client().get_queue(name=self.parent)
+        if queue.state != tasks_v2.Queue.State.RUNNING:
+            raise RuntimeError(f"Queue {self.parent} is {queue.state.name}")
+
+    async def close(self):
+        for client in self._clients:
+            await client.transport.close()
+        self._clients = []
+        self._next_client = None
+
+
+class MemoryQueueBackend(QueueBackend):
+    """Accepts and holds tasks in process memory without running them.
+
+    Stands in for Cloud Tasks when load-testing the API offline. Only the
+    newest ``max_tasks`` are kept; older ones answer ``TaskNotFound`` as
+    if the queue had deleted them.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_tasks: int = MEMORY_QUEUE_MAX_TASKS):
+        self.max_tasks = max_tasks
+        self.tasks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def create_task(self, payload: Dict[str, Any], priority: str = DEFAULT_PRIORITY, delay: float = 0.0) -> str:
+        task_name = f"memory/tasks/{uuid.uuid4().hex}"
+        now = datetime.now(timezone.utc)
+        self.tasks[task_name] = {
+            "status": "QUEUED",
+            "priority": priority,
+            "create_time": now,
+            "schedule_time": now + timedelta(seconds=delay),
+            "payload": dict(payload, task_name=task_name)
+        }
+        while len(self.tasks) > self.max_tasks:
+            self.tasks.popitem(last=False)
+        return task_name
+
+    async def get_task(self, task_name: str) -> Dict[str, Any]:
+        task = self.tasks.get(task_name)
+        if task is None:
+            raise TaskNotFound(task_name)
+        return {key: task[key] for key in ("status", "create_time", "schedule_time")}
+
+
+def create_queue_backend(settings: QueueSettings) -> QueueBackend:
+    if settings.backend == CloudTasksBackend.name:
+        return CloudTasksBackend(settings)
+    if settings.backend == MemoryQueueBackend.name:
+        return MemoryQueueBackend()
+    if settings.backend == "local":
+        from api.local_queue import LocalQueueBackend
+        return LocalQueueBackend(dispatch_deadline=settings.dispatch_deadline_seconds)
+    raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {settings.backend}")
+
+
+_backend: Optional[QueueBackend] = None
+
+
+def get_queue_backend() -> Optional[QueueBackend]:
+    return _backend
+
+
+async def start_queue_backend(settings: Optional[QueueSettings] = None) -> Optional[QueueBackend]:
+    global _backend
+    if _backend is not None:
+        return _backend
+    settings = settings or QueueSettings.from_env()
+    backend = create_queue_backend(settings)
+    try:
+        await backend.start()
+    except DefaultCredentialsError:
+        logger.warning("Google Cloud credentials not found. Job submission will be disabled.")
+        return None
+    _backend = backend
+    return _backend
+
+
+async def stop_queue_backend():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
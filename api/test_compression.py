@@ -0,0 +1,79 @@
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response
+from fastapi.testclient import TestClient
+
+from api import compression
+from api.compression import CompressionMiddleware, choose_encoding
+
+LARGE = "x" * 5000
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(LARGE)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" + b"0" * 5000, media_type="image/png")
+
+    @app.get("/health")
+    async def health():
+        return PlainTextResponse(LARGE)
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, excluded_paths=("/health",))
+    return TestClient(app)
+
+
+def test_choose_encoding_honours_q_values(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("br, gzip;q=0") is None
+    assert choose_encoding("*") == "gzip"
+    assert choose_encoding("identity") is None
+
+
+def test_large_response_is_gzipped(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(LARGE)
+    assert response.text == LARGE
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/health"])
+def test_small_binary_and_excluded_responses_are_left_alone(client, path):
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_streaming_chunks_are_flushed_individually():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream")]})
+        for i in range(3):
+            await send({"type": "http.response.body", "body": f"data: {i}\n\n".encode(), "more_body": i < 2})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": "/events", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(app)(scope, None, send)
+    assert (b"content-encoding", b"gzip") in sent[0]["headers"]
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # Every chunk decodes on its own, so clients see each event as it is sent.
+    chunks = [decompressor.decompress(message["body"]) for message in sent[1:]]
+    assert chunks == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n"]
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+import pytest
+
+from api.firebase_executor import FirebaseAdminUnavailable, FirebaseExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = FirebaseExecutor(max_workers=1, max_queue=1, timeout=5)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+async def _occupy(executor: FirebaseExecutor):
+    """Block the executor's only thread until the returned event is set."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    task = asyncio.ensure_future(executor.run("block", block))
+    while not started.is_set():
+        await asyncio.sleep(0.001)
+    return release, task
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_and_releases_slot(executor):
+    assert await executor.run("add", lambda a, b: a + b, 1, 2) == 3
+    assert executor._pending == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_beyond_workers_plus_queue(executor):
+    release, running = await _occupy(executor)
+    queued = asyncio.ensure_future(executor.run("queued", lambda: "queued"))
+    await asyncio.sleep(0)
+    with pytest.raises(FirebaseAdminUnavailable):
+        await executor.run("rejected", lambda: None)
+    release.set()
+    assert await running == "done"
+    assert await queued == "queued"
+    assert executor._pending == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_call_releases_slot(executor):
+    release, running = await _occupy(executor)
+    calls = []
+    queued = asyncio.ensure_future(executor.run("queued", lambda: calls.append(1)))
+    await asyncio.sleep(0.01)
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    release.set()
+    await running
+    assert executor._pending == 0
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_outer_wait_for_does_not_leak_slots(executor):
+    release, running = await _occupy(executor)
+    for _ in range(5):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run("probe", lambda: None), 0.01)
+    release.set()
+    await running
+    assert executor._pending == 0
+
+
+@pytest.mark.asyncio
+async def test_timed_out_queued_call_releases_slot(executor):
+    release, running = await _occupy(executor)
+    with pytest.raises(FirebaseAdminUnavailable):
+        await executor.run("queued", lambda: None, timeout=0.01)
+    release.set()
+    await running
+    assert executor._pending == 0
+
+
+@pytest.mark.asyncio
+async def test_explicit_zero_timeout_is_not_the_default(executor):
+    release, running = await _occupy(executor)
+    with pytest.raises(FirebaseAdminUnavailable, match="after 0s"):
+        await executor.run("queued", lambda: None, timeout=0)
+    release.set()
+    await running
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import health
+from api.health import HealthMonitor, Probe
+from api.main import app
+from api.routers import health as health_router
+
+
+def check(delay=0.0, error=None):
+    async def run():
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return None
+    return run
+
+
+@pytest.mark.asyncio
+async def test_storage_client_is_created_once(monkeypatch):
+    from google.cloud import storage
+
+    created = []
+
+    class FakeBucket:
+        def exists(self):
+            return True
+
+    class FakeClient:
+        def __init__(self):
+            created.append(self)
+
+        def bucket(self, name):
+            return FakeBucket()
+
+    monkeypatch.setattr(storage, "Client", FakeClient)
+    monkeypatch.setattr(health, "_storage_client", None)
+    monkeypatch.setattr(health, "HEALTH_STORAGE_BUCKET", "bucket")
+    for _ in range(3):
+        assert await health.check_storage() == {"bucket": "bucket"}
+    assert len(created) == 1
+
+
+@pytest.mark.asyncio
+async def test_probe_over_budget_is_degraded():
+    monitor = HealthMonitor([Probe("slow", check(delay=0.02), critical=True, budget_ms=1)])
+    result = await monitor.run_probe(monitor.probes["slow"])
+    assert result["status"] == "degraded"
+    # A slow critical dependency still serves.
+    assert monitor.report()["status"] == "degraded"
+
+
+@pytest.mark.asyncio
+async def test_old_results_are_stale(monkeypatch):
+    monkeypatch.setattr(health, "HEALTH_STALE_AFTER_INTERVALS", 2)
+    monitor = HealthMonitor([Probe("db", check(), critical=False, interval=0.01)])
+    await monitor.run_probe(monitor.probes["db"])
+    assert monitor.probe_result("db")["status"] == "ok"
+    await asyncio.sleep(0.05)
+    result = monitor.probe_result("db")
+    assert result["status"] == "stale"
+    assert result["age_seconds"] >= 0
+    assert monitor.report()["status"] == "degraded"
+
+
+@pytest.mark.asyncio
+async def test_timeouts_and_errors_fail_the_probe():
+    monitor = HealthMonitor([
+        Probe("hung", check(delay=10), timeout=0.01),
+        Probe("broken", check(error=RuntimeError("down"))),
+    ])
+    assert (await monitor.run_probe(monitor.probes["hung"]))["error"] == "Timed out after 0.01s"
+    assert (await monitor.run_probe(monitor.probes["broken"]))["error"] == "down"
+
+
+def run_probes(monitor):
+    for probe in monitor.probes.values():
+        asyncio.run(monitor.run_probe(probe))
+
+
+def test_critical_failure_answers_503(monkeypatch):
+    monitor = HealthMonitor([
+        Probe("queue", check(error=RuntimeError("down")), critical=True),
+        Probe("storage", check(), critical=False),
+    ])
+    run_probes(monitor)
+    monkeypatch.setattr(health_router, "health_monitor", monitor)
+    client = TestClient(app)
+
+    response = client.get("/health/deep")
+    assert response.status_code == 503
+    assert response.json()["status"] == "fail"
+    assert response.json()["probes"]["queue"]["error"] == "down"
+    assert client.get("/health/check/queue/").status_code == 503
+    assert client.get("/health/check/storage/").status_code == 200
+
+
+def test_non_critical_failure_still_serves(monkeypatch):
+    monitor = HealthMonitor([
+        Probe("queue", check(), critical=True),
+        Probe("storage", check(error=RuntimeError("down")), critical=False),
+    ])
+    run_probes(monitor)
+    monkeypatch.setattr(health_router, "health_monitor", monitor)
+
+    response = TestClient(app).get("/health/deep")
+    assert response.status_code == 200
+    assert response.json()["status"] == "degraded"
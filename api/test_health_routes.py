@@ -0,0 +1,11 @@
+from fastapi.testclient import TestClient
+
+from api.health import health_monitor
+from api.main import app
+
+
+def test_firebase_status_serves_the_cached_probe(monkeypatch):
+    monkeypatch.setattr(health_monitor, "probe_result", lambda name: {"status": "ok", "latency_ms": 1.0})
+    response = TestClient(app).get("/firebase-status/")
+    assert response.status_code == 200
+    assert response.json()["probe"] == "firebase"
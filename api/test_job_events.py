@@ -0,0 +1,98 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from api import job_events
+from api.job_events import InProcessJobEventBroker, JobStatusFeed, format_sse, publish_job_event, user_topic
+from api.job_status import JobStatusCache, job_status_cache
+from api.task_queue import QueueBackend, TaskNotFound
+
+
+def parse_sse(chunk: str):
+    data = [line[len("data: "):] for line in chunk.splitlines() if line.startswith("data: ")]
+    return json.loads(data[0]) if data else None
+
+
+def test_format_sse_renders_datetimes_as_iso8601():
+    when = datetime(2026, 10, 18, 9, 9, 6, tzinfo=timezone.utc)
+    event = parse_sse(format_sse({"task_name": "t1", "create_time": when}))
+    assert event["create_time"] == "2026-10-18T09:09:06+00:00"
+
+
+def test_format_sse_comment():
+    assert format_sse(comment="keep-alive") == ": keep-alive\n\n"
+
+
+@pytest.mark.asyncio
+async def test_in_process_broker_delivers_to_topic_subscribers_only():
+    broker = InProcessJobEventBroker()
+    mine = await broker.subscribe("user:a")
+    other = await broker.subscribe("user:b")
+    await broker.publish("user:a", {"task_name": "t1"})
+    assert await asyncio.wait_for(mine.get(), 1) == {"task_name": "t1"}
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(other.get(), 0.01)
+    await mine.close()
+    await other.close()
+
+
+@pytest.mark.asyncio
+async def test_publish_records_terminal_status(monkeypatch):
+    monkeypatch.setattr(job_events, "job_event_broker", InProcessJobEventBroker())
+    subscription = await job_events.job_event_broker.subscribe(user_topic("u1"))
+    await publish_job_event("u1", "tasks/t-terminal", "SUCCEEDED", result={"ok": True})
+    event = await asyncio.wait_for(subscription.get(), 1)
+    assert event["status"] == "SUCCEEDED"
+    assert event["result"] == {"ok": True}
+    assert (await job_status_cache.get(QueueBackend(), "tasks/t-terminal"))["status"] == "SUCCEEDED"
+    await subscription.close()
+
+
+class MissingQueue(QueueBackend):
+    async def get_task(self, task_name):
+        raise TaskNotFound(task_name)
+
+
+@pytest.mark.asyncio
+async def test_single_task_stream_ends_when_task_is_gone(monkeypatch):
+    from api.routers import jobs
+
+    monkeypatch.setattr(jobs, "job_event_broker", InProcessJobEventBroker())
+    monkeypatch.setattr(jobs, "get_queue_backend", lambda: MissingQueue())
+    response = await jobs.stream_job_events(task_name="tasks/finished-and-deleted", token={"uid": "u1"})
+
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = await asyncio.wait_for(collect(), 1)
+    assert chunks[0] == ": connected\n\n"
+    assert parse_sse(chunks[1])["status"] == "UNKNOWN"
+    assert len(chunks) == 2
+
+
+class SharedBroker(InProcessJobEventBroker):
+    """Stands in for Redis: one broker seen by every simulated process."""
+
+    shared = True
+
+
+@pytest.mark.asyncio
+async def test_terminal_status_reaches_other_processes(monkeypatch):
+    broker = SharedBroker()
+    receiving = JobStatusCache()
+    # The other process polled while the task was still queued and was told
+    # it does not exist (Cloud Tasks deletes finished tasks).
+    receiving.put_not_found("tasks/t-shared")
+    other_process = JobStatusFeed(broker, receiving)
+    other_process.start()
+    await asyncio.sleep(0)
+
+    monkeypatch.setattr(job_events, "job_event_broker", broker)
+    monkeypatch.setattr(job_events, "job_status_cache", JobStatusCache())
+    await publish_job_event("u1", "tasks/t-shared", "SUCCEEDED")
+    await asyncio.sleep(0)
+
+    assert (await receiving.get(MissingQueue(), "tasks/t-shared"))["status"] == "SUCCEEDED"
+    await other_process.stop()
@@ -0,0 +1,51 @@
+import pytest
+
+from api.job_scheduler import BacklogFull, FairShareScheduler, resolve_priority
+
+
+def test_priority_defaults_by_job_type(monkeypatch):
+    monkeypatch.delenv("JOB_PRIORITY_DATA_ANALYSIS", raising=False)
+    assert resolve_priority("llm_process") == "interactive"
+    assert resolve_priority("data_analysis") == "bulk"
+    assert resolve_priority("something_else") == "standard"
+
+
+def test_clients_may_lower_but_not_raise_priority():
+    assert resolve_priority("llm_process", "bulk") == "bulk"
+    with pytest.raises(ValueError):
+        resolve_priority("data_analysis", "interactive")
+    with pytest.raises(ValueError):
+        resolve_priority("data_analysis", "urgent")
+
+
+def test_env_override_is_validated(monkeypatch):
+    monkeypatch.setenv("JOB_PRIORITY_DATA_ANALYSIS", "standard")
+    assert resolve_priority("data_analysis") == "standard"
+    monkeypatch.setenv("JOB_PRIORITY_DATA_ANALYSIS", "urgent")
+    with pytest.raises(RuntimeError):
+        resolve_priority("data_analysis")
+
+
+def test_every_default_class_has_a_budget():
+    scheduler = FairShareScheduler()
+    for priority, (rate, burst) in scheduler.settings.items():
+        assert rate > 0 and burst > 0, priority
+
+
+def test_burst_is_immediate_then_delays_grow():
+    scheduler = FairShareScheduler(settings={"bulk": (1.0, 2.0)})
+    delays = [scheduler.schedule("u1", "bulk") for _ in range(4)]
+    assert delays[:2] == [0.0, 0.0]
+    assert 0.5 < delays[2] < delays[3]
+    # Another user's jobs are not held back by u1's backlog.
+    assert scheduler.schedule("u2", "bulk") == 0.0
+
+
+def test_backlog_full_and_release():
+    scheduler = FairShareScheduler(settings={"bulk": (1.0, 1.0)}, max_delay=1.5)
+    scheduler.schedule("u1", "bulk")
+    scheduler.schedule("u1", "bulk")
+    with pytest.raises(BacklogFull):
+        scheduler.schedule("u1", "bulk")
+    scheduler.release("u1", "bulk")
+    assert scheduler.schedule("u1", "bulk") <= 1.5
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from api.job_status import JobStatusCache
+from api.task_queue import QueueBackend, TaskNotFound
+
+
+class FakeQueue(QueueBackend):
+    name = "fake"
+
+    def __init__(self, statuses=None):
+        self.statuses = dict(statuses or {})
+        self.calls = []
+        self.release = None
+
+    async def get_task(self, task_name):
+        self.calls.append(task_name)
+        if self.release is not None:
+            await self.release.wait()
+        if task_name not in self.statuses:
+            raise TaskNotFound(task_name)
+        return dict(self.statuses[task_name])
+
+
+@pytest.mark.asyncio
+async def test_non_terminal_status_cached_for_ttl():
+    queue = FakeQueue({"t1": {"status": "QUEUED"}})
+    cache = JobStatusCache(ttl=0.05)
+    assert (await cache.get(queue, "t1"))["status"] == "QUEUED"
+    await cache.get(queue, "t1")
+    assert queue.calls == ["t1"]
+    await asyncio.sleep(0.06)
+    await cache.get(queue, "t1")
+    assert queue.calls == ["t1", "t1"]
+
+
+@pytest.mark.asyncio
+async def test_terminal_status_from_event_never_calls_backend():
+    queue = FakeQueue()
+    cache = JobStatusCache(ttl=0)
+    cache.record_event("t1", "SUCCEEDED", "2026-01-01T00:00:00+00:00")
+    status = await cache.get(queue, "t1")
+    assert status == {"status": "SUCCEEDED", "finish_time": "2026-01-01T00:00:00+00:00"}
+    assert queue.calls == []
+
+
+@pytest.mark.asyncio
+async def test_non_terminal_event_invalidates():
+    queue = FakeQueue({"t1": {"status": "QUEUED"}})
+    cache = JobStatusCache(ttl=60)
+    await cache.get(queue, "t1")
+    queue.statuses["t1"] = {"status": "DISPATCHED"}
+    cache.record_event("t1", "RUNNING")
+    assert (await cache.get(queue, "t1"))["status"] == "DISPATCHED"
+
+
+@pytest.mark.asyncio
+async def test_in_flight_read_does_not_overwrite_terminal_event():
+    queue = FakeQueue({"t1": {"status": "DISPATCHED"}})
+    queue.release = asyncio.Event()
+    cache = JobStatusCache(ttl=60)
+    pending = asyncio.ensure_future(cache.get(queue, "t1"))
+    await asyncio.sleep(0)
+    cache.record_event("t1", "FAILED")
+    queue.release.set()
+    await pending
+    assert (await cache.get(queue, "t1"))["status"] == "FAILED"
+
+
+@pytest.mark.asyncio
+async def test_not_found_is_negative_cached():
+    queue = FakeQueue()
+    cache = JobStatusCache(not_found_ttl=60)
+    for _ in range(3):
+        with pytest.raises(TaskNotFound):
+            await cache.get(queue, "gone")
+    assert queue.calls == ["gone"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_coalesce_and_survive_leader_cancel():
+    queue = FakeQueue({"t1": {"status": "QUEUED"}})
+    queue.release = asyncio.Event()
+    cache = JobStatusCache()
+    leader = asyncio.ensure_future(cache.get(queue, "t1"))
+    await asyncio.sleep(0)
+    followers = [asyncio.ensure_future(cache.get(queue, "t1")) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    queue.release.set()
+    results = await asyncio.gather(*followers)
+    assert [result["status"] for result in results] == ["QUEUED"] * 3
+    assert queue.calls == ["t1"]
+
+
+def test_size_bound_evicts_least_recently_used():
+    cache = JobStatusCache(max_size=2)
+    cache.put("a", {"status": "SUCCEEDED"})
+    cache.put("b", {"status": "SUCCEEDED"})
+    cache.put("c", {"status": "SUCCEEDED"})
+    assert list(cache._entries) == ["b", "c"]
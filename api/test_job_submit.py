@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from api.job_scheduler import FairShareScheduler
+from api.rate_limit import MemoryRateLimitStore
+from api.routers import jobs
+from api.task_queue import QueueBackend
+
+
+class RecordingQueue(QueueBackend):
+    name = "recording"
+
+    def __init__(self):
+        self.created = []
+
+    async def create_task(self, payload, priority=None, delay=0.0):
+        self.created.append((payload, priority))
+        return f"tasks/{len(self.created)}"
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(jobs, "submit_limits", MemoryRateLimitStore())
+    monkeypatch.setattr(jobs, "fair_share_scheduler", FairShareScheduler(settings={}))
+    monkeypatch.setattr(jobs, "JOBS_SUBMIT_RATE_PER_USER", 1.0)
+    monkeypatch.setattr(jobs, "JOBS_SUBMIT_BURST_PER_USER", 5.0)
+
+
+def batch(size):
+    return [jobs.JobRequest(job_type="llm_process", params={"prompt": str(i)}) for i in range(size)]
+
+
+@pytest.mark.asyncio
+async def test_batch_is_charged_one_token_per_job(limits):
+    queue = RecordingQueue()
+    response = await jobs.submit_job_batch(batch(4), token={"uid": "u1"}, queue=queue)
+    assert response.status_code == 200
+    assert len(queue.created) == 4
+    with pytest.raises(HTTPException) as rejected:
+        await jobs.submit_job_batch(batch(2), token={"uid": "u1"}, queue=queue)
+    assert rejected.value.status_code == 429
+    assert "Retry-After" in rejected.value.headers
+
+
+@pytest.mark.asyncio
+async def test_batch_larger_than_the_burst_is_refused_outright(limits):
+    with pytest.raises(HTTPException) as rejected:
+        await jobs.submit_job_batch(batch(6), token={"uid": "u1"}, queue=RecordingQueue())
+    assert rejected.value.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_single_submit_cannot_raise_its_priority(limits):
+    request = jobs.JobRequest(job_type="data_analysis", params={}, priority="interactive")
+    with pytest.raises(HTTPException) as rejected:
+        await jobs.submit_job(request, background_tasks=None, token={"uid": "u1"}, queue=RecordingQueue())
+    assert rejected.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_unknown_job_types_are_refused(limits):
+    queue = RecordingQueue()
+    with pytest.raises(HTTPException) as rejected:
+        await jobs.submit_job(jobs.JobRequest(job_type="bogus", params={}), background_tasks=None,
+                              token={"uid": "u1"}, queue=queue)
+    assert rejected.value.status_code == 422
+
+    response = await jobs.submit_job_batch(
+        [jobs.JobRequest(job_type="bogus", params={})] + batch(1), token={"uid": "u1"}, queue=queue
+    )
+    results = json.loads(response.body)["results"]
+    assert [result["status"] for result in results] == ["failed", "submitted"]
+    assert len(queue.created) == 1
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import lifespan as lifespan_module
+
+
+class Recorder:
+    """Stands in for the background tasks and clients the lifespan drives."""
+
+    def __init__(self, events, name, stop_delay=0.0):
+        self.events = events
+        self.name = name
+        self.stop_delay = stop_delay
+
+    def start(self):
+        self.events.append(f"{self.name}.start")
+
+    async def stop(self):
+        await asyncio.sleep(self.stop_delay)
+        self.events.append(f"{self.name}.stop")
+
+    async def close(self):
+        await asyncio.sleep(self.stop_delay)
+        self.events.append(f"{self.name}.close")
+
+    def shutdown(self, wait):
+        self.events.append(f"{self.name}.shutdown")
+
+
+@pytest.fixture
+def events(monkeypatch):
+    events = []
+    for name in ("health_monitor", "job_status_feed", "certificate_prefetcher", "job_event_broker",
+                 "firebase_executor"):
+        monkeypatch.setattr(lifespan_module, name, Recorder(events, name))
+    queue = Recorder(events, "queue")
+    monkeypatch.setattr(lifespan_module, "get_queue_backend", lambda: queue)
+    monkeypatch.setattr(lifespan_module, "stop_queue_backend", queue.stop)
+    monkeypatch.setattr(lifespan_module, "_start_firebase", step(events, "firebase"))
+    monkeypatch.setattr(lifespan_module, "_start_queue", step(events, "queue"))
+    monkeypatch.setattr(lifespan_module, "_warm_redis", step(events, "redis"))
+    return events
+
+
+def step(events, name, delay=0.0, error=None):
+    async def run():
+        events.append(f"{name}.begin")
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        events.append(f"{name}.done")
+    return run
+
+
+def make_client():
+    app = FastAPI()
+    app.router.lifespan_context = lifespan_module.lifespan
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_startup_steps_run_concurrently(events, monkeypatch):
+    for name in ("_start_firebase", "_start_queue", "_warm_redis"):
+        monkeypatch.setattr(lifespan_module, name, step(events, name, delay=0.2))
+    started = time.perf_counter()
+    with make_client() as client:
+        assert time.perf_counter() - started < 0.5
+        assert client.get("/ping").status_code == 200
+    assert [event.endswith(".begin") for event in events[:3]] == [True] * 3
+    # Background tasks start only once every step has finished.
+    assert events.index("health_monitor.start") > max(
+        events.index(f"{name}.done") for name in ("_start_firebase", "_start_queue", "_warm_redis")
+    )
+    assert lifespan_module.STARTUP_SECONDS._value.get() >= 0.2
+
+
+def test_step_timeout_does_not_hold_up_startup(events, monkeypatch):
+    monkeypatch.setattr(lifespan_module, "LIFESPAN_STEP_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(lifespan_module, "_start_queue", step(events, "queue", delay=10))
+    started = time.perf_counter()
+    with make_client() as client:
+        assert time.perf_counter() - started < 1
+        assert client.get("/ping").status_code == 200
+    assert "queue.done" not in events
+    assert 0.05 <= lifespan_module.STARTUP_STEP_SECONDS.labels(step="queue")._value.get() < 1
+
+
+def test_failing_step_is_logged_and_not_fatal(events, monkeypatch, caplog):
+    monkeypatch.setattr(lifespan_module, "_start_firebase",
+                        step(events, "firebase", error=RuntimeError("no credentials")))
+    with caplog.at_level(logging.WARNING, logger="api.lifespan"):
+        with make_client() as client:
+            assert client.get("/ping").status_code == 200
+    assert "Startup step firebase failed: no credentials" in caplog.text
+    assert {"queue.done", "redis.done", "health_monitor.start", "job_status_feed.start"} <= set(events)
+
+
+def test_shutdown_stops_background_tasks_before_draining(events):
+    with make_client():
+        events.clear()
+    assert events == [
+        "health_monitor.stop",
+        "job_status_feed.stop",
+        "certificate_prefetcher.stop",
+        "queue.stop",
+        "job_event_broker.close",
+        "firebase_executor.shutdown",
+    ]
+
+
+def test_slow_drain_is_cut_off_and_later_drains_still_run(events, monkeypatch, caplog):
+    monkeypatch.setattr(lifespan_module, "LIFESPAN_DRAIN_TIMEOUT_SECONDS", 0.05)
+    slow_queue = Recorder(events, "queue", stop_delay=10)
+    monkeypatch.setattr(lifespan_module, "stop_queue_backend", slow_queue.stop)
+    with caplog.at_level(logging.WARNING, logger="api.lifespan"):
+        with make_client():
+            events.clear()
+            started = time.perf_counter()
+    assert time.perf_counter() - started < 1
+    assert "queue.stop" not in events
+    assert events[-2:] == ["job_event_broker.close", "firebase_executor.shutdown"]
+    assert "Shutdown step queue did not finish cleanly" in caplog.text
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import sqlite3
+import time
+
+import pytest
+
+from api.local_queue import LocalQueueBackend
+
+
+class FakeWorker:
+    """Answers ``handle_job`` with the queued responses, then the last one forever."""
+
+    def __init__(self, *responses, delay: float = 0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.calls = []
+        self.cancelled = 0
+
+    async def handle_job(self, payload):
+        self.calls.append(payload)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+
+async def wait_for_status(queue, task_name, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        current = (await queue.get_task(task_name))["status"]
+        if current == status or time.monotonic() > deadline:
+            return current
+        await asyncio.sleep(0.01)
+
+
+def task_row(db_path, task_name):
+    with sqlite3.connect(db_path) as db:
+        return db.execute(
+            "SELECT status, attempts, result, error FROM tasks WHERE name = ?", (task_name,)
+        ).fetchone()
+
+
+@pytest.mark.asyncio
+async def test_tasks_are_persisted_with_their_result(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    queue = LocalQueueBackend(db_path=db_path, worker=FakeWorker(({"result": {"n": 1}}, 200)))
+    await queue.start()
+    try:
+        task_name = await queue.create_task({"job_type": "test", "user_id": "u1"})
+        await queue.join()
+        assert (await queue.get_task(task_name))["status"] == "SUCCEEDED"
+    finally:
+        await queue.close()
+
+    status, attempts, result, error = task_row(db_path, task_name)
+    assert (status, attempts, error) == ("SUCCEEDED", 1, None)
+    assert json.loads(result) == {"result": {"n": 1}}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status_code", [503, 429])
+async def test_retryable_failures_are_retried_with_backoff(tmp_path, status_code):
+    db_path = str(tmp_path / "queue.db")
+    worker = FakeWorker(({"error": "busy"}, status_code), ({"error": "busy"}, status_code), ({"result": 1}, 200))
+    queue = LocalQueueBackend(db_path=db_path, max_attempts=3, retry_delay=0.05, worker=worker)
+    await queue.start()
+    try:
+        started = time.monotonic()
+        task_name = await queue.create_task({"job_type": "test"})
+        assert await wait_for_status(queue, task_name, "SUCCEEDED") == "SUCCEEDED"
+        # Backoff of 0.05s then 0.1s between the three attempts.
+        assert time.monotonic() - started >= 0.15
+    finally:
+        await queue.close()
+    assert len(worker.calls) == 3
+    assert task_row(db_path, task_name)[:2] == ("SUCCEEDED", 3)
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_max_attempts_and_client_errors_are_final(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    queue = LocalQueueBackend(db_path=db_path, max_attempts=2, retry_delay=0.01,
+                              worker=FakeWorker(({"error": "down"}, 500)))
+    await queue.start()
+    try:
+        retried = await queue.create_task({"job_type": "test"})
+        assert await wait_for_status(queue, retried, "FAILED") == "FAILED"
+        queue.worker = FakeWorker(({"error": "bad payload"}, 400))
+        rejected = await queue.create_task({"job_type": "test"})
+        assert await wait_for_status(queue, rejected, "FAILED") == "FAILED"
+    finally:
+        await queue.close()
+    assert task_row(db_path, retried)[:2] == ("FAILED", 2)
+    assert task_row(db_path, rejected)[:2] == ("FAILED", 1)
+    assert json.loads(task_row(db_path, rejected)[3]) == {"error": "bad payload"}
+
+
+@pytest.mark.asyncio
+async def test_dispatch_deadline_cancels_the_attempt(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    worker = FakeWorker(({"result": 1}, 200), delay=10)
+    queue = LocalQueueBackend(db_path=db_path, max_attempts=1, dispatch_deadline=0.05, worker=worker)
+    await queue.start()
+    try:
+        task_name = await queue.create_task({"job_type": "test"})
+        await queue.join()
+        assert worker.calls[0]["dispatch_deadline_seconds"] == 0.05
+    finally:
+        await queue.close()
+    assert worker.cancelled == 1
+    status, _, _, error = task_row(db_path, task_name)
+    assert status == "FAILED"
+    assert "Dispatch deadline of 0.05s exceeded" in json.loads(error)["error"]
+
+
+@pytest.mark.asyncio
+async def test_unfinished_tasks_are_redelivered_on_restart(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    first = LocalQueueBackend(db_path=db_path, worker=FakeWorker(({"result": 1}, 200), delay=10))
+    await first.start()
+    interrupted = await first.create_task({"job_type": "test"})
+    assert await wait_for_status(first, interrupted, "RUNNING") == "RUNNING"
+    soon = await first.create_task({"job_type": "test"}, delay=0.3)
+    later = await first.create_task({"job_type": "test"}, delay=60)
+    await first.close()
+
+    worker = FakeWorker(({"result": 1}, 200))
+    second = LocalQueueBackend(db_path=db_path, worker=worker)
+    await second.start()
+    try:
+        await second.join()
+        # Only the interrupted task is due; the delayed ones keep their schedule.
+        assert [call["task_name"] for call in worker.calls] == [interrupted]
+        assert (await second.get_task(interrupted))["status"] == "SUCCEEDED"
+        assert (await second.get_task(soon))["status"] == "QUEUED"
+        assert await wait_for_status(second, soon, "SUCCEEDED") == "SUCCEEDED"
+        assert (await second.get_task(later))["status"] == "QUEUED"
+    finally:
+        await second.close()
+    assert task_row(db_path, interrupted)[:2] == ("SUCCEEDED", 2)
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from api.profile_cache import InMemorySharedTier, ProfileCache
+
+
+def counting_loader(release: asyncio.Event = None):
+    calls = []
+
+    async def load(uid: str):
+        calls.append(uid)
+        if release is not None:
+            await release.wait()
+        return {"uid": uid, "email": f"{uid}@example.com"}
+
+    return load, calls
+
+
+@pytest.mark.asyncio
+async def test_hit_after_first_load_and_copies_returned():
+    load, calls = counting_loader()
+    cache = ProfileCache(load)
+    first = await cache.get("u1")
+    first["email"] = "changed"
+    assert (await cache.get("u1"))["email"] == "u1@example.com"
+    assert calls == ["u1"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_load():
+    release = asyncio.Event()
+    load, calls = counting_loader(release)
+    cache = ProfileCache(load)
+    lookups = [asyncio.ensure_future(cache.get("u1")) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    profiles = await asyncio.gather(*lookups)
+    assert calls == ["u1"]
+    assert all(profile["uid"] == "u1" for profile in profiles)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_fail_coalesced_requests():
+    release = asyncio.Event()
+    load, calls = counting_loader(release)
+    cache = ProfileCache(load)
+    leader = asyncio.ensure_future(cache.get("u1"))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(cache.get("u1"))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert (await follower)["uid"] == "u1"
+    assert calls == ["u1"]
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_does_not_cache_stale_profile():
+    release = asyncio.Event()
+    load, calls = counting_loader(release)
+    cache = ProfileCache(load)
+    pending = asyncio.ensure_future(cache.get("u1"))
+    await asyncio.sleep(0)
+    await cache.invalidate("u1")
+    release.set()
+    await pending
+    await cache.get("u1")
+    assert calls == ["u1", "u1"]
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_answers_other_workers():
+    shared = InMemorySharedTier()
+    load_a, calls_a = counting_loader()
+    load_b, calls_b = counting_loader()
+    await ProfileCache(load_a, shared=shared).get("u1")
+    assert (await ProfileCache(load_b, shared=shared).get("u1"))["uid"] == "u1"
+    assert calls_a == ["u1"]
+    assert calls_b == []
+
+
+@pytest.mark.asyncio
+async def test_loader_errors_are_not_cached():
+    attempts = []
+
+    async def flaky(uid: str):
+        attempts.append(uid)
+        if len(attempts) == 1:
+            raise RuntimeError("Firebase unavailable")
+        return {"uid": uid}
+
+    cache = ProfileCache(flaky)
+    with pytest.raises(RuntimeError):
+        await cache.get("u1")
+    assert await cache.get("u1") == {"uid": "u1"}
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry_reloads():
+    load, calls = counting_loader()
+    cache = ProfileCache(load, ttl=0.01)
+    await cache.get("u1")
+    await asyncio.sleep(0.02)
+    await cache.get("u1")
+    assert calls == ["u1", "u1"]
@@ -0,0 +1,108 @@
+import json
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from api import profiling
+from api.profiling import ProfilingMiddleware, RequestTrace, StackSampler, TraceWriter, span
+
+
+def wait_for_traces(directory, count, pattern="*.json", timeout=5):
+    # Traces are written from the executor after the response has been sent.
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        files = sorted(directory.glob(pattern))
+        if len(files) >= count:
+            return files
+        time.sleep(0.01)
+    return sorted(directory.glob(pattern))
+
+
+def make_client(tmp_path, **options):
+    app = FastAPI()
+
+    async def user():
+        with span("firebase"):
+            return "user"
+
+    @app.get("/items")
+    async def items(current=Depends(user)):
+        return {"user": current}
+
+    @app.get("/slow")
+    def slow():
+        time.sleep(0.05)
+        return {"ok": True}
+
+    @app.get("/jobs/events/{task_name}")
+    async def events(task_name: str):
+        return {"task_name": task_name}
+
+    options.setdefault("stack_interval_ms", 0)
+    app.add_middleware(ProfilingMiddleware, sample_rate=1.0, writer=TraceWriter(str(tmp_path), 100), **options)
+    return TestClient(app)
+
+
+def test_sampled_request_records_phase_and_custom_spans(tmp_path):
+    client = make_client(tmp_path, slow_ms=10_000)
+    assert client.get("/items").status_code == 200
+
+    [trace_file] = wait_for_traces(tmp_path, 1)
+    record = json.loads(trace_file.read_text())
+    assert record["path"] == "/items"
+    assert record["route"] == "/items"
+    assert record["status_code"] == 200
+    assert record["slow"] is False
+    names = [entry["name"] for entry in record["spans"]]
+    for name in ("dependencies", "firebase", "handler", "serialize", "response"):
+        assert name in names
+    assert not list(tmp_path.glob("*.folded"))
+
+
+def test_excluded_paths_match_by_prefix(tmp_path):
+    assert "/jobs/events" in profiling.PROFILING_EXCLUDED_PATHS
+    client = make_client(tmp_path, excluded_paths=("/jobs/events",))
+    assert client.get("/jobs/events/task-1").status_code == 200
+    time.sleep(0.1)
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_slow_request_writes_folded_stacks(tmp_path):
+    client = make_client(tmp_path, slow_ms=0, stack_interval_ms=1)
+    assert client.get("/slow").status_code == 200
+
+    [trace_file] = wait_for_traces(tmp_path, 1)
+    record = json.loads(trace_file.read_text())
+    assert record["slow"] is True
+    folded = tmp_path / record["stack_file"]
+    lines = folded.read_text().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+    assert any("slow (test_profiling.py" in line for line in lines)
+
+
+def test_trace_writer_keeps_newest_traces(tmp_path):
+    writer = TraceWriter(str(tmp_path), max_traces=2)
+    for index in range(3):
+        record = {"id": f"trace{index}", "started_at": 1_700_000_000 + index}
+        writer.write(record, profiling.StackCounter({"main;fn": 1}))
+
+    remaining = sorted(path.name for path in tmp_path.iterdir())
+    assert len(remaining) == 4
+    assert not any("trace0" in name for name in remaining)
+    assert any(name.endswith("trace2.folded") for name in remaining)
+
+
+def test_sampler_stops_sampling_after_max_seconds():
+    sampler = StackSampler(0.001, max_seconds=0.02)
+    trace = RequestTrace("GET", "/jobs/events")
+    sampler.add(trace)
+    time.sleep(0.1)
+    assert trace.sampling_capped
+    samples = sum(trace.stacks.values())
+    time.sleep(0.05)
+    assert sum(trace.stacks.values()) == samples
+    sampler.remove(trace)
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from api import rate_limit
+from api.rate_limit import MemoryRateLimitStore, RateLimitMiddleware, RateLimitRule, TokenBucketLimiter
+from api.token_cache import TokenCache
+
+
+def test_bucket_allows_burst_then_reports_wait():
+    limiter = TokenBucketLimiter(rate=1.0, burst=2.0)
+    assert limiter.acquire("k") == 0
+    assert limiter.acquire("k") == 0
+    assert 0.9 < limiter.acquire("k") <= 1.0
+    assert limiter.acquire("other") == 0
+
+
+def test_cost_takes_several_tokens_and_zero_rate_is_unlimited():
+    limiter = TokenBucketLimiter(rate=1.0, burst=5.0)
+    assert limiter.acquire("k", cost=5) == 0
+    assert limiter.acquire("k", cost=2) > 1.5
+    assert TokenBucketLimiter(rate=0, burst=0).acquire("k", cost=100) == 0
+
+
+def test_idle_buckets_are_dropped_beyond_max_keys():
+    limiter = TokenBucketLimiter(rate=1.0, burst=1.0, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    assert list(limiter._buckets) == ["b", "c"]
+
+
+def make_client(**kwargs):
+    app = FastAPI()
+
+    @app.get("/jobs/thing")
+    async def thing():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    rules = (RateLimitRule(name="jobs", path_prefix="/jobs/", rate=1.0, burst=2.0),)
+    app.add_middleware(RateLimitMiddleware, rules=rules, store=MemoryRateLimitStore(), exempt_paths=("/health",), **kwargs)
+    return TestClient(app)
+
+
+def test_middleware_answers_429_with_retry_after():
+    client = make_client()
+    assert [client.get("/jobs/thing").status_code for _ in range(2)] == [200, 200]
+    rejected = client.get("/jobs/thing")
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "1"
+    assert all(client.get("/health").status_code == 200 for _ in range(5))
+
+
+def test_verified_users_get_their_own_bucket(monkeypatch):
+    # A private cache, so the fake tokens never reach the process-wide one.
+    token_cache = TokenCache()
+    monkeypatch.setattr(rate_limit, "token_cache", token_cache)
+    token_cache.put("token-a", {"uid": "a", "exp": time.time() + 60})
+    token_cache.put("token-b", {"uid": "b", "exp": time.time() + 60})
+    client = make_client()
+    for _ in range(2):
+        client.get("/jobs/thing", headers={"Authorization": "Bearer token-a"})
+    assert client.get("/jobs/thing", headers={"Authorization": "Bearer token-a"}).status_code == 429
+    assert client.get("/jobs/thing", headers={"Authorization": "Bearer token-b"}).status_code == 200
+
+
+@pytest.mark.parametrize("trusted_proxies, expected", [(0, "testclient"), (1, "203.0.113.9")])
+def test_forwarded_for_is_only_trusted_behind_proxies(trusted_proxies, expected):
+    middleware = RateLimitMiddleware(None, rules=(), store=MemoryRateLimitStore(), trusted_proxies=trusted_proxies)
+    scope = {"type": "http", "client": ("testclient", 50000), "headers": [(b"x-forwarded-for", b"198.51.100.1, 203.0.113.9")]}
+    assert middleware._client_ip(scope, Headers(scope=scope)) == expected
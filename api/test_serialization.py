@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+
+import msgpack
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from api import serialization
+from api.main import global_exception_handler, http_exception_handler
+from api.rate_limit import MemoryRateLimitStore, RateLimitMiddleware, RateLimitRule
+from api.serialization import (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, ContentNegotiationMiddleware,
+                               NegotiatedResponse, negotiate)
+
+CREATED = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+MSGPACK = {"Accept": MSGPACK_MEDIA_TYPE}
+
+
+@pytest.mark.parametrize("accept,expected", [
+    (None, JSON_MEDIA_TYPE),
+    ("*/*", JSON_MEDIA_TYPE),
+    ("application/msgpack", MSGPACK_MEDIA_TYPE),
+    ("application/x-msgpack", MSGPACK_MEDIA_TYPE),
+    ("application/json, application/msgpack;q=0.5", JSON_MEDIA_TYPE),
+    ("application/json;q=0.5, application/msgpack", MSGPACK_MEDIA_TYPE),
+    ("application/msgpack, application/json", JSON_MEDIA_TYPE),
+    ("application/msgpack;q=0, */*;q=0.1", JSON_MEDIA_TYPE),
+    ("application/msgpack;q=oops", JSON_MEDIA_TYPE),
+])
+def test_negotiate_honours_q_values(accept, expected):
+    assert negotiate(accept) == expected
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=NegotiatedResponse)
+
+    @app.get("/item")
+    async def item():
+        return {"id": 1, "created": CREATED}
+
+    @app.get("/missing")
+    async def missing():
+        raise HTTPException(status_code=404, detail="Not here", headers={"X-Reason": "gone"})
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    @app.get("/jobs/limited")
+    async def limited():
+        return {"ok": True}
+
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(Exception, global_exception_handler)
+    app.add_middleware(ContentNegotiationMiddleware)
+    rules = (RateLimitRule(name="jobs", path_prefix="/jobs/", rate=0.001, burst=1.0),)
+    app.add_middleware(RateLimitMiddleware, rules=rules, store=MemoryRateLimitStore())
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_success_is_json_by_default(client):
+    response = client.get("/item")
+    assert response.headers["content-type"] == JSON_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+    assert response.json() == {"id": 1, "created": CREATED.isoformat()}
+
+
+def test_success_is_msgpack_when_preferred(client):
+    response = client.get("/item", headers=MSGPACK)
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+    assert msgpack.unpackb(response.content) == {"id": 1, "created": CREATED.isoformat()}
+
+
+def test_falls_back_to_json_without_msgpack(client, monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", None)
+    response = client.get("/item", headers=MSGPACK)
+    assert response.headers["content-type"] == JSON_MEDIA_TYPE
+    assert response.json()["id"] == 1
+
+
+@pytest.mark.parametrize("path,status_code,detail", [
+    ("/missing", 404, "Not here"),
+    ("/nowhere", 404, "Not Found"),
+    ("/broken", 500, "boom"),
+])
+def test_error_handlers_negotiate_and_vary(client, path, status_code, detail):
+    response = client.get(path, headers=MSGPACK)
+    assert response.status_code == status_code
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+    assert msgpack.unpackb(response.content) == {"detail": detail}
+
+    response = client.get(path)
+    assert response.headers["vary"] == "Accept"
+    assert response.json() == {"detail": detail}
+
+
+def test_http_exception_headers_are_kept(client):
+    assert client.get("/missing").headers["x-reason"] == "gone"
+
+
+def test_rate_limit_rejection_is_negotiated(client):
+    assert client.get("/jobs/limited").status_code == 200
+    response = client.get("/jobs/limited", headers=MSGPACK)
+    assert response.status_code == 429
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+    assert "retry-after" in response.headers
+    assert msgpack.unpackb(response.content) == {"detail": "Too many requests"}
+
+    response = client.get("/jobs/limited")
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Too many requests"}
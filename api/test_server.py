@@ -0,0 +1,71 @@
+import logging
+from types import SimpleNamespace
+
+from api import server
+from api.server import APIServer, TunedUvicornWorker, gunicorn_options
+
+
+def test_keepalive_outlasts_the_load_balancer_idle_timeout():
+    # Google Cloud load balancers keep idle backend connections for 600s.
+    assert server.WEB_KEEPALIVE_SECONDS > 600
+
+
+def test_gunicorn_options_are_applied_to_the_config(monkeypatch):
+    monkeypatch.setattr(server, "WEB_CONCURRENCY", 3)
+    monkeypatch.setattr(server, "WEB_PORT", 9000)
+    monkeypatch.setattr(server, "WEB_MAX_REQUESTS", 0)
+    options = gunicorn_options()
+    assert options["max_requests_jitter"] == 0
+    assert options["preload_app"] is False
+
+    cfg = APIServer("api.main:app", options).cfg
+    assert cfg.bind == ["0.0.0.0:9000"]
+    assert cfg.workers == 3
+    assert cfg.worker_class is TunedUvicornWorker
+    assert cfg.keepalive == server.WEB_KEEPALIVE_SECONDS
+    assert cfg.graceful_timeout == server.WEB_GRACEFUL_TIMEOUT_SECONDS
+    assert cfg.on_starting is server.on_starting
+
+
+def test_max_requests_enables_jitter(monkeypatch):
+    monkeypatch.setattr(server, "WEB_MAX_REQUESTS", 5000)
+    options = gunicorn_options()
+    assert (options["max_requests"], options["max_requests_jitter"]) == (5000, server.WEB_MAX_REQUESTS_JITTER)
+
+
+def test_on_starting_resets_the_multiproc_dir(monkeypatch, tmp_path):
+    multiproc_dir = tmp_path / "metrics"
+    multiproc_dir.mkdir()
+    (multiproc_dir / "counter_123.db").write_bytes(b"stale")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(multiproc_dir))
+    initialized = []
+    monkeypatch.setattr(server, "initialize_firebase", lambda: initialized.append(True))
+
+    server.on_starting(SimpleNamespace(cfg=SimpleNamespace(workers=4)))
+    assert initialized == [True]
+    assert multiproc_dir.is_dir()
+    assert list(multiproc_dir.iterdir()) == []
+
+
+def test_on_starting_warns_without_multiproc_dir_for_several_workers(monkeypatch, caplog):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    monkeypatch.setattr(server, "initialize_firebase", lambda: None)
+    with caplog.at_level(logging.WARNING, logger="api.server"):
+        server.on_starting(SimpleNamespace(cfg=SimpleNamespace(workers=1)))
+        assert "PROMETHEUS_MULTIPROC_DIR" not in caplog.text
+        server.on_starting(SimpleNamespace(cfg=SimpleNamespace(workers=2)))
+    assert "PROMETHEUS_MULTIPROC_DIR is not set" in caplog.text
+
+
+def test_child_exit_marks_the_worker_dead(monkeypatch, tmp_path):
+    from prometheus_client import multiprocess
+
+    dead = []
+    monkeypatch.setattr(multiprocess, "mark_process_dead", dead.append)
+    worker = SimpleNamespace(pid=4321)
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    server.child_exit(None, worker)
+    assert dead == []
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    server.child_exit(None, worker)
+    assert dead == [4321]
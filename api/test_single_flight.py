@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from api.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_call():
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    callers = [asyncio.ensure_future(flights.do("key", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert "key" in flights
+    release.set()
+    results = await asyncio.gather(*callers)
+    assert calls == 1
+    assert [value for value, _ in results] == ["value"] * 5
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_waiters():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "value"
+
+    leader = asyncio.ensure_future(flights.do("key", fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(flights.do("key", fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await waiter == ("value", True)
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_exception_reaches_every_caller_and_is_not_kept():
+    flights = SingleFlight()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(flights.do("key", fail), flights.do("key", fail), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert calls == 1
+    with pytest.raises(ValueError):
+        await flights.do("key", fail)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_forget_detaches_the_call_in_flight():
+    flights = SingleFlight()
+    release = asyncio.Event()
+    current = []
+
+    async def fetch():
+        await release.wait()
+        current.append(flights.is_current("key"))
+        return "old"
+
+    first = asyncio.ensure_future(flights.do("key", fetch))
+    await asyncio.sleep(0)
+    flights.forget("key")
+    assert "key" not in flights
+    release.set()
+    assert await first == ("old", False)
+    assert current == [False]
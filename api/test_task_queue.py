@@ -0,0 +1,29 @@
+import pytest
+
+from api.task_queue import MemoryQueueBackend, QueueSettings, TaskNotFound
+
+
+def test_channel_pool_is_small_and_fixed_per_process(monkeypatch):
+    monkeypatch.delenv("CLOUD_TASKS_CHANNEL_POOL_SIZE", raising=False)
+    assert QueueSettings.from_env().channel_pool_size == 2
+    monkeypatch.setenv("CLOUD_TASKS_CHANNEL_POOL_SIZE", "4")
+    assert QueueSettings.from_env().channel_pool_size == 4
+
+
+def test_priority_classes_fall_back_to_the_default_queue(monkeypatch):
+    monkeypatch.setenv("CLOUD_TASKS_QUEUE", "jobs")
+    monkeypatch.setenv("CLOUD_TASKS_QUEUE_BULK", "jobs-bulk")
+    monkeypatch.delenv("CLOUD_TASKS_QUEUE_INTERACTIVE", raising=False)
+    queues = QueueSettings.from_env().priority_queues
+    assert queues["bulk"] == "jobs-bulk"
+    assert queues["interactive"] == "jobs"
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_forgets_the_oldest_tasks():
+    queue = MemoryQueueBackend(max_tasks=2)
+    names = [await queue.create_task({"job_type": "t"}) for _ in range(3)]
+    assert len(queue.tasks) == 2
+    with pytest.raises(TaskNotFound):
+        await queue.get_task(names[0])
+    assert (await queue.get_task(names[2]))["status"] == "QUEUED"
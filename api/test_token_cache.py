@@ -0,0 +1,130 @@
+import logging
+import time
+
+import firebase_admin
+import pytest
+from firebase_admin import credentials
+from google.auth.credentials import AnonymousCredentials
+
+from api import token_cache as token_cache_module
+from api.routers import auth as auth_router
+from api.token_cache import CertificatePrefetcher, TokenCache, prefetch_certificates
+
+
+def decoded(uid="u1", expires_in=3600):
+    return {"uid": uid, "exp": time.time() + expires_in}
+
+
+def test_hit_returns_a_copy():
+    cache = TokenCache()
+    cache.put("token", decoded())
+    first = cache.get("token")
+    first["uid"] = "changed"
+    assert cache.get("token")["uid"] == "u1"
+
+
+def test_raw_tokens_are_not_kept():
+    cache = TokenCache()
+    cache.put("secret-bearer-token", decoded())
+    assert "secret-bearer-token" not in cache._entries
+    assert TokenCache.key("secret-bearer-token") in cache._entries
+
+
+def test_entries_expire_at_the_token_exp():
+    cache = TokenCache()
+    cache.put("expired", decoded(expires_in=-1))
+    assert cache.get("expired") is None
+    assert len(cache) == 0
+
+
+def test_max_ttl_caps_long_lived_tokens():
+    cache = TokenCache(max_ttl=0.01)
+    cache.put("token", decoded())
+    time.sleep(0.02)
+    assert cache.get("token") is None
+
+
+def test_tokens_without_exp_are_not_cached():
+    cache = TokenCache()
+    cache.put("token", {"uid": "u1"})
+    assert cache.get("token") is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = TokenCache(max_size=2)
+    cache.put("a", decoded("a"))
+    cache.put("b", decoded("b"))
+    cache.get("a")
+    cache.put("c", decoded("c"))
+    assert cache.peek("a") is not None
+    assert cache.peek("b") is None
+
+
+@pytest.mark.asyncio
+async def test_verification_is_skipped_for_cached_tokens(monkeypatch):
+    calls = []
+
+    async def run(name, fn, *args):
+        calls.append(name)
+        return decoded("u1")
+
+    monkeypatch.setattr(auth_router, "token_cache", TokenCache())
+    monkeypatch.setattr(auth_router.firebase_executor, "run", run)
+    for _ in range(3):
+        assert (await auth_router._verify_id_token("token"))["uid"] == "u1"
+    assert calls == ["verify_id_token"]
+
+
+class StubCredential(credentials.Base):
+    def get_credential(self):
+        return AnonymousCredentials()
+
+
+@pytest.fixture
+def firebase_app():
+    app = firebase_admin.initialize_app(StubCredential(), {"projectId": "test"}, name="token-cache-test")
+    yield app
+    firebase_admin.delete_app(app)
+
+
+def test_certificate_fetch_hooks_exist_in_installed_packages(firebase_app):
+    # Fails when a firebase_admin or google-auth upgrade moves the private
+    # names prefetch_certificates relies on; the prefetch would then be skipped.
+    assert token_cache_module._certificate_fetcher(firebase_app) is not None
+
+
+def test_prefetch_uses_the_verifier_transport(firebase_app, monkeypatch):
+    calls = []
+
+    def fetch_certs(request, uri):
+        calls.append((request, uri))
+        return {"kid-1": "cert", "kid-2": "cert"}
+
+    monkeypatch.setattr(token_cache_module.google_id_token, "_fetch_certs", fetch_certs)
+    assert prefetch_certificates(firebase_app) == 2
+    [(request, uri)] = calls
+    assert request is firebase_admin.auth._get_client(firebase_app)._token_verifier.request
+    assert uri == token_cache_module._token_gen.ID_TOKEN_CERT_URI
+
+
+@pytest.mark.parametrize("module,name", [
+    (token_cache_module.google_id_token, "_fetch_certs"),
+    (token_cache_module._token_gen, "ID_TOKEN_CERT_URI"),
+    (token_cache_module.auth, "_get_client"),
+])
+@pytest.mark.asyncio
+async def test_prefetch_is_skipped_when_internals_are_missing(firebase_app, monkeypatch, caplog, module, name):
+    monkeypatch.delattr(module, name)
+    with caplog.at_level(logging.WARNING, logger="api.token_cache"):
+        assert prefetch_certificates(firebase_app) is None
+    assert "Skipping ID token certificate prefetch" in caplog.text
+
+    async def run(name, fn, *args):
+        return fn(firebase_app)
+
+    monkeypatch.setattr(token_cache_module.firebase_executor, "run", run)
+    skipped = token_cache_module.CERT_PREFETCHES.labels(outcome="skipped")
+    before = skipped._value.get()
+    # A skip is not a failure, so the prefetcher does not retry it early.
+    assert await CertificatePrefetcher().refresh() is True
+    assert skipped._value.get() == before + 1
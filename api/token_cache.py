@@ -0,0 +1,181 @@
+"""Verified Firebase ID token cache and signing-certificate prefetch."""
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from firebase_admin import _token_gen, auth
+from google.oauth2 import id_token as google_id_token
+from prometheus_client import Counter
+
+from api.firebase_executor import firebase_executor
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+TOKEN_CACHE_MAX_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "3600"))
+TOKEN_CERT_REFRESH_SECONDS = float(os.getenv("TOKEN_CERT_REFRESH_SECONDS", "1800"))
+
+# Registered on the default registry, so they are served by the
+# Instrumentator's /metrics endpoint in api/main.py.
+TOKEN_CACHE_HITS = Counter(
+    "api_token_cache_hits_total",
+    "Verified ID token cache hits",
+)
+TOKEN_CACHE_MISSES = Counter(
+    "api_token_cache_misses_total",
+    "Verified ID token cache misses",
+)
+TOKEN_CACHE_EVICTIONS = Counter(
+    "api_token_cache_evictions_total",
+    "Verified ID token cache evictions",
+    ["reason"],
+)
+CERT_PREFETCHES = Counter(
+    "api_token_cert_prefetch_total",
+    "Background fetches of Google's ID token signing certificates",
+    ["outcome"],
+)
+
+
+class TokenCache:
+    """Bounded LRU of decoded ID tokens that expire at the token's ``exp``."""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, max_ttl: float = TOKEN_CACHE_MAX_TTL_SECONDS):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        # Never keep raw bearer tokens in memory longer than the request.
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, decoded_token = entry
+                if time.time() < expires_at:
+                    self._entries.move_to_end(key)
+                    TOKEN_CACHE_HITS.inc()
+                    return dict(decoded_token)
+                del self._entries[key]
+                TOKEN_CACHE_EVICTIONS.labels(reason="expired").inc()
+        TOKEN_CACHE_MISSES.inc()
+        return None
+
+    def peek(self, token: str) -> Optional[Dict[str, Any]]:
+        """Like ``get`` but without counting a lookup or refreshing recency."""
+        with self._lock:
+            entry = self._entries.get(self.key(token))
+        if entry is None or time.time() >= entry[0]:
+            return None
+        return dict(entry[1])
+
+    def put(self, token: str, decoded_token: Dict[str, Any]):
+        exp = decoded_token.get("exp")
+        if not exp or self.max_size <= 0:
+            return
+        expires_at = min(float(exp), time.time() + self.max_ttl)
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(decoded_token))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                TOKEN_CACHE_EVICTIONS.labels(reason="size").inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _certificate_fetcher(app=None) -> Optional[Callable[[], Dict[str, Any]]]:
+    """Bind the verifier's certificate fetch, or None if its internals have moved.
+
+    firebase_admin and google-auth expose no public way to warm the verifier's
+    certificate cache, so this relies on private names that may change
+    between releases.
+    """
+    get_client = getattr(auth, "_get_client", None)
+    fetch_certs = getattr(google_id_token, "_fetch_certs", None)
+    cert_uri = getattr(_token_gen, "ID_TOKEN_CERT_URI", None)
+    if get_client is None or fetch_certs is None or cert_uri is None:
+        return None
+    request = getattr(getattr(get_client(app), "_token_verifier", None), "request", None)
+    if request is None:
+        return None
+    return functools.partial(fetch_certs, request, cert_uri)
+
+
+def prefetch_certificates(app=None) -> Optional[int]:
+    """Fetch Google's ID token signing certificates ahead of verification.
+
+    Returns the number of certificates, or None when the prefetch is skipped
+    because the firebase_admin/google-auth internals it uses are missing.
+    """
+    # Use the verifier's own transport so the fetched certificates land in the
+    # HTTP cache that auth.verify_id_token reads from.
+    fetch = _certificate_fetcher(app)
+    if fetch is None:
+        logger.warning("Skipping ID token certificate prefetch: the firebase_admin/google-auth "
+                       "internals it relies on are not available in the installed versions")
+        return None
+    return len(fetch())
+
+
+class CertificatePrefetcher:
+    """Keeps the signing certificates warm from a background task."""
+
+    def __init__(self, interval: float = TOKEN_CERT_REFRESH_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, delay: float = 0.0):
+        """Refresh in the background, first after ``delay`` seconds."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run(delay))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self) -> bool:
+        try:
+            count = await firebase_executor.run("prefetch_certificates", prefetch_certificates)
+            if count is None:
+                CERT_PREFETCHES.labels(outcome="skipped").inc()
+                return True
+            CERT_PREFETCHES.labels(outcome="success").inc()
+            logger.debug("Prefetched %d ID token signing certificates", count)
+            return True
+        except Exception as e:
+            CERT_PREFETCHES.labels(outcome="error").inc()
+            logger.warning("Failed to prefetch ID token certificates: %s", e)
+            return False
+
+    async def _run(self, delay: float):
+        await asyncio.sleep(delay)
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+
+token_cache = TokenCache()
+certificate_prefetcher = CertificatePrefetcher()
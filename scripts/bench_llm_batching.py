@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Compare llm_process throughput with and without micro-batching.
+
+Runs entirely offline against the worker's MockLLMBackend:
+
+    python scripts/bench_llm_batching.py --jobs 1000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "worker"))
+
+from llm_batcher import MicroBatcher, MockLLMBackend  # noqa: E402
+
+
+async def run_case(batch_size: int, args) -> dict:
+    backend = MockLLMBackend(call_latency=args.call_latency_ms / 1000, item_latency=args.item_latency_ms / 1000)
+    batcher = MicroBatcher(
+        backend,
+        max_batch_size=batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_inflight=args.max_inflight,
+    )
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await batcher.submit({"prompt": f"prompt {i}", "temperature": 0})
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.jobs)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "batch_size": batch_size,
+        "jobs": args.jobs,
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_second": round(args.jobs / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "backend_calls": backend.calls,
+        "mean_batch_size": round(batcher.stats()["mean_batch_size"], 2),
+    }
+
+
+async def main_async(args):
+    results = [await run_case(1, args)]
+    for batch_size in args.batch_sizes:
+        results.append(await run_case(batch_size, args))
+    print(json.dumps(results, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM micro-batching benchmark')
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--max-inflight', type=int, default=4)
+    parser.add_argument('--call-latency-ms', type=float, default=50)
+    parser.add_argument('--item-latency-ms', type=float, default=2)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Serialization cost per API endpoint: stdlib JSONResponse vs orjson vs msgpack.
+
+"before" is FastAPI's stock path (jsonable_encoder + JSONResponse). "orjson"
+is the app's default response class behind jsonable_encoder, and "direct" is
+a NegotiatedResponse returned from the route, which skips jsonable_encoder
+(what the batch and status endpoints do):
+
+    python scripts/bench_serialization.py --iterations 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from api.serialization import MSGPACK_MEDIA_TYPE, NegotiatedResponse, msgpack  # noqa: E402
+
+
+def task_name() -> str:
+    return f"projects/dg/locations/us-central1/queues/jobs/tasks/{uuid.uuid4().hex}"
+
+
+def status(name: str) -> dict:
+    now = datetime.now(timezone.utc)
+    return {"task_name": name, "status": "DISPATCHED", "create_time": now, "schedule_time": now}
+
+
+def payloads(batch_size: int, status_batch_size: int) -> dict:
+    submitted = [
+        {
+            "index": i,
+            "status": "submitted",
+            "job_type": "data_analysis",
+            "task_name": task_name(),
+            "priority": "bulk",
+            "scheduled_in_seconds": i * 0.5
+        }
+        for i in range(batch_size)
+    ]
+    return {
+        "GET /health": {"status": "healthy"},
+        "POST /auth/verify": {"uid": "u" * 28, "email": "user@example.com", "email_verified": True},
+        "POST /jobs/submit": dict(submitted[0], index=None),
+        f"POST /jobs/submit-batch ({batch_size})": {
+            "submitted": batch_size,
+            "failed": 0,
+            "elapsed_ms": 12.5,
+            "jobs_per_second": 80000.0,
+            "results": submitted
+        },
+        "GET /jobs/status": status(task_name()),
+        f"POST /jobs/status:batch ({status_batch_size})": {
+            "results": [status(task_name()) for _ in range(status_batch_size)]
+        },
+    }
+
+
+def timed(fn, iterations: int):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        response = fn()
+    return (time.perf_counter() - start) / iterations * 1e6, len(response.body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API response serialization benchmark')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--status-batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    variants = {
+        "before": lambda content: JSONResponse(jsonable_encoder(content)),
+        "orjson": lambda content: NegotiatedResponse(jsonable_encoder(content)),
+        "direct": lambda content: NegotiatedResponse(content),
+    }
+    if msgpack is not None:
+        variants["msgpack"] = lambda content: NegotiatedResponse(content, media_type=MSGPACK_MEDIA_TYPE)
+
+    results = []
+    for endpoint, content in payloads(args.batch_size, args.status_batch_size).items():
+        row = {"endpoint": endpoint}
+        for name, build in variants.items():
+            micros, size = timed(lambda: build(content), args.iterations)
+            row[f"{name}_us"] = round(micros, 1)
+            row[f"{name}_bytes"] = size
+        row["speedup"] = round(row["before_us"] / row["direct_us"], 1)
+        results.append(row)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""Load test for the API with stubbed Firebase and queue backends.
+
+Boots ``api.main`` under uvicorn in a subprocess with a Firebase Admin stub
+that accepts ``loadtest-<uid>`` tokens after ``--firebase-latency-ms``. It
+then drives each scenario at ``--concurrency`` for ``--duration`` seconds
+after a ``--warmup``, and prints throughput, latency percentiles and error
+rates as JSON:
+
+    python scripts/load_test.py --concurrency 64 --duration 20
+
+``health``, ``verify`` and ``submit`` run against the in-memory job queue,
+which accepts tasks without running them. ``worker`` boots a second server
+on the local queue, so each request submits an ``llm_process`` job, the
+worker runs it in-process against the mock LLM backend, and the request
+polls ``/jobs/status`` until it finishes; its latency is end to end.
+
+``--save-baseline`` stores the results; later runs compare against the
+stored baseline (``scripts/load_test_baseline.json``, recorded with the
+defaults) and exit with status 1 when throughput, p95/p99 latency or the
+error rate regress beyond the tolerances. A baseline recorded with a
+different load shape or machine (any ``COMPARED_CONFIG`` key differs) is not
+compared at all: the mismatch is reported and the run exits with status 2.
+Rate limits are disabled in
+the booted app unless ``--keep-limits`` is given, since every simulated user
+submits far faster than the production limits allow.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.join(SCRIPT_DIR, "..")
+DEFAULT_BASELINE = os.path.join(SCRIPT_DIR, "load_test_baseline.json")
+TOKEN_PREFIX = "loadtest-"
+SCENARIOS = ("health", "verify", "submit", "worker")
+# Queue backend each scenario's server runs with; the default is "memory".
+SCENARIO_QUEUES = {"worker": "local"}
+
+# Environment for the booted app: offline queue and LLM, no per-user throttles.
+SERVER_ENV = {
+    "PROFILING_ENABLED": "false",
+    "LLM_BACKEND": "mock",
+    "LLM_CACHE_PATH": "",
+}
+UNLIMITED_ENV = {
+    "RATE_LIMIT_ENABLED": "false",
+    "JOBS_SUBMIT_RATE_PER_USER": "0",
+    "JOBS_MAX_SCHEDULE_DELAY_SECONDS": "1000000000",
+}
+
+
+def create_app():
+    """uvicorn app factory: stub Firebase Admin, then import the real app."""
+    sys.path.insert(0, REPO_ROOT)
+    from firebase_admin import auth
+
+    latency = float(os.getenv("LOAD_TEST_FIREBASE_LATENCY_MS", "20")) / 1000
+
+    def verify_id_token(id_token, *args, **kwargs):
+        time.sleep(latency)
+        if not id_token.startswith(TOKEN_PREFIX):
+            raise auth.InvalidIdTokenError("Not a load-test token")
+        uid = id_token[len(TOKEN_PREFIX):]
+        return {"uid": uid, "email": f"{uid}@loadtest.invalid", "email_verified": True,
+                "exp": time.time() + 3600}
+
+    def list_users(*args, **kwargs):
+        time.sleep(latency)
+        return None
+
+    auth.verify_id_token = verify_id_token
+    auth.list_users = list_users
+
+    from api.main import app
+    return app
+
+
+def serve(args):
+    import uvicorn
+
+    uvicorn.run(
+        "load_test:create_app",
+        factory=True,
+        app_dir=SCRIPT_DIR,
+        host="127.0.0.1",
+        port=args.port,
+        workers=args.server_workers,
+        log_level="warning",
+        access_log=False,
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def boot_server(args, queue: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, **SERVER_ENV)
+    if not args.keep_limits:
+        env.update(UNLIMITED_ENV)
+    env["JOB_QUEUE_BACKEND"] = queue
+    env["LOCAL_QUEUE_CONCURRENCY"] = str(args.worker_concurrency)
+    env["LOAD_TEST_FIREBASE_LATENCY_MS"] = str(args.firebase_latency_ms)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "serve",
+         "--port", str(port), "--server-workers", str(args.server_workers)],
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"API server exited with status {server.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"API server not ready after {timeout}s")
+
+
+def build_request(scenario: str, i: int, users: int):
+    token = f"{TOKEN_PREFIX}user{i % users}"
+    if scenario == "health":
+        return "GET", "/health", {}
+    if scenario == "verify":
+        return "POST", "/auth/verify", {"json": {"token": token}}
+    return "POST", "/jobs/submit", {
+        "json": {"job_type": "llm_process", "params": {"prompt": f"load test {i}", "temperature": 0}},
+        "headers": {"Authorization": f"Bearer {token}"}
+    }
+
+
+async def run_job(client: httpx.AsyncClient, i: int, args):
+    """Submit one job and poll its status until the worker has finished it."""
+    method, path, kwargs = build_request("submit", i, args.users)
+    response = await client.request(method, path, **kwargs)
+    if response.status_code >= 400:
+        return response.status_code
+    status_path = f"/jobs/status/{response.json()['task_name']}"
+    while True:
+        response = await client.get(status_path, headers=kwargs["headers"])
+        if response.status_code >= 400:
+            return response.status_code
+        status = response.json()["status"]
+        if status == "SUCCEEDED":
+            return response.status_code
+        if status == "FAILED":
+            return status
+        await asyncio.sleep(args.poll_interval_ms / 1000)
+
+
+async def execute(client: httpx.AsyncClient, scenario: str, i: int, args):
+    """Run one scenario request and return its status code."""
+    if scenario == "worker":
+        return await run_job(client, i, args)
+    method, path, kwargs = build_request(scenario, i, args.users)
+    return (await client.request(method, path, **kwargs)).status_code
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, args) -> dict:
+    latencies = []
+    statuses = Counter()
+    errors = 0
+    counter = iter(range(sys.maxsize))
+    recording = False
+    stop_at = time.monotonic() + args.warmup + args.duration
+
+    async def worker():
+        nonlocal errors
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                status = await execute(client, scenario, next(counter), args)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if recording:
+                latencies.append(elapsed)
+                statuses[str(status)] += 1
+                if not isinstance(status, int) or status >= 400:
+                    errors += 1
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(args.concurrency)]
+    await asyncio.sleep(args.warmup)
+    recording = True
+    measured_from = time.perf_counter()
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - measured_from
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "requests": total,
+        "duration_s": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "status_codes": dict(statuses),
+    }
+
+
+# Run settings that must match the baseline's for the numbers to be comparable.
+COMPARED_CONFIG = ("concurrency", "duration_s", "warmup_s", "users", "firebase_latency_ms",
+                   "server_workers", "worker_concurrency", "cpus")
+
+
+def config_mismatches(current: dict, baseline: dict) -> dict:
+    """``COMPARED_CONFIG`` keys whose values differ between the two runs."""
+    return {
+        key: {"baseline": baseline.get(key), "current": current.get(key)}
+        for key in COMPARED_CONFIG
+        if baseline.get(key) != current.get(key)
+    }
+
+
+def compare(current: dict, baseline: dict, args) -> dict:
+    """Per-scenario changes against the baseline, flagging regressions."""
+    comparison = {}
+    for scenario, stats in current.items():
+        before = baseline.get(scenario)
+        if before is None:
+            continue
+        checks = {}
+        if before["requests_per_second"]:
+            change = stats["requests_per_second"] / before["requests_per_second"] - 1
+            checks["requests_per_second"] = {"change": round(change, 4),
+                                             "regressed": change < -args.max_throughput_drop}
+        for metric in ("p95_ms", "p99_ms"):
+            if before[metric]:
+                change = stats[metric] / before[metric] - 1
+                checks[metric] = {"change": round(change, 4), "regressed": change > args.max_latency_increase}
+        change = stats["error_rate"] - before["error_rate"]
+        checks["error_rate"] = {"change": round(change, 4), "regressed": change > args.max_error_rate_increase}
+        for metric, check in checks.items():
+            check.update(baseline=before[metric], current=stats[metric])
+        comparison[scenario] = checks
+    return comparison
+
+
+async def run_scenarios(scenarios, args, queue=None) -> dict:
+    """Run ``scenarios`` against ``--url``, or a server booted on ``queue``."""
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = args.port or free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = boot_server(args, queue, port)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            await wait_ready(client, server)
+            return {scenario: await run_scenario(client, scenario, args) for scenario in scenarios}
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+async def main_async(args) -> int:
+    results = {}
+    if args.url is not None:
+        results.update(await run_scenarios(args.scenarios, args))
+    else:
+        # One booted server per queue backend, in the order scenarios were given.
+        by_queue = {}
+        for scenario in args.scenarios:
+            by_queue.setdefault(SCENARIO_QUEUES.get(scenario, "memory"), []).append(scenario)
+        for queue, scenarios in by_queue.items():
+            results.update(await run_scenarios(scenarios, args, queue))
+
+    report = {
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "users": args.users,
+            "firebase_latency_ms": args.firebase_latency_ms,
+            "server_workers": args.server_workers,
+            "worker_concurrency": args.worker_concurrency,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count()
+        },
+        "scenarios": results,
+    }
+
+    regressed = False
+    mismatched = False
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline"] = args.baseline
+        mismatches = config_mismatches(report["config"], baseline.get("config", {}))
+        if mismatches:
+            mismatched = True
+            report["config_mismatch"] = mismatches
+            print(f"Not comparing against {args.baseline}: run config differs in "
+                  f"{', '.join(sorted(mismatches))}; rerun with matching options or --save-baseline",
+                  file=sys.stderr)
+        else:
+            report["comparison"] = compare(results, baseline["scenarios"], args)
+            regressed = any(
+                check["regressed"] for checks in report["comparison"].values() for check in checks.values()
+            )
+            report["regressed"] = regressed
+    print(json.dumps(report, indent=2))
+    if mismatched:
+        return 2
+    return 1 if regressed else 0
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        parser = argparse.ArgumentParser(description='Serve the stubbed API for the load test')
+        parser.add_argument('command')
+        parser.add_argument('--port', type=int, required=True)
+        parser.add_argument('--server-workers', type=int, default=1)
+        serve(parser.parse_args())
+        return
+
+    parser = argparse.ArgumentParser(description='API load test')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=2, help='unmeasured seconds before each scenario')
+    parser.add_argument('--users', type=int, default=100, help='distinct simulated users (tokens)')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--firebase-latency-ms', type=float, default=20)
+    parser.add_argument('--server-workers', type=int, default=1)
+    parser.add_argument('--worker-concurrency', type=int, default=32, help='local queue consumers (worker scenario)')
+    parser.add_argument('--poll-interval-ms', type=float, default=20, help='job status polling (worker scenario)')
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--url', default=None, help='drive an already running API instead of booting one')
+    parser.add_argument('--keep-limits', action='store_true', help='leave rate limits enabled')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--max-throughput-drop', type=float, default=0.15)
+    parser.add_argument('--max-latency-increase', type=float, default=0.25)
+    parser.add_argument('--max-error-rate-increase', type=float, default=0.01)
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Data analysis job handlers.
+
+These are CPU-bound and run in the engine's process pool, so they are plain
+functions defined at module level.
+
+Passing ``source`` (a local path or ``gs://bucket/object``) switches
+``data_analysis`` to streaming mode: the file is read ``chunk_rows`` rows at
+a time and per-column statistics are merged chunk by chunk, so memory use
+depends on the chunk size rather than the input size. Streaming mode uses
+pandas (and pyarrow for Parquet), listed in requirements-base.txt.
+Streaming runs checkpoint their running aggregates, so an attempt stopped at
+its deadline resumes after the last checkpointed chunk when redelivered.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from job_context import JobContext
+from startup import snapshot, timed_import
+
+ANALYSIS_DATA_ROOT = os.getenv("ANALYSIS_DATA_ROOT")
+ANALYSIS_CHUNK_ROWS = int(os.getenv("ANALYSIS_CHUNK_ROWS", "100000"))
+# Save a resumable checkpoint every this many chunks (and when stopped early).
+ANALYSIS_CHECKPOINT_CHUNKS = int(os.getenv("ANALYSIS_CHECKPOINT_CHUNKS", "10"))
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+STAT_COLUMNS = ["count", "sum", "mean", "m2", "min", "max"]
+ALL_ROWS = "__all__"
+
+
+def prewarm():
+    """Import the optional dataframe stack in each pool process ahead of jobs."""
+    for name in ("pandas", "pyarrow.parquet"):
+        try:
+            timed_import(name)
+        except ImportError:
+            pass
+
+
+def process_data_analysis(params: Dict[str, Any], ctx: Optional[JobContext] = None) -> Dict[str, Any]:
+    """Process data analysis jobs."""
+    if params.get("source"):
+        return {"status": "completed", "result": analyze_source(params, ctx)}
+    # Implement your data analysis logic here
+    return {"status": "completed", "result": "Data analysis completed"}
+
+
+def _local_path(path: str) -> Path:
+    """Resolve a job-supplied path, refusing anything outside ANALYSIS_DATA_ROOT."""
+    if not ANALYSIS_DATA_ROOT:
+        raise ValueError("Local analysis files are disabled; set ANALYSIS_DATA_ROOT to allow them")
+    root = Path(ANALYSIS_DATA_ROOT).resolve()
+    resolved = (root / path).resolve()
+    if root != resolved and root not in resolved.parents:
+        raise ValueError(f"Analysis files must be inside ANALYSIS_DATA_ROOT: {path}")
+    return resolved
+
+
+def _open_source(source: str):
+    if source.startswith("gs://"):
+        from google.cloud import storage
+
+        bucket, _, blob = source[len("gs://"):].partition("/")
+        client = snapshot("storage_client", storage.Client)
+        # BlobReader streams ranged reads and is seekable, which Parquet needs.
+        return client.bucket(bucket).blob(blob).open("rb")
+    return open(_local_path(source), "rb")
+
+
+def source_version(params: Dict[str, Any]) -> Optional[str]:
+    """Identify the current contents of a streaming job's ``source``.
+
+    The worker's result cache keys on this, so rewriting the file (or
+    uploading a new generation of the object) under the same params
+    runs the analysis again instead of returning the old result.
+    """
+    source = params.get("source")
+    if not source:
+        return None
+    if source.startswith("gs://"):
+        from google.cloud import storage
+
+        bucket, _, name = source[len("gs://"):].partition("/")
+        client = snapshot("storage_client", storage.Client)
+        blob = client.bucket(bucket).get_blob(name)
+        if blob is None:
+            raise FileNotFoundError(f"No such object: {source}")
+        return f"generation:{blob.generation}"
+    stat = _local_path(source).stat()
+    return f"mtime:{stat.st_mtime_ns}:size:{stat.st_size}"
+
+
+def _source_format(source: str, declared: Optional[str]) -> str:
+    if declared:
+        if declared not in FORMATS.values():
+            raise ValueError(f"Unsupported analysis format: {declared}")
+        return declared
+    suffix = Path(source.split("?")[0]).suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Cannot infer the format of {source}; pass 'format'")
+    return FORMATS[suffix]
+
+
+def _iter_chunks(stream, fmt: str, chunk_rows: int, usecols: Optional[List[str]]) -> Iterator[Any]:
+    import pandas as pd
+
+    if fmt == "csv":
+        yield from pd.read_csv(stream, chunksize=chunk_rows, usecols=usecols)
+    elif fmt == "jsonl":
+        for chunk in pd.read_json(stream, lines=True, chunksize=chunk_rows):
+            yield chunk[usecols] if usecols else chunk
+    else:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(stream).iter_batches(batch_size=chunk_rows, columns=usecols):
+            yield batch.to_pandas()
+
+
+def _chunk_stats(frame, columns: Optional[List[str]], group_by: Optional[str]):
+    """Per-(group, column) count/sum/mean/M2/min/max for one chunk."""
+    import pandas as pd
+
+    if columns:
+        values = frame[columns].apply(pd.to_numeric, errors="coerce")
+    else:
+        values = frame.drop(columns=[group_by] if group_by else []).select_dtypes("number")
+    keys = frame[group_by] if group_by else pd.Series(ALL_ROWS, index=frame.index)
+    grouped = values.groupby(keys)
+    count = grouped.count()
+    stats = pd.DataFrame({
+        "count": count.stack(),
+        "sum": grouped.sum().stack(),
+        "mean": grouped.mean().stack(),
+        "m2": (grouped.var(ddof=0) * count).stack(),
+        "min": grouped.min().stack(),
+        "max": grouped.max().stack(),
+    })
+    return stats[STAT_COLUMNS]
+
+
+def _merge_stats(running, chunk):
+    """Combine two stat frames with Chan et al.'s parallel variance update."""
+    import numpy as np
+
+    if running is None:
+        return chunk
+    a, b = running.align(chunk, join="outer")
+    zeros = {"count": 0, "sum": 0.0, "mean": 0.0, "m2": 0.0}
+    a = a.fillna(zeros)
+    b = b.fillna(zeros)
+    n = a["count"] + b["count"]
+    safe_n = n.where(n > 0, 1)
+    delta = b["mean"] - a["mean"]
+    merged = a.copy()
+    merged["count"] = n
+    merged["sum"] = a["sum"] + b["sum"]
+    merged["mean"] = a["mean"] + delta * b["count"] / safe_n
+    merged["m2"] = a["m2"] + b["m2"] + delta ** 2 * a["count"] * b["count"] / safe_n
+    merged["min"] = np.fmin(a["min"], b["min"])
+    merged["max"] = np.fmax(a["max"], b["max"])
+    return merged
+
+
+def _stats_to_records(stats) -> List[list]:
+    return stats.reset_index().values.tolist()
+
+
+def _stats_from_records(records: List[list]):
+    import pandas as pd
+
+    stats = pd.DataFrame(records, columns=["group", "column"] + STAT_COLUMNS).set_index(["group", "column"])
+    stats.index.names = [None, None]
+    return stats
+
+
+def _summarize(stats, grouped: bool) -> Dict[str, Any]:
+    import numpy as np
+
+    summary: Dict[str, Any] = {}
+    for (group, column), row in stats.iterrows():
+        count = int(row["count"])
+        values = {
+            "count": count,
+            "sum": float(row["sum"]),
+            "mean": float(row["mean"]) if count else None,
+            "std": float(np.sqrt(row["m2"] / (count - 1))) if count > 1 else None,
+            "min": None if np.isnan(row["min"]) else float(row["min"]),
+            "max": None if np.isnan(row["max"]) else float(row["max"]),
+        }
+        if grouped:
+            summary.setdefault(str(group), {})[column] = values
+        else:
+            summary[column] = values
+    return summary
+
+
+def analyze_source(params: Dict[str, Any], ctx: Optional[JobContext] = None) -> Dict[str, Any]:
+    """Stream a CSV/JSONL/Parquet source and aggregate its numeric columns.
+
+    Optional params: ``format``, ``columns`` (defaults to every numeric
+    column), ``group_by``, ``chunk_rows`` and ``partials_path``, a file under
+    ANALYSIS_DATA_ROOT that receives the running aggregates as one JSON line
+    per chunk.
+    """
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        raise ValueError("Streaming analysis requires pandas to be installed on the worker")
+
+    source = params["source"]
+    fmt = _source_format(source, params.get("format"))
+    columns = params.get("columns")
+    group_by = params.get("group_by")
+    chunk_rows = int(params.get("chunk_rows") or ANALYSIS_CHUNK_ROWS)
+    partials_path = params.get("partials_path")
+    usecols = list(dict.fromkeys(columns + ([group_by] if group_by else []))) if columns else None
+
+    stats = None
+    rows = 0
+    chunks = 0
+    skip = 0
+    checkpoint = ctx.load_checkpoint() if ctx else None
+    # Only resume a checkpoint taken with the same chunking of the same input.
+    if checkpoint and checkpoint.get("source") == source and checkpoint.get("chunk_rows") == chunk_rows:
+        stats = _stats_from_records(checkpoint["stats"]) if checkpoint["stats"] else None
+        rows = checkpoint["rows"]
+        chunks = skip = checkpoint["chunks"]
+
+    def save_checkpoint():
+        ctx.save_checkpoint({
+            "source": source,
+            "chunk_rows": chunk_rows,
+            "rows": rows,
+            "chunks": chunks,
+            "stats": _stats_to_records(stats) if stats is not None else []
+        })
+
+    partials = open(_local_path(partials_path), "a") if partials_path else None
+    try:
+        with _open_source(source) as stream:
+            for frame in _iter_chunks(stream, fmt, chunk_rows, usecols):
+                # Chunks aggregated by an earlier attempt are read but not recomputed.
+                if skip:
+                    skip -= 1
+                    continue
+                if ctx is not None and ctx.cancelled():
+                    save_checkpoint()
+                    ctx.check()
+                stats = _merge_stats(stats, _chunk_stats(frame, columns, group_by))
+                rows += len(frame)
+                chunks += 1
+                if ctx is not None and chunks % ANALYSIS_CHECKPOINT_CHUNKS == 0:
+                    save_checkpoint()
+                if partials is not None:
+                    partials.write(json.dumps({
+                        "chunk": chunks,
+                        "rows": rows,
+                        "aggregates": _summarize(stats, bool(group_by)),
+                    }) + "\n")
+                    partials.flush()
+    finally:
+        if partials is not None:
+            partials.close()
+    if ctx is not None:
+        ctx.clear_checkpoint()
+
+    return {
+        "source": source,
+        "format": fmt,
+        "rows": rows,
+        "chunks": chunks,
+        "group_by": group_by,
+        "aggregates": _summarize(stats, bool(group_by)) if stats is not None else {},
+    }
@@ -0,0 +1,159 @@
+"""Pooled HTTP delivery for job callbacks, with retries and a dead-letter file."""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+CALLBACK_MAX_CONNECTIONS = int(os.getenv("CALLBACK_MAX_CONNECTIONS", "100"))
+CALLBACK_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("CALLBACK_MAX_KEEPALIVE_CONNECTIONS", "20"))
+CALLBACK_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("CALLBACK_KEEPALIVE_EXPIRY_SECONDS", "30"))
+CALLBACK_TIMEOUT_SECONDS = float(os.getenv("CALLBACK_TIMEOUT_SECONDS", "30"))
+CALLBACK_MAX_ATTEMPTS = int(os.getenv("CALLBACK_MAX_ATTEMPTS", "5"))
+CALLBACK_BACKOFF_BASE_SECONDS = float(os.getenv("CALLBACK_BACKOFF_BASE_SECONDS", "0.5"))
+CALLBACK_BACKOFF_MAX_SECONDS = float(os.getenv("CALLBACK_BACKOFF_MAX_SECONDS", "30"))
+CALLBACK_DEAD_LETTER_PATH = os.getenv("CALLBACK_DEAD_LETTER_PATH", "/tmp/dg-callback-dead-letters.jsonl")
+
+# Worth retrying: the receiver is overloaded or briefly unavailable.
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CallbackClient:
+    """Shared keep-alive client for outbound worker requests.
+
+    httpx clients are bound to the event loop that created them, so one
+    client is kept per running loop; a worker with a long-lived loop reuses a
+    single connection pool for every callback.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = CALLBACK_MAX_CONNECTIONS,
+        max_keepalive_connections: int = CALLBACK_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = CALLBACK_KEEPALIVE_EXPIRY_SECONDS,
+        timeout: float = CALLBACK_TIMEOUT_SECONDS,
+        max_attempts: int = CALLBACK_MAX_ATTEMPTS,
+        backoff_base: float = CALLBACK_BACKOFF_BASE_SECONDS,
+        backoff_max: float = CALLBACK_BACKOFF_MAX_SECONDS,
+        dead_letter_path: Optional[str] = CALLBACK_DEAD_LETTER_PATH,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letter_path = dead_letter_path
+        self.transport = transport
+        self.http2 = _http2_available()
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._dead_letter_lock = threading.Lock()
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_event_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout, http2=self.http2, transport=self.transport
+            )
+            self._clients[loop] = client
+        return client
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        # Full jitter keeps a burst of failed callbacks from retrying in lockstep.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    async def post(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        max_attempts: Optional[int] = None,
+        dead_letter: bool = True,
+    ) -> bool:
+        """POST ``payload`` as JSON, retrying transient failures.
+
+        Returns True on success. When every attempt fails the request is
+        appended to the dead-letter file (if enabled) and False is returned;
+        delivery errors never propagate, since the job itself has finished.
+        """
+        attempts = max_attempts or self.max_attempts
+        error = None
+        for attempt in range(1, attempts + 1):
+            response = None
+            try:
+                response = await self.client().post(url, json=payload, headers=headers)
+                if response.status_code < 400:
+                    return True
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    break
+            except (httpx.UnsupportedProtocol, httpx.InvalidURL, TypeError, ValueError) as e:
+                # A bad URL or an unserializable payload fails the same way every time.
+                error = f"{type(e).__name__}: {e}"
+                break
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            if attempt < attempts:
+                await asyncio.sleep(self._backoff(attempt, response))
+
+        print(f"Failed to send callback to {url} after {attempt} attempt(s): {error}")
+        if dead_letter:
+            await self.dead_letter(url, payload, error, attempt)
+        return False
+
+    async def dead_letter(self, url: str, payload: Dict[str, Any], error: Optional[str], attempts: int):
+        if not self.dead_letter_path:
+            return
+        record = json.dumps({
+            "url": url,
+            "payload": payload,
+            "error": error,
+            "attempts": attempts,
+            "failed_at": time.time(),
+        }, default=str)
+
+        def append():
+            with self._dead_letter_lock:
+                with open(self.dead_letter_path, "a") as f:
+                    f.write(record + "\n")
+
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, append)
+        except OSError as e:
+            print(f"Failed to write callback dead letter: {str(e)}")
+
+    async def aclose(self):
+        """Close the client owned by the current loop."""
+        client = self._clients.pop(asyncio.get_event_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+callback_client = CallbackClient()
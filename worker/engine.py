@@ -0,0 +1,339 @@
+"""Job handler registry and execution engine for the worker."""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
+import startup
+from job_context import JobCancelled, JobContext
+
+ENGINE_PROCESS_WORKERS = int(os.getenv("ENGINE_PROCESS_WORKERS") or os.cpu_count() or 1)
+# Threads (the engine loop, gRPC, httpx) make fork() unsafe, so CPU-bound
+# handlers run in spawned processes by default.
+ENGINE_PROCESS_START_METHOD = os.getenv("ENGINE_PROCESS_START_METHOD", "spawn")
+# Process handlers stop themselves at ctx.deadline (checkpointing first), so
+# the parent waits this much longer for that answer. Keep it below the
+# worker's JOB_DEADLINE_MARGIN_SECONDS.
+ENGINE_PROCESS_GRACE_SECONDS = float(os.getenv("ENGINE_PROCESS_GRACE_SECONDS", "5"))
+
+HANDLER_KINDS = ("async", "thread", "process")
+
+
+class JobRejected(Exception):
+    """A job type's wait queue is full; the caller should retry later."""
+
+
+class JobTimeout(Exception):
+    """A job exceeded its handler's timeout or its task's deadline."""
+
+
+class JobInvalid(Exception):
+    """A job's params are malformed; redelivering it cannot succeed."""
+
+
+def _env_override(job_type: str, setting: str, default):
+    value = os.getenv(f"JOB_{setting}_{job_type.upper()}")
+    if value is None:
+        return default
+    return float(value) if setting == "TIMEOUT" else int(value)
+
+
+@dataclass
+class JobHandler:
+    job_type: str
+    # A callable, or a "module:function" reference imported on first use.
+    func: Union[Callable[[Dict[str, Any]], Any], str]
+    kind: str
+    concurrency: int
+    max_queue: int
+    timeout: Optional[float]
+    cacheable: bool = True
+    context: bool = False
+    # Returns a version of the job's external inputs for the cache key; a
+    # callable or a "module:function" reference like ``func``.
+    cache_version: Union[Callable[[Dict[str, Any]], Optional[str]], str, None] = None
+
+    @property
+    def loaded(self) -> bool:
+        return not isinstance(self.func, str)
+
+    @property
+    def module(self) -> str:
+        return self.func.partition(":")[0] if isinstance(self.func, str) else self.func.__module__
+
+    def load(self) -> Callable[[Dict[str, Any]], Any]:
+        if isinstance(self.func, str):
+            self.func = startup.load_target(self.func)
+        return self.func
+
+    def input_version(self, params: Dict[str, Any]) -> Optional[str]:
+        if self.cache_version is None:
+            return None
+        if isinstance(self.cache_version, str):
+            self.cache_version = startup.load_target(self.cache_version)
+        return self.cache_version(params)
+
+
+class JobRegistry:
+    """Maps job types to handlers and their execution limits.
+
+    ``kind`` selects where a handler runs: ``async`` handlers are awaited on
+    the engine loop (I/O-bound work), ``thread`` handlers run on the loop's
+    default thread pool, and ``process`` handlers run in a process pool
+    (CPU-bound work; the function must be importable at module level).
+    Passing ``func`` as a ``"module:function"`` string defers the import to
+    the first job of that type; ``process`` handlers given this way are only
+    ever imported in the pool's child processes (their ``cache_version``
+    reference, if any, is imported in the parent).
+    Limits can be overridden per type with ``JOB_CONCURRENCY_<TYPE>``,
+    ``JOB_MAX_QUEUE_<TYPE>`` and ``JOB_TIMEOUT_<TYPE>``. Results of
+    ``cacheable`` types are deduplicated by the worker's result cache, so
+    only pure handlers should leave it enabled; a handler that reads inputs
+    outside its params (files, objects) passes ``cache_version`` so a change
+    to them changes the key. Handlers registered with
+    ``context=True`` are called as ``func(params, ctx)`` with a
+    ``JobContext`` for cooperative cancellation and checkpoints.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, JobHandler] = {}
+
+    def register(
+        self,
+        job_type: str,
+        func: Union[Callable[[Dict[str, Any]], Any], str],
+        kind: str = "async",
+        concurrency: int = 16,
+        max_queue: int = 1000,
+        timeout: Optional[float] = None,
+        cacheable: bool = True,
+        context: bool = False,
+        cache_version: Union[Callable[[Dict[str, Any]], Optional[str]], str, None] = None,
+    ) -> JobHandler:
+        if kind not in HANDLER_KINDS:
+            raise ValueError(f"Unknown handler kind: {kind}")
+        handler = JobHandler(
+            job_type=job_type,
+            func=func,
+            kind=kind,
+            concurrency=_env_override(job_type, "CONCURRENCY", concurrency),
+            max_queue=_env_override(job_type, "MAX_QUEUE", max_queue),
+            timeout=_env_override(job_type, "TIMEOUT", timeout),
+            cacheable=cacheable,
+            context=context,
+            cache_version=cache_version,
+        )
+        self._handlers[job_type] = handler
+        return handler
+
+    def get(self, job_type: str) -> JobHandler:
+        handler = self._handlers.get(job_type)
+        if handler is None:
+            raise JobInvalid(f"Unknown job type: {job_type}")
+        return handler
+
+    def __contains__(self, job_type: str) -> bool:
+        return job_type in self._handlers
+
+    def __iter__(self):
+        return iter(self._handlers.values())
+
+
+class _Lane:
+    """Concurrency limit and wait queue for one job type."""
+
+    def __init__(self, handler: JobHandler):
+        self.semaphore = asyncio.Semaphore(handler.concurrency)
+        self.waiting = 0
+        self.running = 0
+
+
+class ExecutionEngine:
+    """Runs jobs on one long-lived event loop with per-type limits.
+
+    The loop lives on a daemon thread, so shared state such as pooled HTTP
+    clients survives across requests no matter which thread or loop the
+    request arrived on.
+    """
+
+    def __init__(self, registry: JobRegistry, process_workers: int = ENGINE_PROCESS_WORKERS):
+        self.registry = registry
+        self.process_workers = process_workers
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lanes: Dict[str, _Lane] = {}
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="job-engine", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self.loop = loop
+        return self.loop
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # Each child imports and prewarms every process handler up front.
+            modules = sorted({handler.module for handler in self.registry if handler.kind == "process"})
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context(ENGINE_PROCESS_START_METHOD),
+                initializer=startup.warm_child,
+                initargs=(modules,),
+            )
+        return self._process_pool
+
+    async def call(self, coro: Awaitable[Any]) -> Any:
+        """Await ``coro`` on the engine loop from any loop."""
+        loop = self.start()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def run_sync(self, coro: Awaitable[Any]) -> Any:
+        """Run ``coro`` on the engine loop and block the calling thread for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self.start()).result()
+
+    async def run(self, job_type: str, params: Dict[str, Any], ctx: Optional[JobContext] = None) -> Dict[str, Any]:
+        """Run one job; ``ctx.deadline`` further bounds the handler's timeout.
+
+        Cancelling the awaiting task cancels the job: async handlers see
+        ``CancelledError`` and the context's cancel event is set for the rest.
+        """
+        return await self.call(self._run(self.registry.get(job_type), params, ctx))
+
+    async def _run(self, handler: JobHandler, params: Dict[str, Any], ctx: Optional[JobContext]) -> Dict[str, Any]:
+        lane = self._lanes.get(handler.job_type)
+        if lane is None:
+            lane = self._lanes[handler.job_type] = _Lane(handler)
+
+        if lane.semaphore.locked() and lane.waiting >= handler.max_queue:
+            raise JobRejected(f"{handler.job_type} queue is full ({handler.max_queue} waiting)")
+
+        lane.waiting += 1
+        try:
+            await lane.semaphore.acquire()
+        finally:
+            lane.waiting -= 1
+        lane.running += 1
+        child: Optional[Future] = None
+        try:
+            timeout = handler.timeout
+            if ctx is not None:
+                if timeout is not None:
+                    deadline = time.time() + timeout
+                    ctx.deadline = deadline if ctx.deadline is None else min(ctx.deadline, deadline)
+                timeout = ctx.remaining()
+                if timeout is not None and timeout <= 0:
+                    raise JobTimeout(f"{handler.job_type} job reached its deadline while queued")
+            args = (params, ctx or JobContext(job_id="")) if handler.context else (params,)
+            if handler.kind == "process":
+                child = self._submit(handler, args)
+                work = asyncio.wrap_future(child)
+                grace = ENGINE_PROCESS_GRACE_SECONDS if timeout is not None else None
+            else:
+                work = self._invoke(handler, args)
+                grace = None
+            return await asyncio.wait_for(work, timeout + grace if grace else timeout)
+        except asyncio.TimeoutError:
+            raise JobTimeout(f"{handler.job_type} job exceeded {timeout:.0f}s")
+        except JobCancelled as e:
+            raise JobTimeout(str(e))
+        finally:
+            # Thread handlers outlive wait_for; tell cooperative ones to stop.
+            if ctx is not None and ctx.cancel_event is not None:
+                ctx.cancel_event.set()
+            # A child that already started cannot be interrupted: keep the
+            # type's slot until it exits so the pool is never oversubscribed.
+            if child is not None and not child.cancel() and not child.done():
+                loop = asyncio.get_event_loop()
+                child.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, lane))
+            else:
+                self._release(lane)
+
+    @staticmethod
+    def _release(lane: _Lane):
+        lane.running -= 1
+        lane.semaphore.release()
+
+    async def _load(self, handler: JobHandler) -> Callable[[Dict[str, Any]], Any]:
+        if handler.loaded:
+            return handler.func
+        # Import off the loop so other job types keep running meanwhile.
+        return await asyncio.get_event_loop().run_in_executor(None, handler.load)
+
+    def _submit(self, handler: JobHandler, args: Tuple[Any, ...]) -> Future:
+        pool = self._get_process_pool()
+        if handler.loaded:
+            return pool.submit(handler.func, *args)
+        return pool.submit(startup.call_target, handler.func, *args)
+
+    async def _invoke(self, handler: JobHandler, args: Tuple[Any, ...]) -> Any:
+        loop = asyncio.get_event_loop()
+        func = await self._load(handler)
+        if handler.kind == "async":
+            return await func(*args)
+        return await loop.run_in_executor(None, func, *args)
+
+    async def prewarm(self, job_types: Iterable[str]):
+        """Import handlers and run their module's ``prewarm`` hook ahead of traffic.
+
+        ``process`` handlers are warmed by starting the pool, whose children
+        run the hooks; other handlers call a sync or async ``prewarm`` here.
+        """
+        for job_type in job_types:
+            handler = self.registry.get(job_type)
+            started = time.perf_counter()
+            loop = asyncio.get_event_loop()
+            if handler.kind == "process":
+                pool = self._get_process_pool()
+                await asyncio.gather(*(
+                    loop.run_in_executor(pool, time.sleep, 0) for _ in range(self.process_workers)
+                ))
+            else:
+                await self._load(handler)
+                hook = getattr(startup.timed_import(handler.module), "prewarm", None)
+                if asyncio.iscoroutinefunction(hook):
+                    await hook()
+                elif hook is not None:
+                    await loop.run_in_executor(None, hook)
+            startup.record_prewarm(job_type, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            job_type: {"running": lane.running, "waiting": lane.waiting}
+            for job_type, lane in self._lanes.items()
+        }
+
+    def shutdown(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+            self._process_pool = None
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self.loop = None
+            self._thread = None
+
+
+registry = JobRegistry()
+engine = ExecutionEngine(registry)
@@ -0,0 +1,112 @@
+"""Content-addressed job deduplication and result cache.
+
+Cloud Tasks delivers at least once, so the same job can arrive twice. Jobs
+are keyed on ``(job_type, canonical params, user_id)`` plus the version of
+any external input the job reads (see ``JobHandler.cache_version``): a
+duplicate that arrives while the first run is in flight waits for it, and
+one that arrives later is answered from the cache.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from single_flight import SingleFlight
+
+JOB_RESULT_CACHE_TTL_SECONDS = float(os.getenv("JOB_RESULT_CACHE_TTL_SECONDS", "3600"))
+JOB_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("JOB_RESULT_CACHE_MAX_ENTRIES", "10000"))
+JOB_RESULT_CACHE_MAX_BYTES = int(os.getenv("JOB_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def job_key(job_type: str, params: Dict[str, Any], user_id: str, version: Optional[str] = None) -> str:
+    canonical = json.dumps(
+        {"job_type": job_type, "params": params, "user_id": user_id, "version": version},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class JobResultCache:
+    """LRU of successful job results bounded by TTL, entry count and size.
+
+    Cached results are shared between callers and must be treated as
+    read-only. Failures are never cached.
+    """
+
+    def __init__(
+        self,
+        ttl: float = JOB_RESULT_CACHE_TTL_SECONDS,
+        max_entries: int = JOB_RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = JOB_RESULT_CACHE_MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        # A run started by one delivery keeps going if that delivery is
+        # cancelled, so duplicates waiting on it still get its result.
+        self._flights = SingleFlight()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, result = entry
+        if time.time() >= expires_at:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _put(self, key: str, result: Dict[str, Any]):
+        size = len(json.dumps(result, default=str))
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.time() + self.ttl, size, result)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    async def get_or_run(self, key: str, run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        result = self._get(key)
+        if result is not None:
+            self._stats["hits"] += 1
+            return result
+
+        if key in self._flights:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["misses"] += 1
+        result, _ = await self._flights.do(key, lambda: self._run(key, run))
+        return result
+
+    async def _run(self, key: str, run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        result = await run()
+        if self._flights.is_current(key):
+            self._put(key, result)
+        return result
+
+    def invalidate(self, key: str):
+        self._flights.forget(key)
+        if key in self._entries:
+            self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, entries=len(self._entries), bytes=self._bytes, inflight=len(self._flights))
+
+
+job_cache = JobResultCache()
@@ -0,0 +1,161 @@
+"""Deadlines, cooperative cancellation and checkpoints for long-running jobs.
+
+Handlers registered with ``context=True`` receive a ``JobContext`` next to
+their params. Long loops should call ``ctx.check()`` between units of work
+and ``ctx.save_checkpoint(state)`` every so often; when the job's deadline
+passes, ``check`` raises ``JobCancelled`` and the task is redelivered, and
+the next attempt picks up from ``ctx.load_checkpoint()`` instead of starting
+over. Checkpoints are keyed by task name, which is stable across Cloud Tasks
+redeliveries, so they must live somewhere every instance can read:
+``JOB_CHECKPOINT_BUCKET`` (GCS) in production, ``JOB_CHECKPOINT_DIR`` locally.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+JOB_CHECKPOINT_BUCKET = os.getenv("JOB_CHECKPOINT_BUCKET")
+JOB_CHECKPOINT_DIR = os.getenv("JOB_CHECKPOINT_DIR", "/tmp/dg-job-checkpoints")
+JOB_CHECKPOINT_PREFIX = os.getenv("JOB_CHECKPOINT_PREFIX", "job-checkpoints")
+
+
+class JobCancelled(Exception):
+    """A job stopped early because its deadline passed or it was cancelled."""
+
+
+class CheckpointStore:
+    """Interface for where job checkpoints are kept. Stores must pickle."""
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save(self, job_id: str, state: Dict[str, Any]):
+        raise NotImplementedError
+
+    def clear(self, job_id: str):
+        raise NotImplementedError
+
+
+def _object_name(job_id: str) -> str:
+    # Task names contain slashes; keep one flat object per job.
+    return job_id.replace("/", "_") + ".json"
+
+
+class LocalCheckpointStore(CheckpointStore):
+    """JSON files in a directory; only survives redelivery to the same host."""
+
+    def __init__(self, directory: str = JOB_CHECKPOINT_DIR):
+        self.directory = directory
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, _object_name(job_id))
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, job_id: str, state: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._path(job_id))
+
+    def clear(self, job_id: str):
+        try:
+            os.remove(self._path(job_id))
+        except FileNotFoundError:
+            pass
+
+
+class GCSCheckpointStore(CheckpointStore):
+    """JSON objects in a GCS bucket, readable from any worker instance."""
+
+    def __init__(self, bucket: str, prefix: str = JOB_CHECKPOINT_PREFIX):
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _blob(self, job_id: str):
+        from google.cloud import storage
+        from startup import snapshot
+
+        client = snapshot("storage_client", storage.Client)
+        return client.bucket(self.bucket).blob(f"{self.prefix}/{_object_name(job_id)}")
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return json.loads(self._blob(job_id).download_as_bytes())
+        except NotFound:
+            return None
+
+    def save(self, job_id: str, state: Dict[str, Any]):
+        self._blob(job_id).upload_from_string(json.dumps(state), content_type="application/json")
+
+    def clear(self, job_id: str):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self._blob(job_id).delete()
+        except NotFound:
+            pass
+
+
+def checkpoint_store_from_env() -> CheckpointStore:
+    if JOB_CHECKPOINT_BUCKET:
+        return GCSCheckpointStore(JOB_CHECKPOINT_BUCKET)
+    return LocalCheckpointStore()
+
+
+@dataclass
+class JobContext:
+    """Per-job deadline, cancellation flag and checkpoint access.
+
+    ``deadline`` is wall-clock time so it means the same thing in the
+    engine's process-pool children. The cancellation event only reaches
+    async and thread handlers; process handlers stop on the deadline alone.
+    """
+
+    job_id: str
+    deadline: Optional[float] = None
+    checkpoints: Optional[CheckpointStore] = None
+    cancel_event: Optional[threading.Event] = field(default=None, repr=False)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["cancel_event"] = None
+        return state
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def cancelled(self) -> bool:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return True
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self):
+        """Raise ``JobCancelled`` if the job should stop now."""
+        if self.cancelled():
+            raise JobCancelled(f"Job {self.job_id} was cancelled or reached its deadline")
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        return self.checkpoints.load(self.job_id) if self.checkpoints else None
+
+    def save_checkpoint(self, state: Dict[str, Any]):
+        if self.checkpoints:
+            self.checkpoints.save(self.job_id, state)
+
+    def clear_checkpoint(self):
+        if self.checkpoints:
+            self.checkpoints.clear(self.job_id)
@@ -0,0 +1,172 @@
+"""Micro-batching of llm_process requests into batched backend calls.
+
+Concurrent jobs are collected for up to ``max_batch_size`` items or
+``max_wait_ms`` milliseconds, whichever comes first, sent to the model
+backend as one request, and the results are scattered back to each waiting
+job. Batching amortizes the backend's per-call overhead, which dominates for
+short prompts.
+"""
+import asyncio
+import hashlib
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# "http" (the default when LLM_BACKEND_URL is set) or "mock" for offline runs.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "")
+LLM_BACKEND_URL = os.getenv("LLM_BACKEND_URL")
+LLM_BACKEND_TIMEOUT_SECONDS = float(os.getenv("LLM_BACKEND_TIMEOUT_SECONDS", "120"))
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "16"))
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "10"))
+LLM_BATCH_MAX_INFLIGHT = int(os.getenv("LLM_BATCH_MAX_INFLIGHT", "4"))
+
+
+class LLMBackend:
+    """Interface for the model service behind llm_process jobs.
+
+    ``identity`` names the service that produced a result; the prompt cache
+    keys on it so results from one backend are never served for another.
+    """
+
+    identity = "unknown"
+
+    async def generate_batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return one result per request, in order."""
+        raise NotImplementedError
+
+
+class HTTPLLMBackend(LLMBackend):
+    """POSTs ``{"requests": [...]}`` to a batch endpoint expecting ``{"results": [...]}``."""
+
+    def __init__(self, url: str, timeout: float = LLM_BACKEND_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+        self.identity = f"http:{url}"
+
+    async def generate_batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        from callbacks import callback_client
+
+        response = await callback_client.client().post(
+            self.url, json={"requests": requests}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()["results"]
+
+
+class MockLLMBackend(LLMBackend):
+    """Offline stand-in with a fixed per-call overhead plus a per-item cost.
+
+    Output is a deterministic function of the request, so results can be
+    compared across runs and batch sizes.
+    """
+
+    identity = "mock"
+
+    def __init__(self, call_latency: float = 0.05, item_latency: float = 0.002):
+        self.call_latency = call_latency
+        self.item_latency = item_latency
+        self.calls = 0
+
+    async def generate_batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.calls += 1
+        await asyncio.sleep(self.call_latency + self.item_latency * len(requests))
+        results = []
+        for request in requests:
+            prompt = str(request.get("prompt", ""))
+            digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+            results.append({
+                "text": f"mock completion {digest}",
+                "model": request.get("model") or "mock",
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 3},
+            })
+        return results
+
+
+class MicroBatcher:
+    """Coalesces concurrent ``submit`` calls into batched backend requests.
+
+    Must be used from a single event loop (the worker's engine loop).
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        max_batch_size: int = LLM_BATCH_MAX_SIZE,
+        max_wait_ms: float = LLM_BATCH_MAX_WAIT_MS,
+        max_inflight: int = LLM_BATCH_MAX_INFLIGHT,
+    ):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stats = {"batches": 0, "items": 0, "errors": 0}
+
+    async def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_event_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            asyncio.get_event_loop().create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        # Callers that gave up (timeout, cancellation) are not sent upstream.
+        batch = [(request, future) for request, future in batch if not future.done()]
+        if not batch:
+            return
+        async with self._inflight:
+            try:
+                results = await self.backend.generate_batch([request for request, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"LLM backend returned {len(results)} results for {len(batch)} requests")
+            except Exception as e:
+                self._stats["errors"] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        self._stats["batches"] += 1
+        self._stats["items"] += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return dict(self._stats, mean_batch_size=self._stats["items"] / batches if batches else 0.0)
+
+
+def backend_from_env() -> LLMBackend:
+    """The configured backend; the mock is never chosen implicitly."""
+    kind = LLM_BACKEND or ("http" if LLM_BACKEND_URL else "")
+    if kind == "mock":
+        return MockLLMBackend()
+    if kind == "http":
+        if not LLM_BACKEND_URL:
+            raise RuntimeError("LLM_BACKEND=http requires LLM_BACKEND_URL")
+        return HTTPLLMBackend(LLM_BACKEND_URL)
+    if kind:
+        raise RuntimeError(f"Unknown LLM_BACKEND: {kind}")
+    raise RuntimeError("No LLM backend configured; set LLM_BACKEND_URL, or LLM_BACKEND=mock for offline use")
+
+
+_batcher: Optional[MicroBatcher] = None
+
+
+def get_batcher() -> MicroBatcher:
+    """The process-wide batcher, created on first use inside the engine loop."""
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(backend_from_env())
+    return _batcher
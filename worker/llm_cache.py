@@ -0,0 +1,204 @@
+"""Result cache for deterministic llm_process prompts.
+
+Only requests with ``temperature == 0`` are cached. Lookups hit an
+in-memory LRU first and then an on-disk SQLite store that survives restarts
+and is shared by every worker process on the instance. Lookups are counted
+in ``worker_llm_cache_lookups_total`` by result; the hit ratio is
+``sum(rate(...{result=~".*_hit"})) / sum(rate(...))``.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "/tmp/dg-llm-cache.sqlite3")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_MAX_DISK_BYTES = int(os.getenv("LLM_CACHE_MAX_DISK_BYTES", str(256 * 1024 * 1024)))
+
+# Request fields that change the generated output, plus the identity of the
+# backend that generated it.
+KEY_FIELDS = ("prompt", "system", "model", "max_tokens", "temperature", "backend")
+
+LLM_CACHE_LOOKUPS = Counter(
+    "worker_llm_cache_lookups_total",
+    "llm_process prompt cache lookups by result",
+    ["result"]
+)
+
+
+def _normalize_text(value: Any) -> Any:
+    # Only line endings are folded: leading/trailing whitespace and Unicode
+    # forms reach the model unchanged and can change its output.
+    if not isinstance(value, str):
+        return value
+    return value.replace("\r\n", "\n")
+
+
+def is_deterministic(request: Dict[str, Any]) -> bool:
+    """Whether ``request`` is sampled at temperature 0.
+
+    Raises ``ValueError`` for a temperature that is not a non-negative number.
+    """
+    temperature = request.get("temperature")
+    if temperature is None:
+        return False
+    try:
+        value = float(temperature)
+    except (TypeError, ValueError):
+        raise ValueError(f"temperature must be a number, got {temperature!r}") from None
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"temperature must be a non-negative number, got {temperature!r}")
+    return value == 0.0
+
+
+def prompt_cache_key(request: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        {field: _normalize_text(request.get(field)) for field in KEY_FIELDS},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class PromptCache:
+    """Two-tier prompt result cache: memory LRU over a size-bounded SQLite file.
+
+    The disk tier evicts least recently read entries once it exceeds
+    ``max_disk_bytes``. Set ``path`` to an empty string to keep the cache in
+    memory only.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_disk_bytes: int = LLM_CACHE_MAX_DISK_BYTES,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        # One thread owns the SQLite connection and keeps disk I/O off the loop.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache") if path else None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_results ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS prompt_results_accessed ON prompt_results (accessed)")
+            db.commit()
+            self._disk_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM prompt_results").fetchone()[0]
+            self._db = db
+        return self._db
+
+    async def _on_disk(self, fn, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, fn, *args)
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        db = self._connect()
+        with db:
+            row = db.execute("SELECT value FROM prompt_results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                db.execute("UPDATE prompt_results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+
+    def _disk_put(self, key: str, value: str):
+        db = self._connect()
+        size = len(key) + len(value)
+        with db:
+            previous = db.execute("SELECT size FROM prompt_results WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO prompt_results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+        self._disk_bytes += size - (previous[0] if previous else 0)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._disk_evict()
+
+    def _disk_evict(self):
+        # Trim to 90% of the budget so eviction does not run on every write.
+        target = int(self.max_disk_bytes * 0.9)
+        db = self._connect()
+        with db:
+            while self._disk_bytes > target:
+                rows = db.execute(
+                    "SELECT key, size FROM prompt_results ORDER BY accessed LIMIT 100"
+                ).fetchall()
+                if not rows:
+                    break
+                db.executemany("DELETE FROM prompt_results WHERE key = ?", [(key,) for key, _ in rows])
+                self._disk_bytes -= sum(size for _, size in rows)
+                self._stats["evictions"] += len(rows)
+        # Other processes write to the same file; resync the running total.
+        self._disk_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM prompt_results").fetchone()[0]
+
+    async def open(self):
+        if self._executor is not None:
+            await self._on_disk(self._connect)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            LLM_CACHE_LOOKUPS.labels("memory_hit").inc()
+            # Callers get their own copy so they cannot change the cached result.
+            return dict(value)
+        if self._executor is not None:
+            raw = await self._on_disk(self._disk_get, key)
+            if raw is not None:
+                value = json.loads(raw)
+                self._remember(key, value)
+                self._stats["disk_hits"] += 1
+                LLM_CACHE_LOOKUPS.labels("disk_hit").inc()
+                return dict(value)
+        self._stats["misses"] += 1
+        LLM_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    async def put(self, key: str, value: Dict[str, Any]):
+        self._remember(key, dict(value))
+        self._stats["writes"] += 1
+        if self._executor is not None:
+            await self._on_disk(self._disk_put, key, json.dumps(value))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return dict(
+            self._stats,
+            hit_ratio=hits / lookups if lookups else 0.0,
+            memory_entries=len(self._memory),
+            disk_bytes=self._disk_bytes,
+        )
+
+
+_prompt_cache: Optional[PromptCache] = None
+
+
+def get_prompt_cache() -> PromptCache:
+    global _prompt_cache
+    if _prompt_cache is None:
+        _prompt_cache = PromptCache()
+    return _prompt_cache
@@ -0,0 +1,36 @@
+"""LLM job handlers."""
+from typing import Any, Dict
+
+from engine import JobInvalid
+from llm_batcher import get_batcher
+from llm_cache import get_prompt_cache, is_deterministic, prompt_cache_key
+
+# Fields forwarded to the model backend; anything else in params is ignored.
+LLM_REQUEST_FIELDS = ("prompt", "model", "temperature", "max_tokens", "system")
+
+
+async def prewarm():
+    """Create the batcher and open the prompt cache before the first job."""
+    get_batcher()
+    await get_prompt_cache().open()
+
+
+async def process_llm_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Process LLM-related jobs."""
+    request = {field: params[field] for field in LLM_REQUEST_FIELDS if field in params}
+    try:
+        deterministic = is_deterministic(request)
+    except ValueError as e:
+        raise JobInvalid(str(e)) from None
+    # Sampled output differs between calls, so only temperature 0 is cached.
+    if not deterministic:
+        return {"status": "completed", "result": await get_batcher().submit(request)}
+
+    batcher = get_batcher()
+    cache = get_prompt_cache()
+    key = prompt_cache_key(dict(request, backend=batcher.backend.identity))
+    result = await cache.get(key)
+    if result is None:
+        result = await batcher.submit(request)
+        await cache.put(key, result)
+    return {"status": "completed", "result": result}
@@ -1,16 +1,90 @@
 import functions_framework
 from flask import Request
+import asyncio
 import json
+import multiprocessing
 import os
-from typing import Dict, Any
-import httpx
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+import startup
+from callbacks import callback_client
+from engine import JobInvalid, JobRejected, JobTimeout, engine, registry
+from job_cache import job_cache, job_key
+from job_context import JobContext, checkpoint_store_from_env
+
+# Where to report job state transitions (the API's POST /jobs/events).
+JOB_EVENTS_URL = os.getenv("JOB_EVENTS_URL")
+JOB_EVENTS_TOKEN = os.getenv("JOB_EVENTS_TOKEN")
+# Stop this long before the queue's dispatch deadline, leaving time to save a
+# checkpoint and answer before the task is redelivered.
+JOB_DEADLINE_MARGIN_SECONDS = float(os.getenv("JOB_DEADLINE_MARGIN_SECONDS", "10"))
+# Job types to import and warm at container start: comma-separated or "all".
+WORKER_PREWARM = os.getenv("WORKER_PREWARM", "")
+
+# I/O-bound types run on the engine loop; CPU-bound types get a process each.
+# Handlers are referenced by name so each module is imported on first use.
+# llm_process dedupes deterministic prompts in its own cache; sampled ones
+# must not be answered with another job's output.
+registry.register("llm_process", "llm_jobs:process_llm_job", kind="async", concurrency=32, timeout=300, cacheable=False)
+registry.register(
+    "data_analysis",
+    "analysis_jobs:process_data_analysis",
+    kind="process",
+    concurrency=os.cpu_count() or 1,
+    timeout=900,
+    context=True,
+    # Streaming runs read a file or object that can change under the same params.
+    cache_version="analysis_jobs:source_version"
+)
+
+checkpoint_store = checkpoint_store_from_env()
+
+# Spawned pool processes re-import a script run as __main__; never prewarm there.
+if WORKER_PREWARM and multiprocessing.parent_process() is None:
+    prewarm_types = [h.job_type for h in registry] if WORKER_PREWARM == "all" else WORKER_PREWARM.split(",")
+    engine.run_sync(engine.prewarm([job_type.strip() for job_type in prewarm_types if job_type.strip()]))
+startup.mark_ready()
 
 @functions_framework.http
-async def process_job(request: Request):
+def process_job(request: Request):
     """Cloud Run function to process long-running jobs."""
+    # Only the Cloud Run entrypoint logs this; the local queue imports this
+    # module into the API process and calls handle_job instead.
+    startup.log_report()
+    if request.method == "GET" and request.path.rstrip("/").endswith("/metrics"):
+        return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+    if request.method == "GET":
+        return engine.run_sync(worker_stats())
+    # Every job runs on the engine's long-lived loop, so concurrent requests
+    # share its per-type limits and connection pools.
+    return engine.run_sync(_handle_job(request.get_json(silent=True)))
+
+async def worker_stats() -> Dict[str, Any]:
+    """Startup, engine, cache and batcher counters for this worker instance."""
+    stats = {
+        "startup": startup.report(),
+        "engine": engine.stats(),
+        "job_cache": job_cache.stats()
+    }
+    # Only report LLM components once a job has loaded them.
+    if registry.get("llm_process").loaded:
+        from llm_batcher import get_batcher
+        from llm_cache import get_prompt_cache
+
+        stats["llm_cache"] = get_prompt_cache().stats()
+        stats["llm_batcher"] = get_batcher().stats()
+    return stats
+
+async def handle_job(request_json: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """Run one job payload and return the response body and status code."""
+    return await engine.call(_handle_job(request_json))
+
+async def _handle_job(request_json: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
     try:
-        # Parse request data
-        request_json = request.get_json(silent=True)
         if not request_json:
             return {"error": "No JSON data received"}, 400
 
@@ -18,12 +92,32 @@ async def process_job(request: Request):
         params = request_json.get("params", {})
         user_id = request_json.get("user_id")
         callback_url = request_json.get("callback_url")
+        task_name = request_json.get("task_name")
+        dispatch_deadline = request_json.get("dispatch_deadline_seconds")
 
         if not all([job_type, user_id]):
             return {"error": "Missing required fields"}, 400
 
+        # The queue abandons the attempt at its dispatch deadline, so the job
+        # has to stop (and checkpoint) a little before then.
+        ctx = JobContext(
+            job_id=task_name or job_key(job_type, params, user_id),
+            deadline=time.time() + float(dispatch_deadline) - JOB_DEADLINE_MARGIN_SECONDS if dispatch_deadline else None,
+            checkpoints=checkpoint_store,
+            cancel_event=threading.Event()
+        )
+
+        await report_job_event(task_name, user_id, "RUNNING")
+
         # Process the job based on type
-        result = await process_job_by_type(job_type, params, user_id)
+        try:
+            result = await process_job_by_type(job_type, params, user_id, ctx)
+        except Exception as e:
+            # Not terminal: the queue may still redeliver the task.
+            await report_job_event(task_name, user_id, "ERROR", error=str(e))
+            raise
+
+        await report_job_event(task_name, user_id, "SUCCEEDED", result=result)
 
         # Send callback if URL provided
         if callback_url:
@@ -31,40 +125,49 @@ async def process_job(request: Request):
 
         return {"status": "completed", "result": result}, 200
 
+    except JobInvalid as e:
+        return {"error": str(e)}, 400
+    except JobRejected as e:
+        # 429 makes Cloud Tasks back off and redeliver later.
+        return {"error": str(e)}, 429
+    except JobTimeout as e:
+        return {"error": str(e)}, 504
     except Exception as e:
         return {"error": str(e)}, 500
 
-async def process_job_by_type(job_type: str, params: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+async def process_job_by_type(
+    job_type: str,
+    params: Dict[str, Any],
+    user_id: str,
+    ctx: Optional[JobContext] = None
+) -> Dict[str, Any]:
     """Process different types of jobs."""
-    if job_type == "llm_process":
-        return await process_llm_job(params)
-    elif job_type == "data_analysis":
-        return await process_data_analysis(params)
-    else:
-        raise ValueError(f"Unknown job type: {job_type}")
-
-async def process_llm_job(params: Dict[str, Any]) -> Dict[str, Any]:
-    """Process LLM-related jobs."""
-    # Implement your LLM processing logic here
-    return {"status": "completed", "result": "LLM processing completed"}
-
-async def process_data_analysis(params: Dict[str, Any]) -> Dict[str, Any]:
-    """Process data analysis jobs."""
-    # Implement your data analysis logic here
-    return {"status": "completed", "result": "Data analysis completed"}
+    handler = registry.get(job_type)
+    if not handler.cacheable:
+        return await engine.run(job_type, params, ctx)
+    # Redelivered or repeated jobs share the first run's result, as long as
+    # the inputs they read outside their params haven't changed.
+    version = await asyncio.get_running_loop().run_in_executor(None, handler.input_version, params)
+    key = job_key(job_type, params, user_id, version)
+    return await job_cache.get_or_run(key, lambda: engine.run(job_type, params, ctx))
 
 async def send_callback(callback_url: str, result: Dict[str, Any]):
     """Send callback with job results."""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                callback_url,
-                json={"status": "completed", "result": result},
-                timeout=30.0
-            )
-            response.raise_for_status()
-        except Exception as e:
-            print(f"Failed to send callback: {str(e)}")
+    await callback_client.post(callback_url, {"status": "completed", "result": result})
+
+async def report_job_event(task_name: Optional[str], user_id: str, status: str, **details: Any):
+    """Report a job state transition to the API's event stream."""
+    if not JOB_EVENTS_URL or not task_name:
+        return
+    event = {"task_name": task_name, "user_id": user_id, "status": status, **details}
+    # Progress events are best effort: a couple of quick retries, no dead letter.
+    await callback_client.post(
+        JOB_EVENTS_URL,
+        event,
+        headers={"X-Job-Events-Token": JOB_EVENTS_TOKEN or ""},
+        max_attempts=2,
+        dead_letter=False
+    )
 
 if __name__ == "__main__":
     # For local development
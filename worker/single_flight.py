@@ -0,0 +1,57 @@
+"""Coalescing of concurrent identical calls into one in-flight call.
+
+The worker is deployed from this directory on its own and cannot import the
+``api`` package, so this mirrors ``api/single_flight.py``; keep the two in
+step.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its outcome.
+
+    The call runs as its own task, so cancelling any caller, including the
+    one that started it, only detaches that caller: the others still get the
+    call's result or exception.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await ``fn()`` or the call already in flight for ``key``.
+
+        Returns the result and whether it was shared with an earlier caller.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), shared
+
+    def is_current(self, key: Hashable) -> bool:
+        """Whether the running call is still the one registered for ``key``.
+
+        Only meaningful inside ``fn``; false once ``forget(key)`` detached it.
+        """
+        return self._inflight.get(key) is asyncio.current_task()
+
+    def forget(self, key: Hashable):
+        """Detach the call in flight for ``key``; later callers start a new one."""
+        self._inflight.pop(key, None)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved in case every caller was cancelled.
+        if not task.cancelled():
+            task.exception()
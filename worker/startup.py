@@ -0,0 +1,137 @@
+"""Cold-start bookkeeping for the worker.
+
+Handler modules are imported on first use of their job type through
+``timed_import``, which records what each import cost. ``snapshot`` keeps
+expensive initialized state (clients, lookup tables) for the life of the
+process and, when ``WORKER_SNAPSHOT_DIR`` is set and the value pickles, on
+disk so the next container start can load it instead of rebuilding it.
+``report`` summarizes all of it, and ``log_report`` prints that summary
+once per process from the Cloud Run entrypoint.
+"""
+import importlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable
+
+WORKER_SNAPSHOT_DIR = os.getenv("WORKER_SNAPSHOT_DIR")
+
+_started = time.perf_counter()
+# Reentrant: a module imported here may build a snapshot at import time.
+_lock = threading.RLock()
+_imports: Dict[str, float] = {}
+_prewarm: Dict[str, float] = {}
+_snapshots: Dict[str, Dict[str, Any]] = {}
+_state: Dict[str, Any] = {}
+_ready_seconds = None
+_reported = False
+
+
+def timed_import(name: str) -> ModuleType:
+    """Import ``name`` and record the wall time of its first import."""
+    with _lock:
+        if name in _imports:
+            return importlib.import_module(name)
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        _imports[name] = time.perf_counter() - started
+    return module
+
+
+def record_prewarm(job_type: str, seconds: float):
+    _prewarm[job_type] = seconds
+
+
+def load_target(target: str) -> Callable:
+    """Resolve a ``"module:function"`` handler reference."""
+    module_name, _, attr = target.partition(":")
+    return getattr(timed_import(module_name), attr)
+
+
+def call_target(target: str, params: Dict[str, Any], *args: Any) -> Any:
+    """Run a handler by reference, so process-pool parents never import it."""
+    return load_target(target)(params, *args)
+
+
+def warm_child(modules: Iterable[str]):
+    """Process-pool initializer: import handler modules and run their prewarm."""
+    for name in modules:
+        prewarm = getattr(importlib.import_module(name), "prewarm", None)
+        if prewarm is not None:
+            prewarm()
+
+
+def _snapshot_path(name: str, version: str) -> str:
+    return os.path.join(WORKER_SNAPSHOT_DIR, f"{name}-{version}.pickle")
+
+
+def snapshot(name: str, build: Callable[[], Any], version: str = "1") -> Any:
+    """Return the state built by ``build``, building it at most once.
+
+    Bump ``version`` whenever ``build`` changes shape; stale snapshot files are
+    simply ignored. State that cannot be pickled (e.g. gRPC clients) is still
+    kept in memory for the life of the process.
+    """
+    key = f"{name}-{version}"
+    with _lock:
+        if key in _state:
+            return _state[key]
+        started = time.perf_counter()
+        source = "built"
+        value = None
+        path = _snapshot_path(name, version) if WORKER_SNAPSHOT_DIR else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    value = pickle.load(f)
+                source = "disk"
+            except Exception as e:
+                print(f"Ignoring unreadable snapshot {path}: {str(e)}")
+        if source == "built":
+            value = build()
+            if path:
+                _write_snapshot(path, value)
+        _state[key] = value
+        _snapshots[name] = {"version": version, "source": source, "seconds": time.perf_counter() - started}
+    return value
+
+
+def _write_snapshot(path: str, value: Any):
+    try:
+        data = pickle.dumps(value)
+    except Exception:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so concurrent starts never read a partial file.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def mark_ready():
+    global _ready_seconds
+    _ready_seconds = time.perf_counter() - _started
+
+
+def report() -> Dict[str, Any]:
+    return {
+        "ready_seconds": _ready_seconds,
+        "imports": dict(_imports),
+        "prewarm": dict(_prewarm),
+        "snapshots": dict(_snapshots),
+    }
+
+
+def log_report():
+    """Print the startup report the first time it is called in this process."""
+    global _reported
+    with _lock:
+        if _reported:
+            return
+        _reported = True
+    print(json.dumps({"worker_startup": report()}))
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis_jobs
+from analysis_jobs import source_version
+from job_context import JobCancelled, JobContext, LocalCheckpointStore
+
+
+def test_source_version_is_none_without_a_source():
+    assert source_version({"data": [1, 2, 3]}) is None
+
+
+def test_source_version_changes_when_the_file_is_rewritten(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_jobs, "ANALYSIS_DATA_ROOT", str(tmp_path))
+    path = tmp_path / "events.csv"
+    path.write_text("a\n1\n")
+    before = source_version({"source": "events.csv"})
+    path.write_text("a\n1\n2\n")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    assert source_version({"source": "events.csv"}) != before
+
+
+def test_source_version_refuses_paths_outside_the_data_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_jobs, "ANALYSIS_DATA_ROOT", str(tmp_path))
+    with pytest.raises(ValueError):
+        source_version({"source": "../etc/passwd"})
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "a": rng.normal(100, 15, 1000),
+        "b": rng.integers(0, 50, 1000),
+        "g": rng.choice(["x", "y", "z"], 1000),
+    })
+    df.loc[::37, "a"] = np.nan
+    return df
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_jobs, "ANALYSIS_DATA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def write(df, root, fmt):
+    name = f"data.{fmt}"
+    if fmt == "csv":
+        df.to_csv(root / name, index=False)
+    elif fmt == "jsonl":
+        df.to_json(root / name, orient="records", lines=True)
+    else:
+        df.to_parquet(root / name, index=False)
+    return name
+
+
+def expected(values):
+    return {
+        "count": int(values.count()),
+        "sum": float(values.sum()),
+        "mean": float(values.mean()),
+        "std": float(values.std(ddof=1)),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+
+
+def assert_matches(actual, values):
+    assert actual["count"] == expected(values)["count"]
+    for stat, value in expected(values).items():
+        assert actual[stat] == pytest.approx(value, rel=1e-9), stat
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet"])
+def test_chunked_stats_match_a_single_pass(frame, data_root, fmt):
+    source = write(frame, data_root, fmt)
+    result = analysis_jobs.analyze_source({"source": source, "chunk_rows": 64})
+    assert result["rows"] == 1000
+    assert result["chunks"] == 16
+    assert set(result["aggregates"]) == {"a", "b"}
+    for column in ("a", "b"):
+        assert_matches(result["aggregates"][column], frame[column])
+
+
+def test_group_by_matches_pandas_groupby(frame, data_root):
+    source = write(frame, data_root, "csv")
+    result = analysis_jobs.analyze_source({"source": source, "chunk_rows": 100, "group_by": "g", "columns": ["a"]})
+    for group, values in frame.groupby("g")["a"]:
+        assert_matches(result["aggregates"][group]["a"], values)
+
+
+def test_merge_is_chan_parallel_variance(frame):
+    halves = [analysis_jobs._chunk_stats(part, ["a"], None) for part in (frame.iloc[:300], frame.iloc[300:])]
+    merged = analysis_jobs._merge_stats(*halves)
+    whole = analysis_jobs._chunk_stats(frame, ["a"], None)
+    pd.testing.assert_frame_equal(merged, whole, check_exact=False, rtol=1e-9, check_dtype=False)
+
+
+def test_partials_path_gets_one_line_per_chunk(frame, data_root):
+    source = write(frame, data_root, "csv")
+    analysis_jobs.analyze_source({"source": source, "chunk_rows": 250, "partials_path": "partials.jsonl"})
+    lines = [json.loads(line) for line in (data_root / "partials.jsonl").read_text().splitlines()]
+    assert [line["chunk"] for line in lines] == [1, 2, 3, 4]
+    assert [line["rows"] for line in lines] == [250, 500, 750, 1000]
+    assert_matches(lines[-1]["aggregates"]["b"], frame["b"])
+
+
+class StopAfterFirstCheckpoint(LocalCheckpointStore):
+    """Cancels the attempt once a checkpoint has been saved."""
+
+    def __init__(self, directory, cancel_event):
+        super().__init__(directory)
+        self.cancel_event = cancel_event
+
+    def save(self, job_id, state):
+        super().save(job_id, state)
+        self.cancel_event.set()
+
+
+def test_checkpoint_resume_skips_finished_chunks(frame, data_root, tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_jobs, "ANALYSIS_CHECKPOINT_CHUNKS", 3)
+    source = write(frame, data_root, "csv")
+    params = {"source": source, "chunk_rows": 100}
+    store_dir = str(tmp_path / "checkpoints")
+
+    cancel = threading.Event()
+    first = JobContext(job_id="tasks/t1", checkpoints=StopAfterFirstCheckpoint(store_dir, cancel), cancel_event=cancel)
+    with pytest.raises(JobCancelled):
+        analysis_jobs.analyze_source(params, first)
+    assert LocalCheckpointStore(store_dir).load("tasks/t1")["chunks"] == 3
+
+    computed = []
+    chunk_stats = analysis_jobs._chunk_stats
+    monkeypatch.setattr(analysis_jobs, "_chunk_stats", lambda *args: computed.append(1) or chunk_stats(*args))
+    second = JobContext(job_id="tasks/t1", checkpoints=LocalCheckpointStore(store_dir))
+    result = analysis_jobs.analyze_source(params, second)
+    assert len(computed) == 7
+    assert result["rows"] == 1000
+    assert_matches(result["aggregates"]["a"], frame["a"])
+    assert LocalCheckpointStore(store_dir).load("tasks/t1") is None
@@ -0,0 +1,94 @@
+import json
+
+import httpx
+import pytest
+
+from callbacks import CallbackClient
+
+
+def make_client(tmp_path, handler, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    return CallbackClient(
+        dead_letter_path=str(tmp_path / "dead.jsonl"),
+        transport=httpx.MockTransport(handler),
+        **kwargs
+    )
+
+
+def dead_letters(tmp_path):
+    path = tmp_path / "dead.jsonl"
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_failures_until_success(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        return httpx.Response(503 if len(calls) < 3 else 200)
+
+    client = make_client(tmp_path, handler, max_attempts=5)
+    assert await client.post("http://callback.test/done", {"ok": True})
+    assert calls == [{"ok": True}] * 3
+    assert dead_letters(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts_and_dead_letters(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        raise httpx.ConnectError("refused", request=request)
+
+    client = make_client(tmp_path, handler, max_attempts=3)
+    assert not await client.post("http://callback.test/done", {"id": 1})
+    assert len(calls) == 3
+    [record] = dead_letters(tmp_path)
+    assert record["url"] == "http://callback.test/done"
+    assert record["payload"] == {"id": 1}
+    assert record["attempts"] == 3
+    assert record["error"].startswith("ConnectError")
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(404)
+
+    client = make_client(tmp_path, handler, max_attempts=5)
+    assert not await client.post("http://callback.test/done", {})
+    assert calls == [1]
+    assert dead_letters(tmp_path)[0]["error"] == "HTTP 404"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url, payload", [
+    ("ftp://callback.test/done", {}),
+    ("callback.test/done", {}),
+    ("http://127.0.0.1:9/done", {"value": object()}),
+])
+async def test_bad_urls_and_payloads_are_dead_lettered_not_raised(tmp_path, url, payload):
+    # The real transport, so URL errors surface the way they would in production.
+    client = CallbackClient(dead_letter_path=str(tmp_path / "dead.jsonl"), backoff_base=0, max_attempts=5)
+    assert not await client.post(url, payload)
+    assert dead_letters(tmp_path)[0]["attempts"] == 1
+    await client.aclose()
+
+
+def test_retry_after_is_honoured_up_to_the_backoff_cap():
+    client = CallbackClient(backoff_max=10)
+    assert client._backoff(1, httpx.Response(429, headers={"Retry-After": "3"})) == 3
+    assert client._backoff(1, httpx.Response(429, headers={"Retry-After": "120"})) == 10
+
+
+def test_jitter_stays_within_the_exponential_cap():
+    client = CallbackClient(backoff_base=0.5, backoff_max=4)
+    for attempt, cap in ((1, 0.5), (3, 2.0), (10, 4.0)):
+        delays = [client._backoff(attempt, None) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert max(delays) > cap / 2
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+
+import engine as engine_module
+from engine import ExecutionEngine, JobInvalid, JobRegistry, JobRejected, JobTimeout
+
+
+def slow_square(params):
+    time.sleep(params["seconds"])
+    return {"value": params["n"] ** 2}
+
+
+@pytest.fixture
+def make_engine():
+    engines = []
+
+    def make(registry, **kwargs):
+        engine = ExecutionEngine(registry, **kwargs)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_async_handler_runs_on_the_engine_loop(make_engine):
+    registry = JobRegistry()
+
+    async def double(params):
+        return {"value": params["n"] * 2}
+
+    registry.register("double", double)
+    assert await make_engine(registry).run("double", {"n": 21}) == {"value": 42}
+
+
+@pytest.mark.asyncio
+async def test_full_wait_queue_rejects(make_engine):
+    registry = JobRegistry()
+    release = asyncio.Event()
+
+    async def block(params):
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(release.wait(), caller))
+        return {}
+
+    caller = asyncio.get_running_loop()
+    registry.register("block", block, concurrency=1, max_queue=0)
+    engine = make_engine(registry)
+    first = asyncio.ensure_future(engine.run("block", {}))
+    await asyncio.sleep(0.05)
+    with pytest.raises(JobRejected):
+        await engine.run("block", {})
+    release.set()
+    await first
+
+
+@pytest.mark.asyncio
+async def test_timed_out_process_job_holds_its_slot_until_the_child_exits(make_engine, monkeypatch):
+    monkeypatch.setattr(engine_module, "ENGINE_PROCESS_GRACE_SECONDS", 0)
+    registry = JobRegistry()
+    registry.register("square", slow_square, kind="process", concurrency=1, timeout=0.2)
+    engine = make_engine(registry, process_workers=1)
+    await engine.call(engine.prewarm(["square"]))
+
+    with pytest.raises(JobTimeout):
+        await engine.run("square", {"n": 3, "seconds": 1.0})
+    assert engine.stats()["square"]["running"] == 1
+
+    started = time.perf_counter()
+    assert await engine.run("square", {"n": 3, "seconds": 0}) == {"value": 9}
+    assert time.perf_counter() - started > 0.5
+    assert engine.stats()["square"]["running"] == 0
+
+
+def test_unknown_job_type_is_invalid():
+    with pytest.raises(JobInvalid):
+        JobRegistry().get("bogus")
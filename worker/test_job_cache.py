@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from job_cache import JobResultCache, job_key
+
+
+def test_job_key_ignores_param_order_and_includes_user():
+    assert job_key("t", {"a": 1, "b": 2}, "u1") == job_key("t", {"b": 2, "a": 1}, "u1")
+    assert job_key("t", {"a": 1}, "u1") != job_key("t", {"a": 1}, "u2")
+
+
+@pytest.mark.asyncio
+async def test_second_run_is_answered_from_cache():
+    cache = JobResultCache()
+    runs = []
+
+    async def run():
+        runs.append(1)
+        return {"value": len(runs)}
+
+    assert await cache.get_or_run("k", run) == {"value": 1}
+    assert await cache.get_or_run("k", run) == {"value": 1}
+    assert runs == [1]
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_duplicates_in_flight_share_one_run():
+    cache = JobResultCache()
+    release = asyncio.Event()
+    runs = []
+
+    async def run():
+        runs.append(1)
+        await release.wait()
+        return {"value": "done"}
+
+    deliveries = [asyncio.ensure_future(cache.get_or_run("k", run)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*deliveries) == [{"value": "done"}] * 3
+    assert runs == [1]
+    assert cache.stats()["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_first_delivery_does_not_fail_duplicates():
+    cache = JobResultCache()
+    release = asyncio.Event()
+
+    async def run():
+        await release.wait()
+        return {"value": "done"}
+
+    first = asyncio.ensure_future(cache.get_or_run("k", run))
+    await asyncio.sleep(0)
+    duplicate = asyncio.ensure_future(cache.get_or_run("k", run))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await duplicate == {"value": "done"}
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached():
+    cache = JobResultCache()
+    attempts = []
+
+    async def run():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("transient")
+        return {"value": "ok"}
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_run("k", run)
+    assert await cache.get_or_run("k", run) == {"value": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_bounded_by_entries_and_bytes():
+    cache = JobResultCache(max_entries=2, max_bytes=10_000)
+    for key in ("a", "b", "c"):
+        await cache.get_or_run(key, lambda key=key: _result(key))
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    small = JobResultCache(max_bytes=10)
+    await small.get_or_run("big", lambda: _result("x" * 100))
+    assert small.stats()["entries"] == 0
+
+
+async def _result(value):
+    return {"value": value}
+
+
+def test_job_key_changes_with_input_version():
+    params = {"source": "data/events.csv"}
+    assert job_key("t", params, "u1", "mtime:1:size:10") != job_key("t", params, "u1", "mtime:2:size:10")
+    assert job_key("t", params, "u1") == job_key("t", params, "u1", None)
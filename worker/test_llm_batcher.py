@@ -0,0 +1,44 @@
+import pytest
+
+import llm_batcher
+from llm_batcher import HTTPLLMBackend, MockLLMBackend, backend_from_env
+from llm_cache import prompt_cache_key
+
+
+def configure(monkeypatch, backend="", url=None):
+    monkeypatch.setattr(llm_batcher, "LLM_BACKEND", backend)
+    monkeypatch.setattr(llm_batcher, "LLM_BACKEND_URL", url)
+
+
+def test_unconfigured_backend_fails_instead_of_using_the_mock(monkeypatch):
+    configure(monkeypatch)
+    with pytest.raises(RuntimeError):
+        backend_from_env()
+
+
+def test_mock_must_be_requested_explicitly(monkeypatch):
+    configure(monkeypatch, backend="mock")
+    assert isinstance(backend_from_env(), MockLLMBackend)
+
+
+def test_url_selects_http_backend(monkeypatch):
+    configure(monkeypatch, url="http://llm.internal/batch")
+    backend = backend_from_env()
+    assert isinstance(backend, HTTPLLMBackend)
+    assert backend.identity == "http:http://llm.internal/batch"
+
+
+def test_http_without_url_and_unknown_kinds_fail(monkeypatch):
+    configure(monkeypatch, backend="http")
+    with pytest.raises(RuntimeError):
+        backend_from_env()
+    configure(monkeypatch, backend="openai")
+    with pytest.raises(RuntimeError):
+        backend_from_env()
+
+
+def test_prompt_cache_key_differs_per_backend():
+    request = {"prompt": "hi", "temperature": 0}
+    assert prompt_cache_key(dict(request, backend="mock")) != prompt_cache_key(
+        dict(request, backend="http:http://llm.internal/batch")
+    )
@@ -0,0 +1,57 @@
+import pytest
+
+from llm_cache import LLM_CACHE_LOOKUPS, PromptCache, is_deterministic, prompt_cache_key
+
+
+def test_only_temperature_zero_is_deterministic():
+    assert is_deterministic({"temperature": 0})
+    assert is_deterministic({"temperature": "0.0"})
+    assert not is_deterministic({"temperature": 0.7})
+    assert not is_deterministic({})
+
+
+@pytest.mark.parametrize("temperature", ["hot", [], "nan", -1])
+def test_invalid_temperature_is_rejected(temperature):
+    with pytest.raises(ValueError):
+        is_deterministic({"temperature": temperature})
+
+
+def test_key_folds_line_endings_but_keeps_whitespace():
+    base = {"prompt": "a\nb", "temperature": 0}
+    assert prompt_cache_key(base) == prompt_cache_key(dict(base, prompt="a\r\nb"))
+    assert prompt_cache_key(base) != prompt_cache_key(dict(base, prompt="a\nb "))
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_counted_by_result():
+    def count(result):
+        return LLM_CACHE_LOOKUPS.labels(result)._value.get()
+
+    before = {result: count(result) for result in ("memory_hit", "miss")}
+    cache = PromptCache(path="")
+    assert await cache.get("k") is None
+    await cache.put("k", {"text": "ok"})
+    assert await cache.get("k") == {"text": "ok"}
+    assert count("miss") == before["miss"] + 1
+    assert count("memory_hit") == before["memory_hit"] + 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_callers_cannot_change_cached_results(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = PromptCache(path=path)
+    value = {"text": "ok"}
+    await cache.put("k", value)
+    value["text"] = "changed by caller"
+    hit = await cache.get("k")
+    assert hit == {"text": "ok"}
+    hit["text"] = "changed again"
+    assert await cache.get("k") == {"text": "ok"}
+
+    # A fresh process reads the disk tier and fills its memory tier.
+    reopened = PromptCache(path=path)
+    disk_hit = await reopened.get("k")
+    disk_hit["text"] = "changed"
+    assert await reopened.get("k") == {"text": "ok"}
+    assert reopened.stats()["disk_hits"] == 1
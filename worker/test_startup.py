@@ -0,0 +1,24 @@
+import json
+
+import startup
+
+
+def test_snapshot_builds_once():
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"table": [1, 2, 3]}
+
+    assert startup.snapshot("test-table", build) is startup.snapshot("test-table", build)
+    assert builds == [1]
+    assert startup.report()["snapshots"]["test-table"]["source"] == "built"
+
+
+def test_log_report_prints_once(capsys, monkeypatch):
+    monkeypatch.setattr(startup, "_reported", False)
+    startup.log_report()
+    startup.log_report()
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert "ready_seconds" in json.loads(lines[0])["worker_startup"]